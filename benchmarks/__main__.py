@@ -0,0 +1,230 @@
+# -*- coding: utf-8 -*-
+import argparse
+import asyncio
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+from datetime import datetime
+from pathlib import Path
+
+from benchmarks.fixtures import fixtures_dir, make_download_media, make_fragmented_media, make_images, make_videos
+from benchmarks.local_http import LocalMediaServer
+from benchmarks.measure import run_case
+
+SUITES = ("removebg", "dedup", "yt", "fragments")
+
+
+def bench_removebg(args) -> list:
+    from cogs.commands.mediaprocessing.removebg import process_removebg_from_path
+    images = make_images(fixtures_dir() / "images")
+    results = []
+    for model in args.models:
+        for path in images:
+            def _run(path=path, model=model):
+                out, err = asyncio.run(process_removebg_from_path(
+                    str(path), 1024, max_dimension=args.max_dimension, timeout_seconds=600.0, model=model,
+                ))
+                if err:
+                    raise RuntimeError(err)
+                return {"output_bytes": len(out)}
+            results.append(run_case(f"removebg/{model}/{path.stem}", _run, args.runs, warmup=1))
+    return results
+
+
+def bench_dedup(args) -> list:
+    from cogs.commands.mediaprocessing.dedup import process_dedup_from_path
+    videos = make_videos(fixtures_dir() / "videos", size=args.video_size, duration=args.video_seconds)
+    results = []
+    for preset in args.presets:
+        for name, video in videos.items():
+            def _run(video=video, preset=preset):
+                work = tempfile.mkdtemp(prefix="tps_bench_dedup_")
+                try:
+                    input_path = os.path.join(work, "input.mp4")
+                    shutil.copyfile(video["path"], input_path)
+                    out, err, stats = asyncio.run(process_dedup_from_path(
+                        input_path, 1024, preset=preset, engine=args.dedup_engine,
+                    ))
+                    if err:
+                        raise RuntimeError(err)
+                    return {
+                        "unique_frames": stats.get("uniqueFrames"),
+                        "expected_unique": video["expected_unique"],
+                        "frames": stats.get("originalFrames"),
+                        "optical_flow_pairs": stats.get("opticalFlowPairs"),
+                        "output_bytes": os.path.getsize(out),
+                    }
+                finally:
+                    shutil.rmtree(work, ignore_errors=True)
+            results.append(run_case(
+                f"dedup/{preset}/{name}", _run, args.runs, warmup=0,
+                units=video["frames"], unit_name="frames",
+            ))
+    return results
+
+
+def bench_yt(args) -> list:
+    from cogs.utils.yt_downloader import (
+        clear_info_cache, download_audio_mp3, download_audio_original, download_video_webm, ydl_pool, _get_ffmpeg_dir,
+    )
+    media = make_download_media(fixtures_dir() / "download")
+    results = []
+    with LocalMediaServer(media["webm"].parent) as server:
+        url = server.url_for(media["webm"].name)
+
+        # Each run pays for extraction, as a fresh submission would.
+        def _video():
+            clear_info_cache()
+            work = tempfile.mkdtemp(prefix="tps_bench_yt_")
+            try:
+                path = download_video_webm(url, Path(work), 720, ffmpeg_dir=_get_ffmpeg_dir())
+                return {"output_bytes": path.stat().st_size}
+            finally:
+                shutil.rmtree(work, ignore_errors=True)
+
+        def _audio():
+            clear_info_cache()
+            work = tempfile.mkdtemp(prefix="tps_bench_yt_")
+            try:
+                path = download_audio_mp3(url, Path(work), "320")
+                return {"output_bytes": path.stat().st_size}
+            finally:
+                shutil.rmtree(work, ignore_errors=True)
+
+        def _audio_original():
+            clear_info_cache()
+            work = tempfile.mkdtemp(prefix="tps_bench_yt_")
+            try:
+                path = download_audio_original(url, Path(work))
+                return {"output_bytes": path.stat().st_size}
+            finally:
+                shutil.rmtree(work, ignore_errors=True)
+
+        # Same job without the pooled YoutubeDL instances, as every job ran before.
+        def _video_cold():
+            ydl_pool.close()
+            return _video()
+
+        results.append(run_case("yt/video_webm", _video, args.runs, warmup=1))
+        results.append(run_case("yt/video_webm_cold", _video_cold, args.runs, warmup=1))
+        results.append(run_case("yt/audio_mp3", _audio, args.runs, warmup=1))
+        results.append(run_case("yt/audio_original", _audio_original, args.runs, warmup=1))
+    return results
+
+
+def bench_fragments(args) -> list:
+    from cogs.utils import yt_downloader
+    playlist = make_fragmented_media(fixtures_dir() / "fragments", duration=args.fragment_seconds)
+    total_bytes = sum(p.stat().st_size for p in playlist.parent.iterdir() if p.suffix in (".mp4", ".m4s"))
+    results = []
+    saved = dict(yt_downloader.DOWNLOAD_TUNING)
+    with LocalMediaServer(playlist.parent.parent, latency_ms=args.latency_ms, kbps=args.link_kbps) as server:
+        url = server.url_for(f"{playlist.parent.name}/{playlist.name}")
+        levels = [str(n) for n in args.fragment_levels] + ["adaptive"]
+        try:
+            for level in levels:
+                if level == "adaptive":
+                    yt_downloader.configure_download_tuning(adaptive=True, concurrent_fragment_downloads=4)
+                else:
+                    yt_downloader.configure_download_tuning(adaptive=False, concurrent_fragment_downloads=int(level))
+
+                def _run():
+                    yt_downloader.clear_info_cache()
+                    work = tempfile.mkdtemp(prefix="tps_bench_frag_")
+                    try:
+                        path = yt_downloader.download_video_webm(url, Path(work), 720, ffmpeg_dir=yt_downloader._get_ffmpeg_dir())
+                        details = {"output_bytes": path.stat().st_size}
+                        if yt_downloader._adaptive is not None:
+                            details["adaptive_level"] = yt_downloader._adaptive.current
+                        return details
+                    finally:
+                        shutil.rmtree(work, ignore_errors=True)
+
+                # Adaptive needs a few jobs to settle, so it gets extra warmup.
+                warmup = 6 if level == "adaptive" else 1
+                results.append(run_case(
+                    f"fragments/{level}", _run, args.runs, warmup=warmup,
+                    units=total_bytes / (1024 * 1024), unit_name="MB",
+                ))
+        finally:
+            yt_downloader.DOWNLOAD_TUNING.clear()
+            yt_downloader.DOWNLOAD_TUNING.update(saved)
+            yt_downloader.configure_download_tuning()
+    return results
+
+
+def _git_commit() -> str:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            capture_output=True, text=True, check=True,
+        )
+        return out.stdout.strip()
+    except Exception:
+        return "unknown"
+
+
+def _compare(baseline_path: str, report: dict) -> None:
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    old = {r["name"]: r for r in baseline.get("results", [])}
+    print(f"\nCompared with {baseline.get('commit', '?')}:")
+    for r in report["results"]:
+        prev = old.get(r["name"])
+        if not prev or not prev.get("p50_s"):
+            print(f"  {r['name']}: new")
+            continue
+        delta = (r["p50_s"] - prev["p50_s"]) / prev["p50_s"] * 100
+        print(f"  {r['name']}: p50 {prev['p50_s']:.3f}s -> {r['p50_s']:.3f}s ({delta:+.1f}%)")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="TPS Bot media pipeline benchmarks.")
+    parser.add_argument("suites", nargs="*", choices=SUITES + ("all",), default=["all"])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--models", nargs="+", default=["u2netp"])
+    parser.add_argument("--max-dimension", type=int, default=1024)
+    parser.add_argument("--presets", nargs="+", default=["fast", "balanced", "precise"])
+    parser.add_argument("--dedup-engine", choices=("tiered", "original", "auto"), default="tiered")
+    parser.add_argument("--video-size", default="1280x720")
+    parser.add_argument("--video-seconds", type=int, default=5)
+    parser.add_argument("--fragment-levels", nargs="+", type=int, default=[1, 4, 16])
+    parser.add_argument("--fragment-seconds", type=int, default=20, help="Length of the HLS fixture (1s segments)")
+    parser.add_argument("--latency-ms", type=float, default=40, help="Per-request delay of the local fragment server")
+    parser.add_argument("--link-kbps", type=float, default=8000, help="Per-connection bandwidth cap of the local server")
+    parser.add_argument("--output", help="Write the JSON report to this file (default: stdout)")
+    parser.add_argument("--compare", help="Previous JSON report to print p50 deltas against")
+    args = parser.parse_args(argv)
+
+    suites = SUITES if "all" in args.suites else tuple(dict.fromkeys(args.suites))
+    runners = {"removebg": bench_removebg, "dedup": bench_dedup, "yt": bench_yt, "fragments": bench_fragments}
+    report = {
+        "commit": _git_commit(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "results": [],
+    }
+    for suite in suites:
+        print(f"Running {suite}…", file=sys.stderr)
+        report["results"].extend(runners[suite](args))
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    if args.compare:
+        _compare(args.compare, report)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+import os
+import subprocess
+from pathlib import Path
+from typing import Dict, List
+
+IMAGE_SIZES = [(512, 512), (1280, 720), (1920, 1080), (3840, 2160)]
+
+# name -> (source fps, output fps); every source frame is held output/source times.
+VIDEO_PATTERNS = {
+    "ones": (24, 24),
+    "twos": (12, 24),
+    "threes": (8, 24),
+}
+
+
+def _ffmpeg(*args: str) -> None:
+    subprocess.run(["ffmpeg", "-y", "-loglevel", "error", *args], check=True)
+
+
+def make_images(out_dir: Path, sizes=IMAGE_SIZES, seed: int = 1234) -> List[Path]:
+    from PIL import Image, ImageDraw
+    import random
+    out_dir.mkdir(parents=True, exist_ok=True)
+    rng = random.Random(seed)
+    paths = []
+    for w, h in sizes:
+        path = out_dir / f"image_{w}x{h}.png"
+        if not path.exists():
+            img = Image.new("RGB", (w, h))
+            draw = ImageDraw.Draw(img)
+            for y in range(0, h, 4):
+                shade = int(80 + 100 * y / h)
+                draw.rectangle((0, y, w, y + 4), fill=(shade, shade // 2, 200 - shade // 2))
+            for _ in range(12):
+                x0, y0 = rng.randrange(w // 2), rng.randrange(h // 2)
+                x1, y1 = x0 + rng.randrange(w // 8, w // 2), y0 + rng.randrange(h // 8, h // 2)
+                color = tuple(rng.randrange(256) for _ in range(3))
+                if rng.random() < 0.5:
+                    draw.ellipse((x0, y0, x1, y1), fill=color)
+                else:
+                    draw.rectangle((x0, y0, x1, y1), fill=color)
+            img.save(path, format="PNG")
+        paths.append(path)
+    return paths
+
+
+def make_videos(out_dir: Path, size: str = "1280x720", duration: int = 5) -> Dict[str, dict]:
+    out_dir.mkdir(parents=True, exist_ok=True)
+    videos = {}
+    for name, (src_fps, out_fps) in VIDEO_PATTERNS.items():
+        path = out_dir / f"video_{name}_{size}_{duration}s.mp4"
+        if not path.exists():
+            _ffmpeg(
+                "-f", "lavfi", "-i", f"testsrc2=size={size}:rate={src_fps}:duration={duration}",
+                "-r", str(out_fps), "-c:v", "libx264", "-preset", "veryfast", "-crf", "18",
+                "-pix_fmt", "yuv420p", str(path),
+            )
+        videos[name] = {
+            "path": path,
+            "frames": duration * out_fps,
+            "expected_unique": duration * src_fps,
+        }
+    return videos
+
+
+def make_download_media(out_dir: Path, duration: int = 10) -> Dict[str, Path]:
+    out_dir.mkdir(parents=True, exist_ok=True)
+    webm = out_dir / f"media_{duration}s.webm"
+    if not webm.exists():
+        _ffmpeg(
+            "-f", "lavfi", "-i", f"testsrc2=size=1280x720:rate=30:duration={duration}",
+            "-f", "lavfi", "-i", f"sine=frequency=440:duration={duration}",
+            "-c:v", "libvpx-vp9", "-deadline", "realtime", "-cpu-used", "8", "-b:v", "1M",
+            "-c:a", "libopus", "-b:a", "128k", "-shortest", str(webm),
+        )
+    return {"webm": webm}
+
+
+def make_fragmented_media(out_dir: Path, duration: int = 20, segment_seconds: int = 1) -> Path:
+    # HLS VOD playlist of short fMP4 segments: the fragment-per-request shape
+    # of YouTube's DASH formats, for concurrent-fragment benchmarks.
+    target = out_dir / f"fmp4_{duration}s_{segment_seconds}s"
+    playlist = target / "playlist.m3u8"
+    if not playlist.exists():
+        target.mkdir(parents=True, exist_ok=True)
+        _ffmpeg(
+            "-f", "lavfi", "-i", f"testsrc2=size=1280x720:rate=30:duration={duration}",
+            "-f", "lavfi", "-i", f"sine=frequency=440:duration={duration}",
+            "-c:v", "libx264", "-preset", "ultrafast", "-b:v", "3M", "-g", str(30 * segment_seconds),
+            "-c:a", "aac", "-b:a", "128k", "-shortest",
+            "-f", "hls", "-hls_time", str(segment_seconds), "-hls_playlist_type", "vod",
+            "-hls_segment_type", "fmp4", "-hls_fmp4_init_filename", "init.mp4",
+            "-hls_segment_filename", str(target / "seg_%03d.m4s"), str(playlist),
+        )
+    return playlist
+
+
+def fixtures_dir() -> Path:
+    base = os.environ.get("BENCH_FIXTURES_DIR", "").strip()
+    return Path(base) if base else Path(__file__).resolve().parent / "fixtures"
@@ -0,0 +1,362 @@
+# -*- coding: utf-8 -*-
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+from benchmarks.measure import percentile
+
+SYSTEMS = ("removebg", "dedup", "yt_download_mp4", "yt_download_mp3")
+GUILD_ID = 100
+CHANNEL_IDS = {"removebg": 201, "dedup": 202, "yt_download_mp4": 203, "yt_download_mp3": 204}
+_ids = itertools.count(10_000)
+
+
+# Replies from cogs.utils.admission when a submission is turned away.
+REJECTION_MARKERS = ("Please try again in", "requests in the queue", "low on disk space")
+
+
+class StubMessage:
+    def __init__(self, recorder: "Recorder", channel: "StubChannel", origin_id: Optional[int], content: Optional[str]):
+        self.id = next(_ids)
+        self._recorder = recorder
+        self.channel = channel
+        self.origin_id = origin_id
+        self.content = content
+
+    async def edit(self, content=None, **kwargs):
+        self.content = content
+        self._recorder.event(self.origin_id, "edit", content)
+        return self
+
+    async def reply(self, content=None, **kwargs):
+        return await self.channel.send(content, _origin_id=self.origin_id or self.id, **kwargs)
+
+    async def delete(self):
+        self._recorder.event(self.origin_id or self.id, "delete", None)
+
+    async def pin(self):
+        pass
+
+
+class StubChannel:
+    def __init__(self, recorder: "Recorder", channel_id: int):
+        self.id = channel_id
+        self.mention = f"<#{channel_id}>"
+        self._recorder = recorder
+        self._messages: Dict[int, StubMessage] = {}
+
+    async def send(self, content=None, _origin_id=None, **kwargs):
+        msg = StubMessage(self._recorder, self, _origin_id, content)
+        self._messages[msg.id] = msg
+        kind = "result" if kwargs.get("view") is not None or kwargs.get("files") or kwargs.get("file") else "send"
+        self._recorder.event(_origin_id, kind, content)
+        return msg
+
+    async def fetch_message(self, message_id: int):
+        msg = self._messages.get(message_id)
+        if msg is None:
+            raise LookupError(message_id)
+        return msg
+
+
+class FakeAttachment:
+    def __init__(self, data: bytes, filename: str, content_type: str):
+        self._data = data
+        self.size = len(data)
+        self.filename = filename
+        self.content_type = content_type
+
+    async def read(self):
+        return self._data
+
+
+class _Obj:
+    def __init__(self, **kw):
+        self.__dict__.update(kw)
+
+
+class Recorder:
+    def __init__(self):
+        self.t0 = time.perf_counter()
+        self.injected: Dict[int, dict] = {}
+        self.events: Dict[int, List[tuple]] = {}
+
+    def now(self) -> float:
+        return time.perf_counter() - self.t0
+
+    def event(self, origin_id: Optional[int], kind: str, content: Optional[str]) -> None:
+        if origin_id is None:
+            return
+        self.events.setdefault(origin_id, []).append((self.now(), kind, content))
+
+    def finished(self, origin_id: int) -> Optional[float]:
+        for t, kind, content in reversed(self.events.get(origin_id, [])):
+            if kind in ("delete", "result"):
+                return t
+            if kind in ("edit", "send") and content and (
+                content.startswith("Done") or "failed" in content.lower() or "too large" in content.lower()
+            ):
+                return t
+            if kind == "send" and content and "Could not add to queue" in content:
+                return t
+        return None
+
+    def coalesced(self, origin_id: int) -> bool:
+        return any(
+            kind == "send" and content and "already in the queue" in content
+            for _, kind, content in self.events.get(origin_id, [])
+        )
+
+    def rejected(self, origin_id: int) -> bool:
+        return any(
+            kind == "send" and content and any(marker in content for marker in REJECTION_MARKERS)
+            for _, kind, content in self.events.get(origin_id, [])
+        )
+
+
+def _install_stub_processors(work_seconds: Dict[str, float], systems) -> None:
+    import cogs.commands.mediaprocessing.removebg as removebg_mod
+    import cogs.commands.mediaprocessing.dedup as dedup_mod
+    import cogs.utils.yt_downloader as yt_mod
+
+    async def process_removebg_from_path(file_path, *args, **kwargs):
+        await asyncio.to_thread(time.sleep, work_seconds["removebg"])
+        return b"\x89PNG\r\n\x1a\n" + b"\0" * 1024, None
+
+    async def process_dedup_from_path(input_path, *args, **kwargs):
+        await asyncio.to_thread(time.sleep, work_seconds["dedup"])
+        out = os.path.join(os.path.dirname(input_path), "output_dedup.mp4")
+        with open(out, "wb") as f:
+            f.write(b"\0" * 2048)
+        return out, None, {"originalFrames": 48, "duplicateFrames": 24, "uniqueFrames": 24}
+
+    def _fake_download(system):
+        def _download(url, output_dir, *args, **kwargs):
+            time.sleep(work_seconds[system])
+            os.makedirs(output_dir, exist_ok=True)
+            path = os.path.join(str(output_dir), "result.webm" if system == "yt_download_mp4" else "result.mp3")
+            with open(path, "wb") as f:
+                f.write(b"\0" * 4096)
+            return path
+        return _download
+
+    if "removebg" in systems:
+        removebg_mod.process_removebg_from_path = process_removebg_from_path
+    if "dedup" in systems:
+        dedup_mod.process_dedup_from_path = process_dedup_from_path
+    def plan_download(url, kind, limit_bytes, max_height=1080, audio_mode="mp3", clip=None):
+        return {"mode": "mp3", "format": None, "bitrate": "320", "height": max_height, "bytes": None, "clip": clip}
+
+    if "yt_download_mp4" in systems or "yt_download_mp3" in systems:
+        yt_mod.plan_download = plan_download
+    if "yt_download_mp4" in systems:
+        yt_mod.download_video_mp4 = _fake_download("yt_download_mp4")
+    if "yt_download_mp3" in systems:
+        yt_mod.download_audio_mp3 = _fake_download("yt_download_mp3")
+
+
+def _payload(system: str, real_inputs: Dict[str, bytes], seq: int) -> dict:
+    # Real inputs get a per-message suffix (bytes after PNG IEND, an MP4 "free"
+    # box) so they only coalesce when --duplicate-ratio asks for it.
+    unique = seq.to_bytes(8, "big")
+    if system == "removebg":
+        data = real_inputs["removebg"] + unique if "removebg" in real_inputs else b"\x89PNG\r\n\x1a\n" + os.urandom(2048)
+        return {"content": "", "attachments": [FakeAttachment(data, f"img{seq}.png", "image/png")]}
+    if system == "dedup":
+        if "dedup" in real_inputs:
+            data = real_inputs["dedup"] + (16).to_bytes(4, "big") + b"free" + unique
+        else:
+            data = os.urandom(4096)
+        return {"content": "", "attachments": [FakeAttachment(data, f"clip{seq}.mp4", "video/mp4")]}
+    video_id = "".join(random.choice("abcdefghijklmnopqrstuvwxyz0123456789") for _ in range(11))
+    return {"content": f"https://www.youtube.com/watch?v={video_id}", "attachments": []}
+
+
+async def _loop_lag_sampler(recorder: Recorder, samples: list, stop: asyncio.Event, interval: float = 0.1):
+    while not stop.is_set():
+        t = time.perf_counter()
+        await asyncio.sleep(interval)
+        samples.append((round(recorder.now(), 3), round((time.perf_counter() - t - interval) * 1000, 2)))
+
+
+async def _queue_depth_sampler(bot_module, recorder: Recorder, samples: list, stop: asyncio.Event, interval: float):
+    while not stop.is_set():
+        depth = {s: bot_module.count_pending(bot_module.bot.connection, s) for s in SYSTEMS}
+        samples.append((round(recorder.now(), 3), depth))
+        await asyncio.sleep(interval)
+
+
+async def run_load(args) -> dict:
+    os.environ.setdefault("DISCORD_TOKEN", "loadgen")
+    import bot as bot_module
+    from benchmarks.sqlite_db import create_sqlite_queue
+
+    recorder = Recorder()
+    bot = bot_module.bot
+    if args.mysql and bot_module.connection is not None:
+        conn = bot_module.connection
+    else:
+        conn = create_sqlite_queue(args.sqlite_path)
+    bot_module.connection = conn
+    bot.connection = conn
+    bot.queue_uploads_dir = tempfile.mkdtemp(prefix="tps_loadgen_")
+    for sub in ("removebg", "dedup", "yt_download"):
+        os.makedirs(os.path.join(bot.queue_uploads_dir, sub), exist_ok=True)
+
+    channels = {cid: StubChannel(recorder, cid) for cid in CHANNEL_IDS.values()}
+    bot.channels_cache = {str(GUILD_ID): dict(CHANNEL_IDS)}
+    bot.get_channel = lambda cid: channels.get(cid)
+
+    async def _no_commands(message):
+        return None
+
+    bot.process_commands = _no_commands
+
+    real_inputs: Dict[str, bytes] = {}
+    work_seconds = {s: args.work_seconds for s in SYSTEMS}
+    if args.mode == "real":
+        # YouTube always stays stubbed: the submit channels only accept real YouTube URLs.
+        from benchmarks.fixtures import fixtures_dir, make_images, make_videos
+        real_inputs["removebg"] = make_images(fixtures_dir() / "images", sizes=[(1280, 720)])[0].read_bytes()
+        real_inputs["dedup"] = make_videos(fixtures_dir() / "videos", duration=2)["twos"]["path"].read_bytes()
+        _install_stub_processors(work_seconds, ("yt_download_mp4", "yt_download_mp3"))
+    else:
+        _install_stub_processors(work_seconds, SYSTEMS)
+
+    workers = [
+        asyncio.create_task(bot_module._worker_removebg()),
+        asyncio.create_task(bot_module._worker_dedup()),
+        asyncio.create_task(bot_module._worker_yt_download()),
+    ]
+    stop = asyncio.Event()
+    lag_samples: list = []
+    depth_samples: list = []
+    samplers = [
+        asyncio.create_task(_loop_lag_sampler(recorder, lag_samples, stop)),
+        asyncio.create_task(_queue_depth_sampler(bot_module, recorder, depth_samples, stop, args.sample_interval)),
+    ]
+
+    rng = random.Random(args.seed)
+    random.seed(args.seed)
+    author = _Obj(id=1, bot=False, mention="<@1>")
+    guild = _Obj(id=GUILD_ID, premium_subscription_count=0)
+    seq = 0
+    last_payload: Dict[str, dict] = {}
+    deadline = time.perf_counter() + args.duration
+    while time.perf_counter() < deadline:
+        await asyncio.sleep(rng.expovariate(args.rate))
+        system = rng.choice(args.systems)
+        seq += 1
+        channel = channels[CHANNEL_IDS[system]]
+        if system in last_payload and rng.random() < args.duplicate_ratio:
+            prev = last_payload[system]
+            payload = {
+                "content": prev["content"],
+                "attachments": [FakeAttachment(a._data, a.filename, a.content_type) for a in prev["attachments"]],
+            }
+        else:
+            payload = _payload(system, real_inputs, seq)
+            last_payload[system] = payload
+        message = StubMessage(recorder, channel, None, payload["content"])
+        message.origin_id = message.id
+        channel._messages[message.id] = message
+        message.author = _Obj(id=1000 + seq % args.users, bot=False, mention=f"<@{1000 + seq % args.users}>")
+        message.guild = guild
+        message.attachments = payload["attachments"]
+        recorder.injected[message.id] = {"system": system, "t": recorder.now()}
+        await bot_module.on_message(message)
+
+    drain_deadline = time.perf_counter() + args.drain_timeout
+    while time.perf_counter() < drain_deadline:
+        if all(recorder.finished(mid) is not None or recorder.rejected(mid) for mid in recorder.injected):
+            break
+        await asyncio.sleep(0.2)
+
+    stop.set()
+    for task in workers + samplers:
+        task.cancel()
+    await asyncio.gather(*workers, *samplers, return_exceptions=True)
+
+    per_system: Dict[str, list] = {}
+    unfinished = 0
+    rejected: Dict[str, int] = {}
+    for mid, info in recorder.injected.items():
+        if recorder.rejected(mid):
+            rejected[info["system"]] = rejected.get(info["system"], 0) + 1
+            continue
+        done_at = recorder.finished(mid)
+        if done_at is None:
+            unfinished += 1
+            continue
+        per_system.setdefault(info["system"], []).append(done_at - info["t"])
+    latency = {
+        system: {
+            "count": len(vals),
+            "p50_s": round(percentile(vals, 50), 3),
+            "p95_s": round(percentile(vals, 95), 3),
+            "p99_s": round(percentile(vals, 99), 3),
+            "max_s": round(max(vals), 3),
+        }
+        for system, vals in per_system.items()
+    }
+    lags = [lag for _, lag in lag_samples]
+    return {
+        "mode": args.mode,
+        "rate_per_s": args.rate,
+        "duration_s": args.duration,
+        "injected": len(recorder.injected),
+        "unfinished": unfinished,
+        "rejected": rejected,
+        "coalesced": sum(1 for mid in recorder.injected if recorder.coalesced(mid)),
+        "latency": latency,
+        "loop_lag_ms": {
+            "p50": round(percentile(lags, 50), 2),
+            "p95": round(percentile(lags, 95), 2),
+            "max": round(max(lags), 2) if lags else 0.0,
+            "series": lag_samples,
+        },
+        "queue_depth": depth_samples,
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.loadgen",
+        description="Soak-test on_message -> queue -> workers -> result posts without Discord.",
+    )
+    parser.add_argument("--rate", type=float, default=2.0, help="Injected messages per second (Poisson)")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds of injection")
+    parser.add_argument("--systems", nargs="+", choices=SYSTEMS, default=list(SYSTEMS))
+    parser.add_argument("--users", type=int, default=20, help="Distinct synthetic authors")
+    parser.add_argument("--mode", choices=("stub", "real"), default="stub",
+                        help="stub: processors sleep --work-seconds; real: run removebg/dedup for real")
+    parser.add_argument("--work-seconds", type=float, default=0.5)
+    parser.add_argument("--mysql", action="store_true", help="Use the MySQL from .env instead of SQLite")
+    parser.add_argument("--sqlite-path", default=":memory:")
+    parser.add_argument("--sample-interval", type=float, default=1.0)
+    parser.add_argument("--drain-timeout", type=float, default=300.0)
+    parser.add_argument("--duplicate-ratio", type=float, default=0.0,
+                        help="Chance a message repeats the previous payload for its system (exercises coalescing)")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--output", help="Write the JSON report to this file (default: stdout)")
+    args = parser.parse_args(argv)
+
+    report = asyncio.run(run_load(args))
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
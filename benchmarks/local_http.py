@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+import os
+import re
+import threading
+import time
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+_RANGE_RE = re.compile(r"bytes=(\d*)-(\d*)")
+
+
+class _RangeHandler(SimpleHTTPRequestHandler):
+    # Set per server: first-byte delay and a per-connection bandwidth cap, to
+    # mimic a CDN where parallel fragment requests beat one long stream.
+    latency_s = 0.0
+    bytes_per_s = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_head(self):
+        if self.latency_s:
+            time.sleep(self.latency_s)
+        path = self.translate_path(self.path)
+        if not os.path.isfile(path):
+            return super().send_head()
+        size = os.path.getsize(path)
+        m = _RANGE_RE.fullmatch(self.headers.get("Range", "").strip())
+        f = open(path, "rb")
+        if not m or (not m.group(1) and not m.group(2)):
+            self.send_response(200)
+            self.send_header("Content-Type", self.guess_type(path))
+            self.send_header("Content-Length", str(size))
+            self.send_header("Accept-Ranges", "bytes")
+            self.end_headers()
+            self._remaining = size
+            return f
+        if m.group(1):
+            start = int(m.group(1))
+            end = min(int(m.group(2)), size - 1) if m.group(2) else size - 1
+        else:
+            start = max(0, size - int(m.group(2)))
+            end = size - 1
+        if start >= size or start > end:
+            f.close()
+            self.send_error(416)
+            return None
+        f.seek(start)
+        self.send_response(206)
+        self.send_header("Content-Type", self.guess_type(path))
+        self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        self.send_header("Content-Length", str(end - start + 1))
+        self.send_header("Accept-Ranges", "bytes")
+        self.end_headers()
+        self._remaining = end - start + 1
+        return f
+
+    def copyfile(self, source, outputfile):
+        remaining = getattr(self, "_remaining", None)
+        while remaining is None or remaining > 0:
+            chunk = source.read(64 * 1024 if remaining is None else min(64 * 1024, remaining))
+            if not chunk:
+                break
+            try:
+                outputfile.write(chunk)
+            except (BrokenPipeError, ConnectionResetError):
+                return
+            if self.bytes_per_s:
+                time.sleep(len(chunk) / self.bytes_per_s)
+            if remaining is not None:
+                remaining -= len(chunk)
+
+
+class LocalMediaServer:
+    def __init__(self, root: Path, host: str = "127.0.0.1", port: int = 0, latency_ms: float = 0, kbps: float = 0):
+        root = str(Path(root).resolve())
+        handler_cls = type("_ShapedHandler", (_RangeHandler,), {
+            "latency_s": latency_ms / 1000.0,
+            "bytes_per_s": kbps * 1000 / 8 if kbps else None,
+        })
+        handler = lambda *a, **kw: handler_cls(*a, directory=root, **kw)
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def url_for(self, name: str) -> str:
+        return f"{self.base_url}/{name}"
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        return False
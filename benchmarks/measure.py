@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+import os
+import threading
+import time
+from typing import Callable, List, Optional
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * pct / 100.0
+    lo = int(k)
+    hi = min(lo + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+def _cpu_seconds() -> float:
+    if resource is None:
+        return time.process_time()
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return own.ru_utime + own.ru_stime + children.ru_utime + children.ru_stime
+
+
+class RssSampler:
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _current(self) -> int:
+        if psutil is None:
+            return 0
+        proc = psutil.Process(os.getpid())
+        total = proc.memory_info().rss
+        for child in proc.children(recursive=True):
+            try:
+                total += child.memory_info().rss
+            except Exception:
+                pass
+        return total
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.peak = max(self.peak, self._current())
+            except Exception:
+                pass
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join(timeout=1)
+        if not self.peak and resource is not None:
+            # ru_maxrss is KiB on Linux, bytes on macOS.
+            rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            self.peak = rss if rss > 1 << 32 else rss * 1024
+        return False
+
+
+def run_case(
+    name: str,
+    fn: Callable[[], Optional[dict]],
+    runs: int,
+    warmup: int = 1,
+    units: Optional[float] = None,
+    unit_name: str = "items",
+) -> dict:
+    for _ in range(max(0, warmup)):
+        fn()
+    latencies = []
+    extra = None
+    with RssSampler() as sampler:
+        cpu_start = _cpu_seconds()
+        wall_start = time.perf_counter()
+        for _ in range(max(1, runs)):
+            t = time.perf_counter()
+            extra = fn()
+            latencies.append(time.perf_counter() - t)
+        wall = time.perf_counter() - wall_start
+        cpu = _cpu_seconds() - cpu_start
+    per_run_units = units if units is not None else 1.0
+    result = {
+        "name": name,
+        "runs": len(latencies),
+        "p50_s": round(percentile(latencies, 50), 4),
+        "p95_s": round(percentile(latencies, 95), 4),
+        "mean_s": round(sum(latencies) / len(latencies), 4),
+        "throughput_per_s": round(per_run_units * len(latencies) / wall, 3) if wall > 0 else None,
+        "throughput_unit": unit_name,
+        "cpu_s": round(cpu, 3),
+        "peak_rss_mb": round(sampler.peak / (1024 * 1024), 1),
+    }
+    if extra:
+        result["details"] = extra
+    return result
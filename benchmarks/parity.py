@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+from benchmarks.fixtures import fixtures_dir, make_videos
+
+VIDEO_EXTENSIONS = (".mp4", ".mov", ".avi", ".mkv", ".webm")
+COMPARE_WIDTH = 160
+# Both outputs are lossy encodes of the same source frames; a kept/dropped frame
+# mismatch shifts the sequence and shows up far above this.
+FRAME_MATCH_LEVELS = 4.0
+
+
+def _frames(path: str) -> np.ndarray:
+    height = COMPARE_WIDTH * 9 // 16
+    out = subprocess.run(
+        [
+            "ffmpeg", "-loglevel", "error", "-i", path, "-an", "-sn",
+            "-vf", f"scale={COMPARE_WIDTH}:{height}:flags=area,format=gray",
+            "-fps_mode", "passthrough", "-f", "rawvideo", "-pix_fmt", "gray", "-",
+        ],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True,
+    ).stdout
+    return np.frombuffer(out, dtype=np.uint8).reshape(-1, height, COMPARE_WIDTH).astype(np.float32)
+
+
+def compare_outputs(reference: str, candidate: str) -> dict:
+    """Frame-by-frame comparison of two dedup outputs; ``first_mismatch`` is None when they match."""
+    a, b = _frames(reference), _frames(candidate)
+    n = min(len(a), len(b))
+    diffs = np.abs(a[:n] - b[:n]).mean(axis=(1, 2)) if n else np.zeros(0)
+    bad = np.flatnonzero(diffs > FRAME_MATCH_LEVELS)
+    first = int(bad[0]) if bad.size else (n if len(a) != len(b) else None)
+    return {
+        "reference_frames": len(a),
+        "candidate_frames": len(b),
+        "first_mismatch": first,
+        "max_frame_diff": float(diffs.max()) if n else 0.0,
+    }
+
+
+def _clips(paths) -> list:
+    clips = []
+    for p in map(Path, paths):
+        if p.is_dir():
+            clips.extend(sorted(c for c in p.iterdir() if c.suffix.lower() in VIDEO_EXTENSIONS))
+        elif p.is_file():
+            clips.append(p)
+    return clips
+
+
+def _run(engine: str, clip: Path, preset: str, work: str):
+    from cogs.commands.mediaprocessing.dedup import _run_dedup_sync
+    input_path = os.path.join(work, f"{engine}_input{clip.suffix.lower()}")
+    output_path = os.path.join(work, f"{engine}_output.mp4")
+    shutil.copyfile(clip, input_path)
+    start = time.perf_counter()
+    stats = _run_dedup_sync(input_path, output_path, preset=preset, engine=engine)
+    return output_path, stats, time.perf_counter() - start
+
+
+def check_preset(clips: list, preset: str) -> dict:
+    results = []
+    for clip in clips:
+        work = tempfile.mkdtemp(prefix="tps_parity_")
+        try:
+            ref_out, ref_stats, ref_s = _run("original", clip, preset, work)
+            new_out, new_stats, new_s = _run("tiered", clip, preset, work)
+            r = compare_outputs(ref_out, new_out)
+        finally:
+            shutil.rmtree(work, ignore_errors=True)
+        r.update(clip=str(clip), original_s=round(ref_s, 3), tiered_s=round(new_s, 3))
+        results.append(r)
+    return {"passed": all(r["first_mismatch"] is None for r in results), "clips": results}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.parity",
+        description=(
+            "Run the original remove_duplicate_frames script and the tiered engine on the same clips and "
+            "compare their outputs frame by frame. Passing presets are recorded so DEDUP_ENGINE=auto uses "
+            "the tiered engine for them."
+        ),
+    )
+    parser.add_argument("clips", nargs="*", help="Real clips (files or folders) to check; required to record a pass")
+    parser.add_argument("--presets", nargs="+", default=["fast", "balanced", "precise"])
+    parser.add_argument("--no-record", action="store_true", help="Report only; don't update the parity record")
+    args = parser.parse_args(argv)
+
+    from cogs.commands.mediaprocessing.dedup import engine_fingerprint, save_parity_result
+    if engine_fingerprint(args.presets[0]) is None:
+        print("The original script is not available: set DEDUP_PYTHON_PATH to the folder with remove_duplicate_frames.py.")
+        return 2
+    clips = _clips(args.clips)
+    record = bool(clips) and not args.no_record
+    if not clips:
+        # Synthetic fixtures are a smoke test only; they never unlock the tiered engine.
+        clips = [v["path"] for v in make_videos(fixtures_dir() / "videos").values()]
+    failures = 0
+    for preset in args.presets:
+        result = check_preset(clips, preset)
+        failures += not result["passed"]
+        for r in result["clips"]:
+            status = "ok" if r["first_mismatch"] is None else f"MISMATCH at output frame {r['first_mismatch']}"
+            print(
+                f"{preset}/{Path(r['clip']).name}: {status}; frames {r['candidate_frames']}/{r['reference_frames']}, "
+                f"{r['original_s']:.2f}s -> {r['tiered_s']:.2f}s"
+            )
+        if record:
+            save_parity_result(preset, {
+                "passed": result["passed"],
+                "fingerprint": engine_fingerprint(preset),
+                "clips": len(clips),
+                "checked_at": datetime.now().isoformat(timespec="seconds"),
+            })
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+import re
+import sqlite3
+import threading
+
+from cogs.utils import db as bot_db
+
+_INLINE_INDEX_RE = re.compile(r",\s*(?:UNIQUE\s+)?(?:INDEX|KEY)\s+\w+\s*\([^)]*\)", re.IGNORECASE)
+_ON_DUPLICATE_RE = re.compile(r"\s+ON DUPLICATE KEY UPDATE\s+(.*)$", re.IGNORECASE | re.DOTALL)
+
+
+def _error_cls():
+    return bot_db.Error if isinstance(bot_db.Error, type) else sqlite3.Error
+
+
+def _translate(sql: str, params):
+    params = tuple(params or ())
+    sql = sql.strip()
+    upper = sql.upper()
+    if upper.startswith("CREATE TABLE"):
+        sql = sql.replace("INT AUTO_INCREMENT PRIMARY KEY", "INTEGER PRIMARY KEY AUTOINCREMENT")
+        sql = _INLINE_INDEX_RE.sub("", sql)
+        sql = re.sub(r"\s+ON UPDATE CURRENT_TIMESTAMP", "", sql, flags=re.IGNORECASE)
+    m = _ON_DUPLICATE_RE.search(sql)
+    if m:
+        dropped = m.group(1).count("%s")
+        sql = "INSERT OR REPLACE" + sql[: m.start()][len("INSERT"):]
+        if dropped:
+            params = params[:-dropped]
+    sql = re.sub(r"\s+FOR UPDATE\b", "", sql, flags=re.IGNORECASE)
+    return sql.replace("%s", "?"), params
+
+
+class SqliteCursor:
+    def __init__(self, conn: "SqliteQueueConnection"):
+        self._conn = conn
+        self._cur = conn._db.cursor()
+
+    @property
+    def lastrowid(self):
+        return self._cur.lastrowid
+
+    @property
+    def rowcount(self):
+        return self._cur.rowcount
+
+    def execute(self, sql: str, params=None):
+        sql, params = _translate(sql, params)
+        try:
+            with self._conn._lock:
+                self._cur.execute(sql, params)
+        except sqlite3.Error as e:
+            raise _error_cls()(str(e))
+
+    def fetchone(self):
+        return self._cur.fetchone()
+
+    def fetchall(self):
+        return self._cur.fetchall()
+
+    def close(self):
+        self._cur.close()
+
+
+class SqliteQueueConnection:
+    def __init__(self, path: str = ":memory:"):
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._lock = threading.RLock()
+        self._in_tx = False
+
+    def cursor(self):
+        return SqliteCursor(self)
+
+    def is_connected(self):
+        return True
+
+    def start_transaction(self):
+        with self._lock:
+            if not self._in_tx:
+                self._db.execute("BEGIN IMMEDIATE")
+                self._in_tx = True
+
+    def commit(self):
+        with self._lock:
+            if self._in_tx:
+                self._db.execute("COMMIT")
+                self._in_tx = False
+
+    def rollback(self):
+        with self._lock:
+            if self._in_tx:
+                self._db.execute("ROLLBACK")
+                self._in_tx = False
+
+
+def create_sqlite_queue(path: str = ":memory:") -> SqliteQueueConnection:
+    conn = SqliteQueueConnection(path)
+    for schema in bot_db.TABLE_SCHEMAS.values():
+        cursor = conn.cursor()
+        cursor.execute(schema)
+        cursor.close()
+    return conn
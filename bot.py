@@ -4,23 +4,36 @@ import os
 import platform
 import logging
 import re
+import shutil
+import time
 import uuid
 from datetime import datetime
+from functools import partial
 from typing import Optional
 
 YT_URL_PATTERN = re.compile(
     r"https?://(?:www\.)?(?:youtube\.com/(?:watch\?v=|shorts/)|youtu\.be/)[\w-]+",
     re.IGNORECASE,
 )
-
-import discord
-from discord import app_commands
-from discord.ext import commands
+YT_PLAYLIST_PATTERN = re.compile(r"https?://(?:www\.|m\.)?youtube\.com/playlist\?list=[\w-]+", re.IGNORECASE)
+# Trailing word in an MP3-channel message that overrides the server's audio mode.
+YT_AUDIO_MODE_PATTERN = re.compile(r"(?:^|\s)(original|mp3)(?:\s|$)", re.IGNORECASE)
+# Word in a Remove BG submission that overrides the server's output format.
+REMOVEBG_FORMAT_PATTERN = re.compile(r"(?:^|\s)(auto|png|webp|mask)(?:\s|$)", re.IGNORECASE)
 
 _bot_dir = os.path.dirname(os.path.abspath(__file__))
 from dotenv import load_dotenv
 load_dotenv(os.path.join(_bot_dir, ".env"))
 
+# Installed before discord.py so the startup report covers every import.
+from cogs.utils.startup import PROCESS_START, import_profiler, warm_up
+if (os.environ.get("IMPORT_PROFILE", "") or "").strip().lower() in ("1", "true", "yes", "on"):
+    import_profiler.install()
+
+import discord
+from discord import app_commands
+from discord.ext import commands
+
 from cogs.utils.db import (
     initialize_database,
     load_channels_from_db,
@@ -29,7 +42,23 @@ from cogs.utils.db import (
     get_next_pending,
     set_queue_job_completed,
     set_queue_job_failed,
+    load_dedup_presets_from_db,
+    load_yt_audio_modes_from_db,
+    load_removebg_formats_from_db,
+    record_dedup_timing,
+    set_queue_job_timings,
+    attach_to_active_job,
+    pop_queue_subscribers,
+    save_metrics_rollup,
+    load_metrics_rollup,
 )
+from cogs.utils.tracing import JobTrace, export_trace
+from cogs.utils.metrics import RETENTION_SECONDS, metrics
+from cogs.utils.resource_monitor import ResourceMonitor
+from cogs.utils.admission import check_admission, submission_priority
+from cogs.utils.content_keys import file_content_key, url_content_key
+from cogs.utils.command_sync import SYNC_MODES, sync_command_tree
+from cogs.utils.setup_message import close_image_session, configure_image_cache, prefetch_images
 
 BOT_LOGO = (os.environ.get("BOT_LOGO", "").strip() or None)
 TOKEN = os.environ.get("DISCORD_TOKEN", "").strip()
@@ -43,9 +72,17 @@ connection = initialize_database()
 if connection is None:
     logger.warning("MySQL not configured. Set MYSQL_* in .env. Channel setup disabled.")
 
+class AEScriptsBot(commands.Bot):
+    async def close(self):
+        # bot.run() ends through close(); release the setup-image HTTP session with it.
+        try:
+            await close_image_session()
+        finally:
+            await super().close()
+
 intents = discord.Intents.default()
 intents.message_content = True
-bot = commands.Bot(command_prefix="!", intents=intents)
+bot = AEScriptsBot(command_prefix="!", intents=intents)
 bot.connection = connection
 bot.BOT_LOGO = BOT_LOGO
 bot.channels_cache = load_channels_from_db(connection) if connection else {}
@@ -56,6 +93,54 @@ bot.max_dedup_size_mb_env = int(_env_max_dedup) if _env_max_dedup.isdigit() else
 bot.removebg_max_dimension = int(os.environ.get("REMOVEBG_MAX_DIMENSION", "1024") or "1024")
 bot.removebg_timeout_seconds = float(os.environ.get("REMOVEBG_TIMEOUT_SECONDS", "120") or "120")
 bot.removebg_model = (os.environ.get("REMOVEBG_MODEL", "u2netp") or "u2netp").strip().lower()
+bot.removebg_max_frames = int(os.environ.get("REMOVEBG_MAX_FRAMES", "200") or "200")
+bot.removebg_max_animated_pixels = int(float(os.environ.get("REMOVEBG_MAX_ANIMATED_MEGAPIXELS", "50") or "50") * 1_000_000)
+bot.removebg_default_format = (os.environ.get("REMOVEBG_OUTPUT_FORMAT", "auto") or "auto").strip().lower()
+bot.removebg_formats_cache = load_removebg_formats_from_db(connection) if connection else {}
+bot.dedup_max_buffer_mb = int(os.environ.get("DEDUP_MAX_BUFFER_MB", "256") or "256")
+bot.dedup_default_preset = (os.environ.get("DEDUP_DEFAULT_PRESET", "balanced") or "balanced").strip().lower()
+bot.dedup_engine = (os.environ.get("DEDUP_ENGINE", "auto") or "auto").strip().lower()
+if bot.dedup_engine not in ("auto", "original", "tiered"):
+    bot.dedup_engine = "auto"
+bot.dedup_presets_cache = load_dedup_presets_from_db(connection) if connection else {}
+bot.yt_audio_default_mode = (os.environ.get("YT_AUDIO_DEFAULT_MODE", "mp3") or "mp3").strip().lower()
+bot.yt_audio_modes_cache = load_yt_audio_modes_from_db(connection) if connection else {}
+bot.trace_file = (os.environ.get("TRACE_FILE", "") or "").strip() or None
+bot.queue_wait_budget_seconds = float(os.environ.get("QUEUE_WAIT_BUDGET_SECONDS", "900") or "900")
+bot.queue_wait_warn_seconds = float(os.environ.get("QUEUE_WAIT_WARN_SECONDS", "120") or "120")
+bot.queue_priority_aging_seconds = float(os.environ.get("QUEUE_PRIORITY_AGING_SECONDS", "120") or "120")
+bot.queue_priority_role_ids = {
+    int(part) for part in (os.environ.get("QUEUE_PRIORITY_ROLE_IDS", "") or "").split(",") if part.strip().isdigit()
+}
+bot.max_inflight_per_user = int(os.environ.get("MAX_INFLIGHT_PER_USER", "2") or "2")
+bot.min_free_disk_mb = int(os.environ.get("MIN_FREE_DISK_MB", "1024") or "1024")
+def _env_int(name: str) -> Optional[int]:
+    value = (os.environ.get(name, "") or "").strip()
+    return int(value) if value.isdigit() else None
+
+bot.yt_download_tuning = {
+    "concurrent_fragment_downloads": _env_int("YT_CONCURRENT_FRAGMENTS"),
+    "http_chunk_size": (_env_int("YT_HTTP_CHUNK_SIZE_MB") or 20) * 1024 * 1024,
+    "socket_timeout": _env_int("YT_SOCKET_TIMEOUT"),
+    "retries": _env_int("YT_RETRIES"),
+    "fragment_retries": _env_int("YT_RETRIES"),
+    "adaptive": (os.environ.get("YT_ADAPTIVE_FRAGMENTS", "") or "").strip().lower() in ("1", "true", "yes", "on"),
+    "max_fragments": _env_int("YT_MAX_FRAGMENTS"),
+    "cachedir": (os.environ.get("YT_CACHE_DIR", "") or "").strip() or os.path.join(_bot_dir, ".cache", "yt-dlp"),
+}
+bot.yt_playlist_max_items = int(os.environ.get("YT_PLAYLIST_MAX_ITEMS", "25") or "25")
+bot.yt_playlist_concurrency = int(os.environ.get("YT_PLAYLIST_CONCURRENCY", "3") or "3")
+bot.startup_warmup = (os.environ.get("STARTUP_WARMUP", "true") or "true").strip().lower() in ("1", "true", "yes", "on")
+bot.command_sync_mode = (os.environ.get("COMMAND_SYNC", "auto") or "auto").strip().lower()
+if bot.command_sync_mode not in SYNC_MODES:
+    bot.command_sync_mode = "auto"
+bot.command_sync_guild_ids = [
+    int(part) for part in (os.environ.get("COMMAND_SYNC_GUILD_IDS", "") or "").split(",") if part.strip().isdigit()
+]
+bot.metrics_flush_seconds = float(os.environ.get("METRICS_FLUSH_SECONDS", "60") or "60")
+bot.metrics = metrics
+if connection:
+    metrics.load_rows(load_metrics_rollup(connection, int(time.time()) - RETENTION_SECONDS))
 
 bot.removebg_setup_title = (os.environ.get("REMOVEBG_SETUP_TITLE", "") or "").strip() or "Remove Background System"
 bot.dedup_setup_title = (os.environ.get("DEDUP_SETUP_TITLE", "") or "").strip() or "Remove Duplicate Frames System"
@@ -69,6 +154,7 @@ bot.yt_download_mp4_setup_title = (os.environ.get("YT_DOWNLOAD_MP4_SETUP_TITLE",
 bot.yt_download_mp4_setup_image_url = (os.environ.get("YT_DOWNLOAD_MP4_SETUP_IMAGE_URL", "") or "").strip() or None
 bot.yt_download_mp3_setup_title = (os.environ.get("YT_DOWNLOAD_MP3_SETUP_TITLE", "") or "").strip() or "YouTube Download (MP3)"
 bot.yt_download_mp3_setup_image_url = (os.environ.get("YT_DOWNLOAD_MP3_SETUP_IMAGE_URL", "") or "").strip() or None
+configure_image_cache(os.path.join(_bot_dir, ".cache", "setup_images"))
 
 _manage_ids_str = (os.environ.get("BOT_MANAGE_USER_IDS", "") or "977190163736322088").strip()
 bot.manage_user_ids = set()
@@ -83,6 +169,10 @@ for sub in ("removebg", "dedup", "yt_download"):
     d = os.path.join(_queue_dir, sub)
     if not os.path.isdir(d):
         os.makedirs(d, exist_ok=True)
+bot.resource_monitor = ResourceMonitor(
+    _queue_dir,
+    interval=float(os.environ.get("RESOURCE_MONITOR_INTERVAL", "5") or "5"),
+)
 
 def bot_get_system_channel(guild_id: int, system: str) -> Optional[int]:
     g = bot.channels_cache.get(str(guild_id), {})
@@ -93,6 +183,36 @@ def reload_channels():
         bot.channels_cache = load_channels_from_db(bot.connection)
 
 bot.reload_channels = reload_channels
+
+def get_dedup_preset(guild_id: int) -> str:
+    return bot.dedup_presets_cache.get(str(guild_id)) or bot.dedup_default_preset
+
+def reload_dedup_presets():
+    if bot.connection:
+        bot.dedup_presets_cache = load_dedup_presets_from_db(bot.connection)
+
+bot.get_dedup_preset = get_dedup_preset
+bot.reload_dedup_presets = reload_dedup_presets
+
+def get_yt_audio_mode(guild_id: int) -> str:
+    return bot.yt_audio_modes_cache.get(str(guild_id)) or bot.yt_audio_default_mode
+
+def reload_yt_audio_modes():
+    if bot.connection:
+        bot.yt_audio_modes_cache = load_yt_audio_modes_from_db(bot.connection)
+
+bot.get_yt_audio_mode = get_yt_audio_mode
+bot.reload_yt_audio_modes = reload_yt_audio_modes
+
+def get_removebg_format(guild_id: int) -> str:
+    return bot.removebg_formats_cache.get(str(guild_id)) or bot.removebg_default_format
+
+def reload_removebg_formats():
+    if bot.connection:
+        bot.removebg_formats_cache = load_removebg_formats_from_db(bot.connection)
+
+bot.get_removebg_format = get_removebg_format
+bot.reload_removebg_formats = reload_removebg_formats
 _ready_once = False
 
 async def _change_status():
@@ -148,26 +268,136 @@ async def _progress_loop(status_msg, prefix: str, interval: float = 2.0):
             pass
         await asyncio.sleep(interval)
 
+async def _frame_progress_loop(status_msg, prefix: str, progress: dict, interval: float = 2.0):
+    last = None
+    while True:
+        total = progress.get("total") or 0
+        done = progress.get("done") or 0
+        if total:
+            text = f"{prefix} **{min(99, done * 100 // total)}%** ({done}/{total} frames)"
+        else:
+            text = f"{prefix} **{done}** frames"
+        if text != last:
+            try:
+                await status_msg.edit(content=text)
+                last = text
+            except Exception:
+                pass
+        await asyncio.sleep(interval)
+
+def _start_job_trace(row, system: str, claim_start: float) -> JobTrace:
+    trace = JobTrace(row[0], system)
+    trace.priority = row[7]
+    enqueued_at = row[6]
+    if enqueued_at:
+        trace.add("enqueue", enqueued_at, claim_start)
+    trace.add("claim", claim_start, time.time())
+    metrics.job_started(system)
+    return trace
+
+def _fail_job(job_id: int, trace: JobTrace, error: str) -> None:
+    trace.error = error
+    set_queue_job_failed(bot.connection, job_id, error)
+
+def _finish_job_trace(job_id: int, trace: JobTrace) -> None:
+    timings = trace.timings()
+    set_queue_job_timings(bot.connection, job_id, timings)
+    export_trace(trace, bot.trace_file)
+    metrics.job_finished(trace.system)
+    metrics.record_startup("first_job", time.time() - PROCESS_START)
+    wait_ms = timings.get("enqueue")
+    metrics.record_job(
+        trace.system,
+        (timings.get("total", 0) - (wait_ms or 0)) / 1000.0,
+        wait_ms / 1000.0 if wait_ms is not None else None,
+        trace.error,
+        trace.priority,
+        timings["encode"] / 1000.0 if "encode" in timings else None,
+    )
+
+async def _fan_out_to_subscribers(job_id: int, trace: JobTrace, results_key: str, label: str, build=None, plain_text: str = ""):
+    # Coalesced duplicate submissions share this job; each gets its own copy of the result.
+    subscribers = pop_queue_subscribers(bot.connection, job_id)
+    if not subscribers:
+        return
+    with trace.span("fanout"):
+        for guild_id, channel_id, author_id, message_id in subscribers:
+            try:
+                if build is None or trace.error:
+                    await _reply_or_send(bot, channel_id, author_id, message_id, f"{label} failed: {trace.error or 'no result'}")
+                    continue
+                results_channel_id = bot_get_system_channel(guild_id, results_key)
+                results_channel = bot.get_channel(results_channel_id) if results_channel_id else None
+                send = results_channel.send if results_channel else None
+                if send is None:
+                    channel = bot.get_channel(channel_id)
+                    if not channel:
+                        continue
+                    send = channel.send
+                    if message_id:
+                        try:
+                            send = (await channel.fetch_message(message_id)).reply
+                        except Exception:
+                            pass
+                view, files = build(requested_by=f"<@{author_id}>")
+                if view is not None:
+                    await send(view=view, files=files)
+                else:
+                    await send(f"**Requested by** <@{author_id}>\n\n{plain_text}", file=files[0])
+                if results_channel:
+                    await _reply_or_send(bot, channel_id, author_id, message_id, f"Done! Your result was sent to {results_channel.mention}.")
+            except Exception as e:
+                logger.warning("Fan-out for job %s to channel %s failed: %s", job_id, channel_id, e)
+
+async def _fail_unstarted_job(job_id: int, system: str, error: str, results_key: str, label: str) -> None:
+    # The job never ran, but coalesced submissions are still waiting on it.
+    set_queue_job_failed(bot.connection, job_id, error)
+    trace = JobTrace(job_id, system)
+    trace.error = error
+    await _fan_out_to_subscribers(job_id, trace, results_key, label)
+
+async def _attach_duplicate(message, content_key: str, priority: int, what: str) -> bool:
+    job_id = attach_to_active_job(
+        connection, content_key, message.guild.id, message.channel.id, message.author.id, message.id, priority,
+    )
+    metrics.record_cache("coalesce", job_id is not None)
+    if job_id is None:
+        return False
+    await message.reply(f"This {what} is already in the queue. I'll reply here with the same result when it's done.")
+    return True
+
+async def _metrics_flush_loop():
+    while True:
+        await asyncio.sleep(bot.metrics_flush_seconds)
+        rows = metrics.dirty_rows()
+        if rows and not save_metrics_rollup(bot.connection, rows, int(time.time()) - RETENTION_SECONDS):
+            metrics.mark_dirty(rows)
+
 async def _worker_removebg():
     from cogs.commands.mediaprocessing.removebg import process_removebg_from_path, build_removebg_layout
+    metrics.register_worker("removebg")
     while True:
         try:
             if not bot.connection:
                 await asyncio.sleep(5)
                 continue
-            row = get_next_pending(bot.connection, "removebg")
+            claim_start = time.time()
+            row = get_next_pending(bot.connection, "removebg", bot.queue_priority_aging_seconds)
             if not row:
                 await asyncio.sleep(2)
                 continue
-            job_id, guild_id, channel_id, author_id, message_id, file_path = row
+            job_id, guild_id, channel_id, author_id, message_id, file_path, _, _, options = row
+            output_format = (options or {}).get("output_format") or get_removebg_format(guild_id)
             channel = bot.get_channel(channel_id)
             if not channel:
-                set_queue_job_failed(bot.connection, job_id, "Channel not found")
+                await _fail_unstarted_job(job_id, "removebg", "Channel not found", "removebg_results", "Remove background")
                 try:
                     os.remove(file_path)
                 except Exception:
                     pass
                 continue
+            trace = _start_job_trace(row, "removebg", claim_start)
+            fan_out_build = None
             try:
                 status_msg = await _send_status_reply(bot, channel_id, author_id, message_id, "Removing background… **0%**")
                 if not status_msg:
@@ -180,6 +410,11 @@ async def _worker_removebg():
                         max_dimension=getattr(bot, "removebg_max_dimension", 1024),
                         timeout_seconds=getattr(bot, "removebg_timeout_seconds", 120.0),
                         model=getattr(bot, "removebg_model", "u2netp"),
+                        trace=trace,
+                        output_format=output_format,
+                        size_limit=_guild_file_size_limit_bytes(guild_id),
+                        max_frames=bot.removebg_max_frames,
+                        max_pixels=bot.removebg_max_animated_pixels,
                     )
                 finally:
                     progress_task.cancel()
@@ -188,20 +423,21 @@ async def _worker_removebg():
                     except asyncio.CancelledError:
                         pass
                 if err:
-                    set_queue_job_failed(bot.connection, job_id, err)
+                    _fail_job(job_id, trace, err)
                     try:
                         await status_msg.edit(content=err)
                     except Exception:
                         await _reply_or_send(bot, channel_id, author_id, message_id, err)
                 else:
                     set_queue_job_completed(bot.connection, job_id)
+                    upload_start = time.time()
                     results_channel_id = bot_get_system_channel(guild_id, "removebg_results")
                     requested_by = f"<@{author_id}>" if results_channel_id else None
-                    view, files = build_removebg_layout(
-                        png_bytes,
-                        footer_text="© TPS Bot (2026) | Remove Background",
-                        requested_by=requested_by,
+                    fan_out_build = partial(
+                        build_removebg_layout, png_bytes, footer_text="© TPS Bot (2026) | Remove Background",
+                        output_format=output_format,
                     )
+                    view, files = fan_out_build(requested_by=requested_by)
                     if results_channel_id:
                         results_channel = bot.get_channel(results_channel_id)
                         if results_channel:
@@ -219,18 +455,23 @@ async def _worker_removebg():
                         else:
                             await channel.send("**Background removed**", file=files[0])
                         done_text = "Done! Background removed."
+                    trace.add("upload", upload_start, time.time())
                     try:
                         await status_msg.edit(content=done_text)
                     except Exception:
                         await _reply_or_send(bot, channel_id, author_id, message_id, done_text)
             except Exception as e:
                 logger.exception("Removebg worker error: %s", e)
-                set_queue_job_failed(bot.connection, job_id, str(e))
+                _fail_job(job_id, trace, str(e))
                 try:
                     await channel.send(f"Remove background failed: {e}")
                 except Exception:
                     pass
             finally:
+                await _fan_out_to_subscribers(
+                    job_id, trace, "removebg_results", "Remove background", fan_out_build, "**Background removed**",
+                )
+                cleanup_start = time.time()
                 try:
                     if os.path.isfile(file_path):
                         os.remove(file_path)
@@ -239,48 +480,74 @@ async def _worker_removebg():
                         os.rmdir(d)
                 except Exception:
                     pass
+                trace.add("cleanup", cleanup_start, time.time())
+                _finish_job_trace(job_id, trace)
         except Exception as e:
             logger.exception("Removebg worker loop: %s", e)
             await asyncio.sleep(5)
 
 async def _worker_dedup():
     from cogs.commands.mediaprocessing.dedup import process_dedup_from_path, _cleanup_tmp, build_dedup_layout
+    metrics.register_worker("dedup")
     while True:
         try:
             if not bot.connection:
                 await asyncio.sleep(5)
                 continue
-            row = get_next_pending(bot.connection, "dedup")
+            claim_start = time.time()
+            row = get_next_pending(bot.connection, "dedup", bot.queue_priority_aging_seconds)
             if not row:
                 await asyncio.sleep(2)
                 continue
-            job_id, guild_id, channel_id, author_id, message_id, file_path = row
+            job_id, guild_id, channel_id, author_id, message_id, file_path, _, _, _ = row
             channel = bot.get_channel(channel_id)
             if not channel:
-                set_queue_job_failed(bot.connection, job_id, "Channel not found")
+                await _fail_unstarted_job(job_id, "dedup", "Channel not found", "dedup_results", "Dedup")
                 _cleanup_tmp(os.path.dirname(file_path))
                 continue
             out = None
+            trace = _start_job_trace(row, "dedup", claim_start)
+            fan_out_build = None
             try:
                 status_msg = await _send_status_reply(bot, channel_id, author_id, message_id, "Removing duplicate frames…")
                 if not status_msg:
                     status_msg = await channel.send("Removing duplicate frames…")
-                out, err, stats = await process_dedup_from_path(file_path, get_max_dedup_size_mb(guild_id))
+                progress = {"done": 0, "total": 0}
+                progress_task = asyncio.create_task(_frame_progress_loop(status_msg, "Removing duplicate frames…", progress))
+                try:
+                    out, err, stats = await process_dedup_from_path(
+                        file_path,
+                        get_max_dedup_size_mb(guild_id),
+                        max_output_mb=_guild_max_upload_mb(guild_id),
+                        max_buffer_mb=getattr(bot, "dedup_max_buffer_mb", 256),
+                        progress=progress,
+                        preset=get_dedup_preset(guild_id),
+                        trace=trace,
+                        engine=bot.dedup_engine,
+                    )
+                finally:
+                    progress_task.cancel()
+                    try:
+                        await progress_task
+                    except asyncio.CancelledError:
+                        pass
+                if stats:
+                    record_dedup_timing(bot.connection, guild_id, stats)
                 if err:
-                    set_queue_job_failed(bot.connection, job_id, err)
+                    _fail_job(job_id, trace, err)
                     try:
                         await status_msg.edit(content=err)
                     except Exception:
                         await _reply_or_send(bot, channel_id, author_id, message_id, err)
                 else:
                     set_queue_job_completed(bot.connection, job_id)
+                    upload_start = time.time()
                     results_channel_id = bot_get_system_channel(guild_id, "dedup_results")
                     requested_by = f"<@{author_id}>" if results_channel_id else None
-                    view, files = build_dedup_layout(
-                        stats, out,
-                        footer_text="© TPS Bot (2026) | Duplicate DeadFrames Remover",
-                        requested_by=requested_by,
+                    fan_out_build = partial(
+                        build_dedup_layout, stats, out, footer_text="© TPS Bot (2026) | Duplicate DeadFrames Remover",
                     )
+                    view, files = fan_out_build(requested_by=requested_by)
                     if results_channel_id:
                         results_channel = bot.get_channel(results_channel_id)
                         if results_channel:
@@ -292,20 +559,27 @@ async def _worker_dedup():
                     else:
                         await channel.send(view=view, files=files)
                         done_text = "Done! Duplicate frames removed."
+                    trace.add("upload", upload_start, time.time())
                     try:
                         await status_msg.edit(content=done_text)
                     except Exception:
                         await _reply_or_send(bot, channel_id, author_id, message_id, done_text)
             except Exception as e:
                 logger.exception("Dedup worker error: %s", e)
-                set_queue_job_failed(bot.connection, job_id, str(e))
+                _fail_job(job_id, trace, str(e))
                 try:
                     await channel.send(f"Dedup failed: {e}")
                 except Exception:
                     pass
             finally:
+                await _fan_out_to_subscribers(
+                    job_id, trace, "dedup_results", "Dedup", fan_out_build, "**Duplicate frames removed**",
+                )
+                cleanup_start = time.time()
                 if out and os.path.dirname(out):
                     _cleanup_tmp(os.path.dirname(out))
+                trace.add("cleanup", cleanup_start, time.time())
+                _finish_job_trace(job_id, trace)
         except Exception as e:
             logger.exception("Dedup worker loop: %s", e)
             await asyncio.sleep(5)
@@ -330,55 +604,172 @@ def get_max_dedup_size_mb(guild_id: int) -> int:
     return _guild_max_upload_mb(guild_id)
 
 bot.get_max_removebg_size_mb = get_max_removebg_size_mb
+bot.get_guild_upload_limit_bytes = _guild_file_size_limit_bytes
 bot.get_max_dedup_size_mb = get_max_dedup_size_mb
 
+async def _download_yt(system: str, url: str, job_dir: str, plan: dict, max_height: int, trace) -> str:
+    from cogs.utils.yt_downloader import download_audio_mp3, download_audio_original, download_video_mp4
+    clip = plan.get("clip")
+    if system == "yt_download_mp3" and plan["mode"] == "original":
+        out_path = await asyncio.to_thread(download_audio_original, url, job_dir, plan["format"], None, trace, clip)
+    elif system == "yt_download_mp3":
+        out_path = await asyncio.to_thread(download_audio_mp3, url, job_dir, plan["bitrate"], None, trace, clip)
+    else:
+        out_path = await asyncio.to_thread(download_video_mp4, url, job_dir, max_height, trace, plan["format"], clip)
+    return os.path.normpath(str(out_path))
+
+async def _run_yt_playlist(job_id, guild_id, channel, author_id, message_id, system, url, options, status_msg, trace, job_dir):
+    # Children share the job's trace and directory; at most yt_playlist_concurrency download at once.
+    from cogs.utils.yt_downloader import batch_for_upload, extract_playlist_infos, plan_download, write_zip_volumes
+    playlist = options["playlist"]
+    entries = playlist["entries"]
+    try:
+        with trace.span("ingest"):
+            await asyncio.to_thread(extract_playlist_infos, url, entries)
+    except Exception as e:
+        logger.info("Playlist pre-extraction failed for %s, resolving items one by one: %s", url, e)
+    limit = _guild_file_size_limit_bytes(guild_id)
+    max_height = 1080 if limit >= 50 * 1024 * 1024 else 720
+    kind = "audio" if system == "yt_download_mp3" else "video"
+    audio_mode = options.get("audio_mode") or get_yt_audio_mode(guild_id)
+    results = [None] * len(entries)
+    errors = []
+    state = {"done": 0, "active": 0, "last_edit": 0.0}
+    semaphore = asyncio.Semaphore(max(1, bot.yt_playlist_concurrency))
+
+    async def _refresh(force: bool = False):
+        now = time.time()
+        if not force and now - state["last_edit"] < 2.0:
+            return
+        state["last_edit"] = now
+        text = (
+            f"Downloading playlist **{playlist['title']}**… **{state['done']}/{len(entries)}** done"
+            + (f", {len(errors)} failed" if errors else "")
+            + (f" • {state['active']} in progress" if state["active"] else "")
+        )
+        try:
+            await status_msg.edit(content=text)
+        except Exception:
+            pass
+
+    async def _child(i: int, entry: dict):
+        async with semaphore:
+            state["active"] += 1
+            await _refresh()
+            try:
+                plan = await asyncio.to_thread(plan_download, entry["url"], kind, limit, max_height, audio_mode)
+                out_path = await _download_yt(system, entry["url"], os.path.join(job_dir, f"{i:03d}"), plan, max_height, trace)
+                if not os.path.isfile(out_path):
+                    raise RuntimeError("output file not found")
+                if os.path.getsize(out_path) > limit:
+                    raise RuntimeError("file too large for Discord")
+                results[i] = out_path
+            except Exception as e:
+                logger.info("Playlist item %s failed: %s", entry["url"], e)
+                errors.append(f"{entry['title']}: {e}")
+            finally:
+                state["active"] -= 1
+                state["done"] += 1
+                await _refresh(force=state["done"] == len(entries))
+
+    await asyncio.gather(*(_child(i, entry) for i, entry in enumerate(entries)))
+    files = [path for path in results if path]
+    if not files:
+        _fail_job(job_id, trace, "No playlist item could be downloaded")
+        try:
+            await status_msg.edit(content=f"Playlist download failed: none of the {len(entries)} videos could be downloaded.")
+        except Exception:
+            pass
+        return
+
+    upload_start = time.time()
+    stem = re.sub(r"[^\w-]+", "_", playlist["title"]).strip("_")[:60] or "playlist"
+    if playlist.get("zip"):
+        batches = [[v] for v in await asyncio.to_thread(write_zip_volumes, files, job_dir, stem, limit)]
+    else:
+        batches = await asyncio.to_thread(batch_for_upload, files, limit)
+    results_channel_id = bot_get_system_channel(guild_id, f"{system}_results")
+    target = bot.get_channel(results_channel_id) if results_channel_id else None
+    for n, batch in enumerate(batches, start=1):
+        header = f"**{playlist['title']}**" + (f" ({n}/{len(batches)})" if len(batches) > 1 else "")
+        if target:
+            header = f"**Requested by** <@{author_id}> • {header}"
+        await (target or channel).send(header, files=[discord.File(str(path), filename=path.name) for path in batch])
+    trace.add("upload", upload_start, time.time())
+    set_queue_job_completed(bot.connection, job_id)
+
+    where = f" in {target.mention}" if target else ""
+    done_text = f"Done! Sent **{len(files)}/{len(entries)}** {kind}s from **{playlist['title']}**{where}."
+    if errors:
+        done_text += "\nSkipped:\n" + "\n".join(f"• {e[:150]}" for e in errors[:5])
+        if len(errors) > 5:
+            done_text += f"\n…and {len(errors) - 5} more."
+    try:
+        await status_msg.edit(content=done_text[:2000])
+    except Exception:
+        await _reply_or_send(bot, channel.id, author_id, message_id, done_text[:2000])
+
 async def _worker_yt_download():
-    from cogs.utils.yt_downloader import download_video_mp4, download_audio_mp3, build_yt_download_layout
+    from cogs.utils.yt_downloader import (
+        build_yt_download_layout, plan_download, configure_download_tuning, format_timestamp,
+    )
+    configure_download_tuning(**bot.yt_download_tuning)
+    metrics.register_worker("yt_download_mp4")
+    metrics.register_worker("yt_download_mp3")
     while True:
         try:
             if not bot.connection:
                 await asyncio.sleep(5)
                 continue
-            row = get_next_pending(bot.connection, "yt_download_mp4")
+            claim_start = time.time()
+            row = get_next_pending(bot.connection, "yt_download_mp4", bot.queue_priority_aging_seconds)
             system = "yt_download_mp4"
             if not row:
-                row = get_next_pending(bot.connection, "yt_download_mp3")
+                row = get_next_pending(bot.connection, "yt_download_mp3", bot.queue_priority_aging_seconds)
                 system = "yt_download_mp3"
             if not row:
                 await asyncio.sleep(2)
                 continue
-            job_id, guild_id, channel_id, author_id, message_id, file_path = row
+            job_id, guild_id, channel_id, author_id, message_id, file_path, _, _, options = row
             url = (file_path or "").strip()
             if not url:
-                set_queue_job_failed(bot.connection, job_id, "Invalid job data")
+                await _fail_unstarted_job(job_id, system, "Invalid job data", f"{system}_results", "YouTube download")
                 continue
             channel = bot.get_channel(channel_id)
             if not channel:
-                set_queue_job_failed(bot.connection, job_id, "Channel not found")
+                await _fail_unstarted_job(job_id, system, "Channel not found", f"{system}_results", "YouTube download")
                 continue
             job_dir = os.path.join(bot.queue_uploads_dir, "yt_download", str(uuid.uuid4()))
             out_path = None
+            trace = _start_job_trace(row, system, claim_start)
+            fan_out_build = None
+            info_text = ""
+            clip = tuple(options["clip"]) if options.get("clip") else None
             try:
-                status_msg = await _send_status_reply(
-                    bot, channel_id, author_id, message_id,
-                    "Downloading from YouTube…",
-                )
+                status_text = "Downloading from YouTube…"
+                if options.get("playlist"):
+                    status_text = f"Downloading playlist **{options['playlist']['title']}**…"
+                elif clip:
+                    status_text = f"Downloading {format_timestamp(clip[0])}–{format_timestamp(clip[1])} from YouTube…"
+                status_msg = await _send_status_reply(bot, channel_id, author_id, message_id, status_text)
                 if not status_msg:
-                    status_msg = await channel.send("Downloading from YouTube…")
-                max_height = None
-                if system == "yt_download_mp3":
-                    out_path = await asyncio.to_thread(
-                        download_audio_mp3, url, job_dir, "320",
+                    status_msg = await channel.send(status_text)
+                if options.get("playlist"):
+                    await _run_yt_playlist(
+                        job_id, guild_id, channel, author_id, message_id, system, url, options, status_msg, trace, job_dir,
                     )
-                else:
-                    discord_limit = _guild_file_size_limit_bytes(guild_id)
-                    max_height = 1080 if discord_limit >= 50 * 1024 * 1024 else 720
-                    out_path = await asyncio.to_thread(
-                        download_video_mp4, url, job_dir, max_height,
+                    continue
+                discord_limit = _guild_file_size_limit_bytes(guild_id)
+                max_height = 1080 if discord_limit >= 50 * 1024 * 1024 else 720
+                with trace.span("plan"):
+                    plan = await asyncio.to_thread(
+                        plan_download, url, "audio" if system == "yt_download_mp3" else "video", discord_limit, max_height,
+                        options.get("audio_mode") or get_yt_audio_mode(guild_id), clip,
                     )
-                out_path = os.path.normpath(str(out_path))
+                clip = plan["clip"]
+                out_path = await _download_yt(system, url, job_dir, plan, max_height, trace)
                 if not os.path.isfile(out_path):
-                    set_queue_job_failed(bot.connection, job_id, "Output file not found")
+                    _fail_job(job_id, trace, "Output file not found")
                     try:
                         await status_msg.edit(content="Download failed: output file not found.")
                     except Exception:
@@ -388,10 +779,10 @@ async def _worker_yt_download():
                 discord_limit = _guild_file_size_limit_bytes(guild_id)
                 limit_mb = discord_limit / (1024 * 1024)
                 if size > discord_limit:
-                    set_queue_job_completed(bot.connection, job_id)
+                    _fail_job(job_id, trace, "File too large for Discord")
                     try:
                         await status_msg.edit(
-                            content=f"Done, but the file is too large for Discord (**{size / (1024*1024):.1f} MB** > {limit_mb:.0f} MB for this server). Boost the server for a higher limit.",
+                            content=f"Download failed: the file came out too large for Discord (**{size / (1024*1024):.1f} MB** > {limit_mb:.0f} MB for this server). Boost the server for a higher limit.",
                         )
                     except Exception:
                         await _reply_or_send(
@@ -400,6 +791,7 @@ async def _worker_yt_download():
                         )
                     continue
                 set_queue_job_completed(bot.connection, job_id)
+                upload_start = time.time()
                 results_key = "yt_download_mp4_results" if system == "yt_download_mp4" else "yt_download_mp3_results"
                 results_channel_id = bot_get_system_channel(guild_id, results_key)
                 kind = "audio" if system == "yt_download_mp3" else "video"
@@ -410,17 +802,24 @@ async def _worker_yt_download():
                 )
                 size_mb = os.path.getsize(out_path) / (1024 * 1024)
                 if kind == "video":
-                    res = "1080p" if max_height == 1080 else "720p"
+                    res = f"{plan.get('height') or max_height}p"
                     info_text = f"Format: **WebM** • Resolution: **{res}**\nFile size: **{size_mb:.1f} MB**"
+                elif plan["mode"] == "original":
+                    fmt = plan.get("codec") or os.path.splitext(out_path)[1].lstrip(".").upper()
+                    rate = f" • Bitrate: **{plan['abr']} kbps**" if plan.get("abr") else ""
+                    info_text = f"Format: **{fmt}** (original, no re-encode){rate}\nFile size: **{size_mb:.1f} MB**"
                 else:
-                    info_text = f"Format: **MP3** • Bitrate: **320 kbps**\nFile size: **{size_mb:.1f} MB**"
+                    info_text = f"Format: **MP3** • Bitrate: **{plan['bitrate']} kbps**\nFile size: **{size_mb:.1f} MB**"
+                if clip:
+                    info_text += f" • Clip: **{format_timestamp(clip[0])}–{format_timestamp(clip[1])}**"
                 if results_channel_id and bot.get_channel(results_channel_id):
                     requested_by = f"<@{author_id}>"
                 else:
                     requested_by = None
-                view, files = build_yt_download_layout(
-                    out_path, footer_text=footer, requested_by=requested_by, kind=kind, info_text=info_text
+                fan_out_build = partial(
+                    build_yt_download_layout, out_path, footer_text=footer, kind=kind, info_text=info_text,
                 )
+                view, files = fan_out_build(requested_by=requested_by)
                 plain_content = (f"**Requested by** <@{author_id}>" if requested_by else f"**{kind.capitalize()} downloaded.**") + "\n\n" + info_text
                 if results_channel_id:
                     results_channel = bot.get_channel(results_channel_id)
@@ -442,28 +841,28 @@ async def _worker_yt_download():
                     else:
                         await channel.send(plain_content, file=files[0])
                     done_text = "Done! Here's your file."
+                trace.add("upload", upload_start, time.time())
                 try:
                     await status_msg.edit(content=done_text)
                 except Exception:
                     await _reply_or_send(bot, channel_id, author_id, message_id, done_text)
             except Exception as e:
                 logger.exception("YT download worker error: %s", e)
-                set_queue_job_failed(bot.connection, job_id, str(e))
+                _fail_job(job_id, trace, str(e))
                 try:
                     await channel.send(f"YouTube download failed: {e}")
                 except Exception:
                     pass
             finally:
+                await _fan_out_to_subscribers(
+                    job_id, trace, f"{system}_results", "YouTube download", fan_out_build, info_text,
+                )
+                cleanup_start = time.time()
                 if job_dir and os.path.isdir(job_dir):
-                    try:
-                        for f in os.listdir(job_dir):
-                            try:
-                                os.remove(os.path.join(job_dir, f))
-                            except Exception:
-                                pass
-                        os.rmdir(job_dir)
-                    except Exception:
-                        pass
+                    # Playlist children download into per-item subdirectories.
+                    shutil.rmtree(job_dir, ignore_errors=True)
+                trace.add("cleanup", cleanup_start, time.time())
+                _finish_job_trace(job_id, trace)
         except Exception as e:
             logger.exception("YT download worker loop: %s", e)
             await asyncio.sleep(5)
@@ -488,6 +887,62 @@ async def load_cogs():
                 except Exception as e:
                     logger.exception("Failed %s: %s", ext, e)
 
+async def _admit(message, system: str, priority: int, incoming_bytes: int = 0, items: int = 1):
+    admitted, notice = check_admission(bot, system, message.author.id, priority, incoming_bytes, items)
+    if not admitted:
+        await message.reply(notice)
+    return admitted, notice
+
+async def _reply_queue_position(message, system: str, notice: Optional[str], text: str):
+    n = count_pending(connection, system)
+    if notice:
+        await message.reply(f"You're **#{n}** in the queue. {notice} I'll reply here when it's ready.")
+    elif n > 1:
+        await message.reply(text.format(n=n))
+
+async def _submit_yt_playlist(message, system: str, url: str, priority: int):
+    # The playlist is one queue job; its entries are listed here once and
+    # stored with the job. Admission runs after the listing so the wait
+    # estimate covers every entry.
+    from cogs.utils.yt_downloader import DownloadRejected, extract_playlist_entries
+    try:
+        playlist = await asyncio.to_thread(extract_playlist_entries, url, bot.yt_playlist_max_items)
+    except DownloadRejected as e:
+        metrics.record_rejection(system, "playlist")
+        await message.reply(str(e))
+        return
+    except Exception as e:
+        logger.info("Playlist extraction failed for %s: %s", url, e)
+        await message.reply("Could not read this playlist. Make sure it is public or unlisted.")
+        return
+    admitted, notice = await _admit(message, system, priority, items=len(playlist["entries"]))
+    if not admitted:
+        return
+    rest = (message.content or "").replace(url, " ")
+    playlist["zip"] = re.search(r"(?:^|\s)zip(?:\s|$)", rest, re.IGNORECASE) is not None
+    options = {"playlist": playlist}
+    if system == "yt_download_mp3":
+        mode_match = YT_AUDIO_MODE_PATTERN.search(rest)
+        options["audio_mode"] = mode_match.group(1).lower() if mode_match else get_yt_audio_mode(message.guild.id)
+    job_id = enqueue_media(
+        connection, message.guild.id, message.channel.id, message.author.id, message.id, system, url, priority,
+        None, options,
+    )
+    if job_id is None:
+        await message.reply("Could not add to queue. Try again later.")
+        return
+    notes = []
+    if playlist["truncated"]:
+        notes.append(f"only the first {len(playlist['entries'])} are included")
+    if playlist["skipped"]:
+        notes.append(f"{playlist['skipped']} longer than 30 minutes skipped")
+    text = f"Queued **{len(playlist['entries'])}** videos from **{playlist['title']}**"
+    text += f" ({'; '.join(notes)})." if notes else "."
+    if notice:
+        text += f" {notice}"
+    await message.reply(text + " I'll post one progress message and reply here when they're ready.")
+
+
 @bot.event
 async def on_message(message):
     await bot.process_commands(message)
@@ -499,27 +954,73 @@ async def on_message(message):
     is_dedup_ch = bot_get_system_channel(gid, "dedup") == cid
     is_yt_mp4_ch = bot_get_system_channel(gid, "yt_download_mp4") == cid
     is_yt_mp3_ch = bot_get_system_channel(gid, "yt_download_mp3") == cid
+    if not (is_removebg_ch or is_dedup_ch or is_yt_mp4_ch or is_yt_mp3_ch):
+        return
+    priority = submission_priority(bot, message)
 
     if is_yt_mp4_ch or is_yt_mp3_ch:
+        playlist_match = YT_PLAYLIST_PATTERN.search(message.content or "")
         match = YT_URL_PATTERN.search(message.content or "")
-        if not match:
+        if not match and not playlist_match:
             try:
                 await message.delete()
             except discord.Forbidden:
                 pass
             return
-        url = match.group(0)
+        url = (playlist_match or match).group(0)
         if not connection:
             await message.reply("Queue is unavailable (database not configured).")
             return
         system = "yt_download_mp4" if is_yt_mp4_ch else "yt_download_mp3"
-        job_id = enqueue_media(connection, gid, message.channel.id, message.author.id, message.id, system, url)
+        if playlist_match:
+            await _submit_yt_playlist(message, system, url, priority)
+            return
+        from cogs.utils.yt_downloader import DownloadRejected, parse_clip_request, plan_download
+        # The full link token (with ?t=) and the rest of the message carry the options.
+        url_token = next((w for w in (message.content or "").split() if url in w), url)
+        rest = (message.content or "").replace(url_token, " ")
+        options = {}
+        try:
+            clip = parse_clip_request(url_token, rest)
+        except ValueError as e:
+            await message.reply(str(e))
+            return
+        variant = str(_guild_max_upload_mb(gid))
+        if clip:
+            options["clip"] = list(clip)
+            variant = f"{clip[0]:g}-{clip[1]:g}:{variant}"
+        if system == "yt_download_mp3":
+            mode_match = YT_AUDIO_MODE_PATTERN.search(rest)
+            options["audio_mode"] = mode_match.group(1).lower() if mode_match else get_yt_audio_mode(gid)
+            variant = f"{options['audio_mode']}:{variant}"
+        content_key = url_content_key(system, url, variant)
+        # Attaching to a queued job adds no work, so admission only gates new jobs.
+        if await _attach_duplicate(message, content_key, priority, "clip" if clip else "video"):
+            return
+        admitted, notice = await _admit(message, system, priority)
+        if not admitted:
+            return
+        limit = _guild_file_size_limit_bytes(gid)
+        try:
+            await asyncio.to_thread(
+                plan_download, url, "video" if system == "yt_download_mp4" else "audio",
+                limit, 1080 if limit >= 50 * 1024 * 1024 else 720, options.get("audio_mode", "mp3"), clip,
+            )
+        except DownloadRejected as e:
+            metrics.record_rejection(system, "too large")
+            await message.reply(str(e))
+            return
+        except Exception as e:
+            # Extraction hiccups shouldn't block the submission; the worker plans again.
+            logger.info("Pre-download estimate failed for %s: %s", url, e)
+        job_id = enqueue_media(
+            connection, gid, message.channel.id, message.author.id, message.id, system, url, priority, content_key,
+            options,
+        )
         if job_id is None:
             await message.reply("Could not add to queue. Try again later.")
             return
-        n = count_pending(connection, system)
-        if n > 1:
-            await message.reply(f"You're **#{n}** in the queue. I'll reply here when your download is ready.")
+        await _reply_queue_position(message, system, notice, "You're **#{n}** in the queue. I'll reply here when your download is ready.")
         return
 
     if is_removebg_ch or is_dedup_ch:
@@ -547,6 +1048,16 @@ async def on_message(message):
         except Exception as e:
             await message.reply(f"Failed to download image: {e}")
             return
+        format_match = REMOVEBG_FORMAT_PATTERN.search(message.content or "")
+        output_format = format_match.group(1).lower() if format_match else get_removebg_format(gid)
+        # Output depends on the format and, through the size fallback, on the upload cap.
+        variant = f"{output_format}:{_guild_max_upload_mb(gid)}"
+        content_key = await asyncio.to_thread(file_content_key, "removebg", data, variant)
+        if await _attach_duplicate(message, content_key, priority, "image"):
+            return
+        admitted, notice = await _admit(message, "removebg", priority, att.size)
+        if not admitted:
+            return
         ext = (att.filename or "image.png").split(".")[-1].lower() or "png"
         if ext not in ("png", "jpg", "jpeg", "webp", "bmp", "gif"):
             ext = "png"
@@ -559,7 +1070,10 @@ async def on_message(message):
         except Exception as e:
             await message.reply(f"Failed to save file: {e}")
             return
-        job_id = enqueue_media(connection, gid, message.channel.id, message.author.id, message.id, "removebg", file_path)
+        job_id = enqueue_media(
+            connection, gid, message.channel.id, message.author.id, message.id, "removebg", file_path, priority, content_key,
+            {"output_format": output_format},
+        )
         if job_id is None:
             try:
                 os.remove(file_path)
@@ -567,9 +1081,7 @@ async def on_message(message):
                 pass
             await message.reply("Could not add to queue. Try again later.")
             return
-        n = count_pending(connection, "removebg")
-        if n > 1:
-            await message.reply(f"You're **#{n}** in the queue. \n I'll reply here when your request is done.")
+        await _reply_queue_position(message, "removebg", notice, "You're **#{n}** in the queue. \n I'll reply here when your request is done.")
         return
 
     if is_dedup_ch:
@@ -585,6 +1097,14 @@ async def on_message(message):
         except Exception as e:
             await message.reply(f"Failed to download video: {e}")
             return
+        # Output depends on the server's preset and upload cap, so only identical settings coalesce.
+        variant = f"{get_dedup_preset(gid)}:{_guild_max_upload_mb(gid)}"
+        content_key = await asyncio.to_thread(file_content_key, "dedup", data, variant)
+        if await _attach_duplicate(message, content_key, priority, "video"):
+            return
+        admitted, notice = await _admit(message, "dedup", priority, att.size)
+        if not admitted:
+            return
         ext = (att.filename or "video.mp4").split(".")[-1].lower() or "mp4"
         if ext not in ("mp4", "mov", "avi", "mkv", "webm"):
             ext = "mp4"
@@ -597,17 +1117,41 @@ async def on_message(message):
         except Exception as e:
             await message.reply(f"Failed to save file: {e}")
             return
-        job_id = enqueue_media(connection, gid, message.channel.id, message.author.id, message.id, "dedup", file_path)
+        job_id = enqueue_media(
+            connection, gid, message.channel.id, message.author.id, message.id, "dedup", file_path, priority, content_key,
+        )
         if job_id is None:
             from cogs.commands.mediaprocessing.dedup import _cleanup_tmp
             _cleanup_tmp(job_dir)
             await message.reply("Could not add to queue. Try again later.")
             return
-        n = count_pending(connection, "dedup")
-        if n > 1:
-            await message.reply(f"You're **#{n}** in the queue. Processing one at a time—I'll reply here when yours is ready.")
+        await _reply_queue_position(message, "dedup", notice, "You're **#{n}** in the queue. Processing one at a time—I'll reply here when yours is ready.")
         return
 
+async def _prefetch_setup_images():
+    urls = [
+        bot.removebg_setup_image_url, bot.dedup_setup_image_url,
+        bot.removebg_results_setup_image_url, bot.dedup_results_setup_image_url,
+        bot.yt_download_mp4_setup_image_url, bot.yt_download_mp3_setup_image_url,
+    ]
+    if any(urls):
+        start = time.perf_counter()
+        count = await prefetch_images(urls)
+        logger.info("Setup images cached: %d in %.2fs", count, time.perf_counter() - start)
+
+async def _startup_warm_up():
+    start = time.time()
+    timings = await warm_up()
+    metrics.record_startup("warmup", time.time() - start)
+    if timings:
+        logger.info(
+            "Warm-up finished in %.2fs: %s", time.time() - start,
+            ", ".join(f"{name} {seconds * 1000:.0f}ms" for name, seconds in timings.items()),
+        )
+    if import_profiler.installed:
+        print("\n".join(import_profiler.report("Warm-up imports")))
+        import_profiler.uninstall()
+
 @bot.event
 async def on_ready():
     global _ready_once
@@ -621,18 +1165,36 @@ async def on_ready():
             bot.loop.create_task(_worker_dedup())
             bot.loop.create_task(_worker_yt_download())
             bot.loop.create_task(_change_status())
+            bot.resource_monitor.start()
+            if connection:
+                bot.loop.create_task(_metrics_flush_loop())
             print("Queue workers started (removebg, dedup, yt_download). Status: development.")
             print("Connected:", bot.user.name, "| Python:", platform.python_version(), "| discord.py:", discord.__version__)
             print("MySQL:", "connected" if connection else "not configured")
             try:
-                synced = await bot.tree.sync()
-                print("Slash commands synced:", len(synced))
+                start = time.perf_counter()
+                await sync_command_tree(
+                    bot, connection, bot.command_sync_mode, bot.command_sync_guild_ids,
+                    state_path=os.path.join(_bot_dir, ".cache", "command_tree.json"),
+                )
+                print(f"Slash commands checked ({bot.command_sync_mode}) in {time.perf_counter() - start:.2f}s")
             except Exception as e:
                 print("Sync warning:", e)
-            print("Bot ready.\n")
+            metrics.record_startup("ready", time.time() - PROCESS_START)
+            print(f"Bot ready in {time.time() - PROCESS_START:.2f}s.\n")
+            if import_profiler.installed:
+                print("\n".join(import_profiler.report("Startup imports")))
+            bot.loop.create_task(_prefetch_setup_images())
+            if bot.startup_warmup:
+                bot.loop.create_task(_startup_warm_up())
+            elif import_profiler.installed:
+                import_profiler.uninstall()
         else:
             if connection:
                 reload_channels()
+                reload_dedup_presets()
+                reload_yt_audio_modes()
+                reload_removebg_formats()
             print("Bot reconnected. Guilds:", len(bot.guilds))
     except Exception as e:
         logger.exception("on_ready failed: %s", e)
@@ -17,10 +17,11 @@ class HelpCog(commands.Cog):
                 ("/info", "About the bot"),
                 ("/help", "This command list"),
                 ("/ping", "Bot latency and status"),
+                ("/stats", "Queue throughput, latency and failure stats (bot staff)"),
             ],
             "Media processing": [
                 ("/removebg", "Remove background from an image"),
-                ("/dedup", "Remove duplicate/dead frames from a video (small files)"),
+                ("/dedup", "Remove duplicate/dead frames from a video (small files, optional fast/balanced/precise preset)"),
                 ("YouTube MP4 (channel)", "Post a YouTube URL in the YouTube Download (MP4) channel → 1080p MP4"),
                 ("YouTube MP3 (channel)", "Post a YouTube URL in the YouTube Download (MP3) channel → 320 kbps MP3"),
             ],
@@ -4,13 +4,9 @@ import discord
 from discord import app_commands
 from discord.ext import commands
 
+from cogs.utils.resource_monitor import sparkline
 from cogs.utils.setup_message import build_text_container
 
-try:
-    import psutil
-except ImportError:
-    psutil = None
-
 
 class PingCog(commands.Cog):
     def __init__(self, bot):
@@ -35,6 +31,29 @@ class PingCog(commands.Cog):
             return "🟠 Fair"
         return "🔴 Poor"
 
+    def resource_lines(self):
+        monitor = getattr(self.bot, "resource_monitor", None)
+        latest = monitor.latest() if monitor else None
+        if not latest:
+            return []
+        lines = []
+        if "cpu" in latest:
+            lines.append("CPU: {:.0f}% | RAM: {:.0f}% `{}`".format(
+                latest["cpu"], latest["mem_percent"], sparkline(monitor.series("cpu"))
+            ))
+        if "rss_mb" in latest:
+            lines.append("Bot RSS: {:.0f} MB ({} worker procs) | FDs: {} `{}`".format(
+                latest["rss_mb"], latest.get("workers", 0), latest.get("fds", "?"), sparkline(monitor.series("rss_mb"))
+            ))
+        if "uploads_mb" in latest:
+            lines.append("Queue uploads: {:.1f} MB | Free disk: {:.1f} GB".format(
+                latest["uploads_mb"], latest.get("disk_free_mb", 0) / 1024
+            ))
+        lines.append("Loop lag: {:.0f}ms `{}`".format(
+            latest.get("loop_lag_ms", 0), sparkline(monitor.series("loop_lag_ms"))
+        ))
+        return lines
+
     @app_commands.command(name="ping", description="Check bot latency and response time.")
     async def ping(self, interaction: discord.Interaction):
         start_time = time.time()
@@ -50,10 +69,10 @@ class PingCog(commands.Cog):
             "**⚡ API Latency:** `{}ms`".format(api_latency),
             "**📊 Status:** {}".format(status),
         ]
-        if psutil:
-            cpu = psutil.cpu_percent()
-            mem = psutil.virtual_memory()
-            body_lines.append("**🖥️ System:** CPU: {}% | RAM: {}%".format(cpu, mem.percent))
+        resources = self.resource_lines()
+        if resources:
+            body_lines.append("**🖥️ System:** " + resources[0])
+            body_lines.extend(resources[1:])
         body_lines.append(
             "**🤖 Bot:** Python {} | discord.py {} | Servers: {}".format(
                 platform.python_version(), discord.__version__, len(self.bot.guilds)
@@ -74,12 +93,10 @@ class PingCog(commands.Cog):
             embed.add_field(name="📡 Bot Latency", value="`{}ms`".format(bot_latency), inline=True)
             embed.add_field(name="⚡ API Latency", value="`{}ms`".format(api_latency), inline=True)
             embed.add_field(name="📊 Status", value=status, inline=True)
-            if psutil:
-                cpu = psutil.cpu_percent()
-                mem = psutil.virtual_memory()
+            if resources:
                 embed.add_field(
                     name="🖥️ System",
-                    value="CPU: {}% | RAM: {}%".format(cpu, mem.percent),
+                    value="\n".join(resources),
                     inline=False,
                 )
             embed.add_field(
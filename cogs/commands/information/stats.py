@@ -0,0 +1,126 @@
+import discord
+from discord import app_commands
+from discord.ext import commands
+
+from cogs.utils.admission import PRIORITY_NAMES
+from cogs.utils.setup_message import build_text_container
+
+WINDOWS = (("Last hour", 3600), ("Last day", 86400))
+SYSTEM_LABELS = {
+    "removebg": "Remove BG",
+    "dedup": "Dedup",
+    "yt_download_mp4": "YouTube MP4",
+    "yt_download_mp3": "YouTube MP3",
+}
+
+
+def _fmt_seconds(value) -> str:
+    if value is None:
+        return "—"
+    if value < 1:
+        return f"{value * 1000:.0f}ms"
+    if value < 120:
+        return f"{value:.1f}s"
+    return f"{value / 60:.1f}m"
+
+
+def _system_lines(name: str, s: dict) -> list:
+    lines = [
+        f"**{SYSTEM_LABELS.get(name, name)}** — {s['completed']} done, {s['failed']} failed "
+        f"({s['failure_rate'] * 100:.1f}%) • busy {s['utilization'] * 100:.0f}%",
+        f"Processing p50/p95: `{_fmt_seconds(s['processing_p50'])}` / `{_fmt_seconds(s['processing_p95'])}` • "
+        f"Wait p50/p95: `{_fmt_seconds(s['wait_p50'])}` / `{_fmt_seconds(s['wait_p95'])}`",
+    ]
+    if s.get("encode_count"):
+        lines.append(
+            f"Encode p50/p95: `{_fmt_seconds(s['encode_p50'])}` / `{_fmt_seconds(s['encode_p95'])}` "
+            f"({s['encode_count']} jobs)"
+        )
+    if len(s["tier_latency"]) > 1 or any(t != 0 for t in s["tier_latency"]):
+        lines.append("Latency by tier: " + " • ".join(
+            f"{PRIORITY_NAMES.get(tier, tier)} ({count}) `{_fmt_seconds(p50)}` / `{_fmt_seconds(p95)}`"
+            for tier, (count, p50, p95) in sorted(s["tier_latency"].items(), reverse=True)
+        ))
+    for error, count in s["errors"].most_common(3):
+        lines.append(f"↳ {error}: {count}")
+    rejected = sum(s["rejected"].values())
+    if rejected:
+        reasons = ", ".join(f"{reason} {count}" for reason, count in s["rejected"].most_common())
+        lines.append(f"↳ Turned away at submit: {rejected} ({reasons})")
+    return lines
+
+
+def _cache_lines(s: dict) -> list:
+    lines = []
+    for name, (hits, misses) in sorted(s.get("cache", {}).items()):
+        total = hits + misses
+        if total:
+            lines.append(f"• {name}: {hits}/{total} hits ({hits / total * 100:.0f}%)")
+    return lines
+
+
+def _startup_line(startup: dict) -> str:
+    # Seconds since process start, except warm-up which is its own duration.
+    return (
+        f"ready `{_fmt_seconds(startup.get('ready'))}` • warm-up `{_fmt_seconds(startup.get('warmup'))}` • "
+        f"first job `{_fmt_seconds(startup.get('first_job'))}`"
+    )
+
+
+class StatsCog(commands.Cog):
+    def __init__(self, bot):
+        self.bot = bot
+        self.BOT_LOGO = getattr(bot, "BOT_LOGO", None)
+
+    @app_commands.command(name="stats", description="Queue throughput, latency and failure stats (bot staff only).")
+    async def stats(self, interaction: discord.Interaction):
+        if interaction.user.id not in getattr(self.bot, "manage_user_ids", set()):
+            await interaction.response.send_message("Only bot staff can view stats.", ephemeral=True)
+            return
+        store = getattr(self.bot, "metrics", None)
+        if store is None:
+            await interaction.response.send_message("Metrics are not available.", ephemeral=True)
+            return
+
+        sections = []
+        for title, seconds in WINDOWS:
+            summary = store.summary(seconds)
+            cache = summary.pop("cache", None)
+            lines = []
+            for name in sorted(summary, key=lambda k: -summary[k]["total"]):
+                if summary[name]["total"] or summary[name]["busy_seconds"] or summary[name]["rejected"]:
+                    lines.extend(_system_lines(name, summary[name]))
+            if cache:
+                cache_lines = _cache_lines(cache)
+                if cache_lines:
+                    lines.append("**Cache**")
+                    lines.extend(cache_lines)
+            sections.append((title, "\n".join(lines) or "No jobs yet."))
+
+        busy = store.busy_now()
+        workers = ", ".join(
+            f"{SYSTEM_LABELS.get(name, name)} ({_fmt_seconds(age)})" for name, age in sorted(busy.items())
+        ) or "idle"
+        footer = "© TPS Bot (2026) | Stats"
+        body = "**📊 Queue stats**\n\n" + "\n\n".join(f"**{t}**\n{text}" for t, text in sections)
+        body += f"\n\n**Working now:** {workers}"
+        startup = _startup_line(store.startup())
+        body += f"\n**Startup:** {startup}"
+        view, _ = build_text_container(body, footer_text=footer)
+        if view is not None:
+            await interaction.response.send_message(view=view, ephemeral=True)
+        else:
+            embed = discord.Embed(title="📊 Queue stats", color=0x2A2A2A)
+            for title, text in sections:
+                embed.add_field(name=title, value=text[:1024], inline=False)
+            embed.add_field(name="Working now", value=workers, inline=False)
+            embed.add_field(name="Startup", value=startup, inline=False)
+            if self.BOT_LOGO:
+                embed.set_footer(text=footer, icon_url=self.BOT_LOGO)
+            else:
+                embed.set_footer(text=footer)
+            await interaction.response.send_message(embed=embed, ephemeral=True)
+
+
+async def setup(bot):
+    await bot.add_cog(StatsCog(bot))
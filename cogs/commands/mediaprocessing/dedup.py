@@ -1,7 +1,11 @@
 import asyncio
+import hashlib
+import json
+import logging
 import os
 import sys
 import tempfile
+import time
 from pathlib import Path
 from typing import Optional, Tuple, List
 
@@ -9,6 +13,11 @@ import discord
 from discord import app_commands
 from discord.ext import commands
 
+from cogs.utils.db import record_dedup_timing
+
+logger = logging.getLogger("ae_scripts_bot")
+
+
 def _get_dedup_python_dir() -> Optional[Path]:
     env_path = os.environ.get("DEDUP_PYTHON_PATH", "").strip()
     if env_path:
@@ -23,29 +32,141 @@ _PYTHON_DIR = _get_dedup_python_dir()
 if _PYTHON_DIR is not None and str(_PYTHON_DIR) not in sys.path:
     sys.path.insert(0, str(_PYTHON_DIR))
 
+# original = the remove_duplicate_frames script (reference output); tiered = the in-repo
+# engine; auto = tiered only for presets with a passing parity record, else original.
+DEDUP_ENGINES = ("auto", "original", "tiered")
+PARITY_RECORD_PATH = Path(__file__).resolve().parents[3] / ".cache" / "dedup_parity.json"
+# Comparator settings the original script understands.
+ORIGINAL_OPTIONS = ("similarity_threshold", "use_optical_flow", "region_sensitivity", "camera_motion_compensation")
+
+
+DEDUP_PRESETS = {
+    "fast": {
+        "similarity_threshold": 0.95,
+        "use_optical_flow": False,
+        "region_sensitivity": 1,
+        "camera_motion_compensation": False,
+        "thumb_width": 48,
+        "flow_width": 160,
+        "flow_all_pairs": False,
+    },
+    "balanced": {
+        "similarity_threshold": 0.95,
+        "use_optical_flow": True,
+        "region_sensitivity": 1,
+        "camera_motion_compensation": True,
+        "thumb_width": 64,
+        "flow_width": 256,
+        "flow_all_pairs": False,
+    },
+    "precise": {
+        "similarity_threshold": 0.95,
+        "use_optical_flow": True,
+        "region_sensitivity": 2,
+        "camera_motion_compensation": True,
+        "thumb_width": 96,
+        "flow_width": 480,
+        "flow_all_pairs": True,
+    },
+}
+DEFAULT_DEDUP_PRESET = "balanced"
+
+
+def engine_fingerprint(preset: str) -> Optional[str]:
+    """Hash of everything that decides dedup output for a preset; None without the original script."""
+    if _PYTHON_DIR is None or not (_PYTHON_DIR / "remove_duplicate_frames.py").is_file():
+        return None
+    engine = Path(__file__).resolve().parents[2] / "utils" / "dedup_engine.py"
+    h = hashlib.sha256()
+    for path in (engine, _PYTHON_DIR / "remove_duplicate_frames.py"):
+        h.update(path.read_bytes())
+    h.update(json.dumps(DEDUP_PRESETS.get(preset), sort_keys=True).encode("utf-8"))
+    return h.hexdigest()
+
+
+def load_parity_record(path: Path = PARITY_RECORD_PATH) -> dict:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_parity_result(preset: str, result: dict, path: Path = PARITY_RECORD_PATH) -> None:
+    record = load_parity_record(path)
+    record[preset] = result
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(record, f, indent=2)
+
+
+def parity_verified(preset: str) -> bool:
+    entry = load_parity_record().get(preset) or {}
+    fingerprint = engine_fingerprint(preset)
+    return bool(fingerprint and entry.get("passed") and entry.get("fingerprint") == fingerprint)
+
+
+def resolve_engine(engine: str, preset: str) -> str:
+    if engine in ("original", "tiered"):
+        return engine
+    return "tiered" if parity_verified(preset) else "original"
+
 
-def _run_dedup_sync(input_path: str, output_path: str) -> dict:
+def _run_original_sync(input_path: str, output_path: str, preset: str) -> dict:
+    if _PYTHON_DIR is None:
+        raise ImportError(
+            "Set **DEDUP_PYTHON_PATH** in `.env` to the folder containing `remove_duplicate_frames.py`, "
+            "or set **DEDUP_ENGINE=tiered**."
+        )
     from remove_duplicate_frames import remove_duplicate_frames
-    return remove_duplicate_frames(
-        input_path, output_path,
-        similarity_threshold=0.95,
-        use_optical_flow=True,
-        region_sensitivity=1,
-        camera_motion_compensation=True,
-        remove_static_subject_frames=True,
-    )
+    options = {k: v for k, v in DEDUP_PRESETS[preset].items() if k in ORIGINAL_OPTIONS}
+    return dict(remove_duplicate_frames(
+        input_path, output_path, remove_static_subject_frames=True, **options,
+    ) or {})
+
+
+def _run_dedup_sync(
+    input_path: str,
+    output_path: str,
+    max_buffer_mb: int = 256,
+    progress: Optional[dict] = None,
+    preset: str = DEFAULT_DEDUP_PRESET,
+    max_output_bytes: Optional[int] = None,
+    trace=None,
+    engine: str = "auto",
+) -> dict:
+    if preset not in DEDUP_PRESETS:
+        preset = DEFAULT_DEDUP_PRESET
+    engine = resolve_engine(engine, preset)
+    started = time.perf_counter()
+    if engine == "original":
+        stats = _run_original_sync(input_path, output_path, preset)
+    else:
+        from cogs.utils.dedup_engine import remove_duplicate_frames
+        stats = remove_duplicate_frames(
+            input_path, output_path,
+            max_buffer_mb=max_buffer_mb,
+            progress=progress,
+            max_output_bytes=max_output_bytes,
+            trace=trace,
+            **DEDUP_PRESETS[preset],
+        )
+    stats["preset"] = preset
+    stats["engine"] = engine
+    stats["elapsedSeconds"] = round(time.perf_counter() - started, 3)
+    return stats
 
 
 async def process_dedup(
     attachment: discord.Attachment,
     max_size_mb: int,
     max_output_mb: Optional[int] = None,
+    max_buffer_mb: int = 256,
+    progress: Optional[dict] = None,
+    preset: str = DEFAULT_DEDUP_PRESET,
+    engine: str = "auto",
 ) -> Tuple[Optional[str], Optional[str], Optional[dict]]:
     max_out = max_output_mb if max_output_mb is not None else max_size_mb
-    if _PYTHON_DIR is None:
-        return None, (
-            "**Dedup is unavailable:** Set **DEDUP_PYTHON_PATH** in `.env` to the folder containing `remove_duplicate_frames.py`."
-        ), None
     if attachment.size > max_size_mb * 1024 * 1024:
         return None, f"Video must be under **{max_size_mb} MB**. Your file: {attachment.size / (1024*1024):.1f} MB.", None
     ct = (attachment.content_type or "").lower()
@@ -67,13 +188,18 @@ async def process_dedup(
         _cleanup_tmp(tmp)
         return None, f"Failed to save file: {e}", None
     try:
-        stats = await asyncio.to_thread(_run_dedup_sync, input_path, output_path)
+        stats = await asyncio.to_thread(
+            _run_dedup_sync, input_path, output_path, max_buffer_mb, progress, preset, max_out * 1024 * 1024,
+            None, engine,
+        )
     except ImportError as e:
         _cleanup_tmp(tmp)
         err_msg = str(e).strip()
-        if "cv2" in err_msg or "opencv" in err_msg:
+        if "cv2" in err_msg or "opencv" in err_msg or "numpy" in err_msg:
             return None, "**Dedup is unavailable:** Install `opencv-python-headless` and `numpy` in the bot environment.", None
-        return None, f"**Dedup is unavailable:** {err_msg} Set **DEDUP_PYTHON_PATH** if the script folder is elsewhere.", None
+        if getattr(e, "name", None) == "remove_duplicate_frames":
+            err_msg += " Set **DEDUP_PYTHON_PATH** if the script folder is elsewhere."
+        return None, f"**Dedup is unavailable:** {err_msg}", None
     except FileNotFoundError:
         _cleanup_tmp(tmp)
         return None, "FFmpeg or script not found. Install repo deps and FFmpeg.", None
@@ -93,10 +219,13 @@ async def process_dedup_from_path(
     input_path: str,
     max_size_mb: int,
     max_output_mb: Optional[int] = None,
+    max_buffer_mb: int = 256,
+    progress: Optional[dict] = None,
+    preset: str = DEFAULT_DEDUP_PRESET,
+    trace=None,
+    engine: str = "auto",
 ) -> Tuple[Optional[str], Optional[str], Optional[dict]]:
     max_out = max_output_mb if max_output_mb is not None else max_size_mb
-    if _PYTHON_DIR is None:
-        return None, "**Dedup is unavailable:** Set **DEDUP_PYTHON_PATH** in `.env`.", None
     if not os.path.isfile(input_path):
         return None, "Video file not found.", None
     size = os.path.getsize(input_path)
@@ -108,11 +237,16 @@ async def process_dedup_from_path(
     out_dir = os.path.dirname(input_path)
     output_path = os.path.join(out_dir, "output_dedup.mp4")
     try:
-        stats = await asyncio.to_thread(_run_dedup_sync, input_path, output_path)
+        stats = await asyncio.to_thread(
+            _run_dedup_sync, input_path, output_path, max_buffer_mb, progress, preset, max_out * 1024 * 1024, trace,
+            engine,
+        )
     except ImportError as e:
         err_msg = str(e).strip()
-        if "cv2" in err_msg or "opencv" in err_msg:
+        if "cv2" in err_msg or "opencv" in err_msg or "numpy" in err_msg:
             return None, "**Dedup is unavailable:** Install `opencv-python-headless` and `numpy`.", None
+        if getattr(e, "name", None) == "remove_duplicate_frames":
+            err_msg += " Set **DEDUP_PYTHON_PATH** if the script folder is elsewhere."
         return None, f"**Dedup is unavailable:** {err_msg}", None
     except FileNotFoundError:
         return None, "FFmpeg or script not found.", None
@@ -163,6 +297,8 @@ def build_dedup_layout(
             f"Duplicates removed: **{stats.get('duplicateFrames', '?')}**\n"
             f"Unique frames: **{stats.get('uniqueFrames', '?')}**"
         )
+        if stats.get("preset"):
+            stats_text += f"\nPreset: **{str(stats['preset']).capitalize()}**"
     if requested_by:
         title_text = f"**Requested by** {requested_by}\n-# Click below to view or download the video."
     else:
@@ -193,11 +329,31 @@ class DedupCog(commands.Cog):
         self.BOT_LOGO = getattr(bot, "BOT_LOGO", None)
 
     @app_commands.command(name="dedup", description="Remove duplicate/dead frames from a video (small files).")
-    async def dedup(self, interaction: discord.Interaction, video: discord.Attachment):
+    @app_commands.describe(preset="Speed/precision trade-off (defaults to the server setting)")
+    @app_commands.choices(
+        preset=[app_commands.Choice(name=k.capitalize(), value=k) for k in DEDUP_PRESETS.keys()],
+    )
+    async def dedup(
+        self,
+        interaction: discord.Interaction,
+        video: discord.Attachment,
+        preset: Optional[app_commands.Choice[str]] = None,
+    ):
         guild_id = interaction.guild.id if interaction.guild else 0
         max_mb = self.bot.get_max_dedup_size_mb(guild_id)
+        preset_val = preset.value if preset else self.bot.get_dedup_preset(guild_id)
         await interaction.response.defer()
-        output_path, err, stats = await process_dedup(video, max_mb)
+        output_limit = getattr(self.bot, "get_guild_upload_limit_bytes", None)
+        max_out_mb = output_limit(guild_id) // (1024 * 1024) if output_limit else None
+        output_path, err, stats = await process_dedup(
+            video, max_mb,
+            max_output_mb=max_out_mb,
+            max_buffer_mb=getattr(self.bot, "dedup_max_buffer_mb", 256),
+            preset=preset_val,
+            engine=getattr(self.bot, "dedup_engine", "auto"),
+        )
+        if stats:
+            record_dedup_timing(self.bot.connection, guild_id, stats)
         if err:
             embed = discord.Embed(description=err, color=0xE74C3C)
             if self.BOT_LOGO:
@@ -1,12 +1,31 @@
 import asyncio
+import hashlib
 import io
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Optional, Tuple
 
 import discord
 from discord.ext import commands
 
+from cogs.utils.tracing import trace_span
+
 _removebg_semaphore = asyncio.Semaphore(1)
+# auto: smallest lossless encoding that fits; mask: the alpha matte alone as grayscale PNG.
+OUTPUT_FORMATS = ("auto", "png", "webp", "mask")
+PNG_COMPRESS_LEVEL = 6
+# Lossless WebP effort; higher settings cost several times the encode time for ~1% smaller files.
+WEBP_LOSSLESS_QUALITY = 25
+WEBP_METHOD = 1
+_encode_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="removebg-encode")
+# Unique frames of an animation run through one shared session, two at a time.
+_frame_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="removebg-frames")
+# Extra timeout per unique animation frame, on top of the single-image timeout.
+ANIMATED_FRAME_TIMEOUT_SECONDS = 3.0
+# Guided-filter window radius (in proxy pixels) and regularisation for mask upsampling.
+GUIDED_RADIUS = 4
+GUIDED_EPS = 1e-4
 _rembg_remove = None
 _new_session = None
 
@@ -24,31 +43,120 @@ def _get_rembg():
             )
     return _rembg_remove, _new_session
 
-def _downscale_if_needed(image_bytes: bytes, max_dimension: int):
-    if max_dimension <= 0:
-        return image_bytes, False
+def _proxy_size(width: int, height: int, max_dimension: int) -> Optional[Tuple[int, int]]:
+    if max_dimension <= 0 or (width <= max_dimension and height <= max_dimension):
+        return None
+    if width >= height:
+        return max_dimension, max(1, int(height * max_dimension / width))
+    return max(1, int(width * max_dimension / height)), max_dimension
+
+def _guided_upsample(mask, guide_small, guide_full):
+    # Fast colour guided filter: the local linear model alpha ~ a . RGB + b is
+    # fitted on the inference proxy and only applied at full resolution, so mask
+    # edges follow the original pixels for the cost of box filters on the proxy.
+    import cv2
+    import numpy as np
+    ksize = (2 * GUIDED_RADIUS + 1, 2 * GUIDED_RADIUS + 1)
+
+    def box(x):
+        return cv2.boxFilter(x, -1, ksize, borderType=cv2.BORDER_REFLECT)
+
+    mean_i = [box(guide_small[..., c]) for c in range(3)]
+    mean_p = box(mask)
+    cov = [box(guide_small[..., c] * mask) - mean_i[c] * mean_p for c in range(3)]
+
+    def var(r, c):
+        return box(guide_small[..., r] * guide_small[..., c]) - mean_i[r] * mean_i[c] + (GUIDED_EPS if r == c else 0.0)
+
+    # Closed-form inverse of the per-pixel symmetric 3x3 covariance (much faster than np.linalg.solve).
+    s00, s01, s02, s11, s12, s22 = var(0, 0), var(0, 1), var(0, 2), var(1, 1), var(1, 2), var(2, 2)
+    c00 = s11 * s22 - s12 * s12
+    c01 = s02 * s12 - s01 * s22
+    c02 = s01 * s12 - s02 * s11
+    c11 = s00 * s22 - s02 * s02
+    c12 = s01 * s02 - s00 * s12
+    c22 = s00 * s11 - s01 * s01
+    det = s00 * c00 + s01 * c01 + s02 * c02
+    a = [
+        (c00 * cov[0] + c01 * cov[1] + c02 * cov[2]) / det,
+        (c01 * cov[0] + c11 * cov[1] + c12 * cov[2]) / det,
+        (c02 * cov[0] + c12 * cov[1] + c22 * cov[2]) / det,
+    ]
+    b = mean_p - a[0] * mean_i[0] - a[1] * mean_i[1] - a[2] * mean_i[2]
+    h, w = guide_full.shape[:2]
+    refined = cv2.resize(box(b), (w, h), interpolation=cv2.INTER_LINEAR)
+    for c in range(3):
+        refined += cv2.resize(box(a[c]), (w, h), interpolation=cv2.INTER_LINEAR) * guide_full[..., c]
+    # Only the band around mask edges is refined; solid areas keep the plain upsampled mask.
+    edge = cv2.morphologyEx(mask, cv2.MORPH_GRADIENT, np.ones(ksize, np.uint8)) > 0.02
+    band = cv2.resize(edge.astype(np.uint8), (w, h), interpolation=cv2.INTER_NEAREST).astype(bool)
+    alpha = np.where(band, refined, cv2.resize(mask, (w, h), interpolation=cv2.INTER_LINEAR))
+    return (np.clip(alpha, 0.0, 1.0) * 255.0 + 0.5).astype(np.uint8)
+
+def _upsample_alpha(original, proxy, proxy_mask):
+    import numpy as np
     from PIL import Image
-    inp = Image.open(io.BytesIO(image_bytes)).convert("RGB")
-    w, h = inp.size
-    if w <= max_dimension and h <= max_dimension:
-        return image_bytes, False
-    if w >= h:
-        new_w = max_dimension
-        new_h = max(1, int(h * max_dimension / w))
+
+    def rgb(img):
+        return np.asarray(img, dtype=np.float32) / 255.0
+
+    mask = np.asarray(proxy_mask.convert("L"), dtype=np.float32) / 255.0
+    return Image.fromarray(_guided_upsample(mask, rgb(proxy), rgb(original)), "L")
+
+def _clear_transparent(img):
+    # Colour under alpha 0 is invisible but costs bytes; WebP drops it by default too (exact=False).
+    import numpy as np
+    from PIL import Image
+    arr = np.array(img)
+    arr[arr[..., 3] == 0, :3] = 0
+    return Image.fromarray(arr, "RGBA")
+
+def _encode_png(img) -> bytes:
+    buf = io.BytesIO()
+    if img.mode == "RGBA" and img.getcolors(256) is not None:
+        # At most 256 colours (flat art, logos): an exact palette PNG is lossless and much smaller.
+        import numpy as np
+        from PIL import Image
+        arr = np.asarray(img)
+        colors, index = np.unique(arr.reshape(-1, 4), axis=0, return_inverse=True)
+        pal = Image.fromarray(index.reshape(arr.shape[:2]).astype(np.uint8), "P")
+        pal.putpalette(colors[:, :3].flatten().tolist())
+        pal.save(buf, format="PNG", compress_level=PNG_COMPRESS_LEVEL, transparency=bytes(colors[:, 3].tolist()))
     else:
-        new_h = max_dimension
-        new_w = max(1, int(w * max_dimension / h))
-    try:
-        resample = Image.Resampling.LANCZOS
-    except AttributeError:
-        resample = Image.LANCZOS
-    inp = inp.resize((new_w, new_h), resample)
+        img.save(buf, format="PNG", compress_level=PNG_COMPRESS_LEVEL)
+    return buf.getvalue()
+
+def _encode_webp(img) -> bytes:
     buf = io.BytesIO()
-    inp.save(buf, format="PNG")
-    return buf.getvalue(), True
+    img.save(buf, format="WEBP", lossless=True, quality=WEBP_LOSSLESS_QUALITY, method=WEBP_METHOD)
+    return buf.getvalue()
+
+def encode_output(img, output_format: str = "auto", size_limit: Optional[int] = None) -> bytes:
+    if img.mode != "RGBA":
+        img = img.convert("RGBA")
+    if output_format == "mask":
+        return _encode_png(img.getchannel("A"))
+    img = _clear_transparent(img)
+    encoders = {"png": _encode_png, "webp": _encode_webp}
+    if output_format in encoders:
+        data = encoders[output_format](img)
+        if size_limit is None or len(data) <= size_limit:
+            return data
+    # auto, or the requested format is over the limit: smallest of the lossless encodings.
+    return min(_encode_pool.map(lambda encode: encode(img), encoders.values()), key=len)
+
+def output_filename(data: bytes, output_format: str = "auto") -> str:
+    ext = "webp" if data[8:12] == b"WEBP" else "png"
+    return f"removebg_mask.{ext}" if output_format == "mask" else f"removebg.{ext}"
 
-def _run_remove_bg_sync(image_bytes: bytes, model: str = "u2netp") -> bytes:
+def _resample():
     from PIL import Image
+    try:
+        return Image.Resampling.LANCZOS
+    except AttributeError:
+        return Image.LANCZOS
+
+def _load_session(model: str):
     remove_fn, new_session_fn = _get_rembg()
     session = None
     if model:
@@ -56,20 +164,174 @@ def _run_remove_bg_sync(image_bytes: bytes, model: str = "u2netp") -> bytes:
             session = new_session_fn(model)
         except Exception:
             session = new_session_fn("u2net")
-    inp = Image.open(io.BytesIO(image_bytes)).convert("RGB")
-    out = remove_fn(inp, session=session) if session else remove_fn(inp)
-    if out.mode != "RGBA":
-        out = out.convert("RGBA")
+    return remove_fn, session
+
+def _predict_mask(remove_fn, session, image):
+    return remove_fn(image, session=session, only_mask=True) if session else remove_fn(image, only_mask=True)
+
+def _shrink_until_fits(data: bytes, size_limit: Optional[int], size: Tuple[int, int], encode) -> bytes:
+    # A full-resolution cutout can outgrow the upload limit; shrink it until it fits.
+    w, h = size
+    while size_limit and len(data) > size_limit and min(w, h) > 64:
+        scale = max(0.5, (size_limit / len(data)) ** 0.5 * 0.95)
+        w, h = max(1, int(w * scale)), max(1, int(h * scale))
+        data = encode((w, h))
+    return data
+
+def _encode_animated(frames, durations, loop: int, fmt: str) -> bytes:
     buf = io.BytesIO()
-    out.save(buf, format="PNG")
+    if fmt == "webp":
+        frames[0].save(
+            buf, format="WEBP", save_all=True, append_images=frames[1:], duration=durations, loop=loop,
+            lossless=True, quality=WEBP_LOSSLESS_QUALITY, method=WEBP_METHOD,
+        )
+    else:
+        # APNG; Pillow merges identical consecutive frames into one longer frame.
+        frames[0].save(
+            buf, format="PNG", save_all=True, append_images=frames[1:], duration=durations, loop=loop,
+            compress_level=PNG_COMPRESS_LEVEL,
+        )
     return buf.getvalue()
 
+def encode_animated_output(frames, durations, loop: int = 0, output_format: str = "auto", size_limit: Optional[int] = None) -> bytes:
+    if output_format in ("png", "webp"):
+        data = _encode_animated(frames, durations, loop, output_format)
+        if size_limit is None or len(data) <= size_limit:
+            return data
+    return min(_encode_pool.map(lambda fmt: _encode_animated(frames, durations, loop, fmt), ("png", "webp")), key=len)
+
+def _run_animated_sync(
+    image,
+    model: str,
+    trace,
+    output_format: str,
+    size_limit: Optional[int],
+    max_dimension: int,
+    max_frames: int,
+    max_pixels: int,
+    on_unique_frames=None,
+) -> bytes:
+    from PIL import ImageChops, ImageSequence
+    resample = _resample()
+    with trace_span(trace, "preprocess"):
+        count = getattr(image, "n_frames", 1)
+        if max_frames > 0 and count > max_frames:
+            raise ValueError(f"animation has {count} frames; the limit is {max_frames}")
+        # Frames are scaled down together when the whole animation is over the pixel budget.
+        w, h = image.size
+        scale = min(1.0, (max_pixels / float(count * w * h)) ** 0.5) if max_pixels > 0 else 1.0
+        size = (max(1, int(w * scale)), max(1, int(h * scale)))
+        # A GIF without a loop count plays once; APNG and WebP read a missing
+        # count as "forever", so play-once is written out explicitly.
+        loop = image.info.get("loop", 1)
+        frames, durations, keys = [], [], []
+        for frame in ImageSequence.Iterator(image):
+            durations.append(frame.info.get("duration") or image.info.get("duration") or 100)
+            rgba = frame.convert("RGBA")
+            if rgba.size != size:
+                rgba = rgba.resize(size, resample)
+            frames.append(rgba)
+            keys.append(hashlib.blake2b(rgba.tobytes(), digest_size=16).digest())
+    with trace_span(trace, "model_load"):
+        remove_fn, session = _load_session(model)
+    with trace_span(trace, "inference"):
+        # Identical frames (holds, loops, static backgrounds) share one mask.
+        unique = {}
+        for key, frame in zip(keys, frames):
+            unique.setdefault(key, frame)
+        if on_unique_frames:
+            on_unique_frames(len(unique))
+
+        def alpha_for(frame):
+            rgb = frame.convert("RGB")
+            proxy_size = _proxy_size(*rgb.size, max_dimension)
+            proxy = rgb.resize(proxy_size, resample) if proxy_size else rgb
+            mask = _predict_mask(remove_fn, session, proxy)
+            alpha = _upsample_alpha(rgb, proxy, mask) if proxy_size else mask.convert("L")
+            # Keep pixels the source already had transparent (GIF transparency) transparent.
+            return ImageChops.darker(alpha, frame.getchannel("A"))
+
+        masks = dict(zip(unique, _frame_pool.map(alpha_for, unique.values())))
+    with trace_span(trace, "encode"):
+        out_frames = []
+        for key, frame in zip(keys, frames):
+            if output_format == "mask":
+                out_frames.append(masks[key].convert("RGB"))
+            else:
+                frame.putalpha(masks[key])
+                out_frames.append(_clear_transparent(frame))
+
+        def encode(target):
+            resized = out_frames if target == size else [f.resize(target, resample) for f in out_frames]
+            return encode_animated_output(resized, durations, loop, output_format, size_limit)
+
+        return _shrink_until_fits(encode(size), size_limit, size, encode)
+
+def _run_remove_bg_sync(
+    image_bytes: bytes,
+    model: str = "u2netp",
+    trace=None,
+    output_format: str = "auto",
+    size_limit: Optional[int] = None,
+    max_dimension: int = 1024,
+    max_frames: int = 200,
+    max_pixels: int = 50_000_000,
+    on_unique_frames=None,
+) -> bytes:
+    from PIL import Image
+    resample = _resample()
+    source = Image.open(io.BytesIO(image_bytes))
+    if getattr(source, "is_animated", False) and getattr(source, "n_frames", 1) > 1:
+        return _run_animated_sync(
+            source, model, trace, output_format, size_limit, max_dimension, max_frames, max_pixels,
+            on_unique_frames,
+        )
+    with trace_span(trace, "preprocess"):
+        original = source.convert("RGB")
+        # Inference runs on a proxy no larger than max_dimension; the cutout keeps the original size.
+        proxy_size = _proxy_size(*original.size, max_dimension)
+        proxy = original.resize(proxy_size, resample) if proxy_size else original
+    with trace_span(trace, "model_load"):
+        remove_fn, session = _load_session(model)
+    with trace_span(trace, "inference"):
+        mask = _predict_mask(remove_fn, session, proxy)
+    with trace_span(trace, "upsample"):
+        out = original.copy()
+        out.putalpha(_upsample_alpha(original, proxy, mask) if proxy_size else mask.convert("L"))
+    with trace_span(trace, "encode"):
+        return _shrink_until_fits(
+            encode_output(out, output_format, size_limit), size_limit, out.size,
+            lambda target: encode_output(out.resize(target, resample), output_format, size_limit),
+        )
+
+async def _run_with_timeout(timeout_seconds: float, *args) -> bytes:
+    # Animations get timeout_seconds plus a per-frame allowance once their
+    # unique frame count is known; still images keep the plain timeout.
+    budget = [timeout_seconds]
+
+    def on_unique_frames(count: int):
+        budget[0] = timeout_seconds + count * ANIMATED_FRAME_TIMEOUT_SECONDS
+
+    task = asyncio.ensure_future(asyncio.to_thread(_run_remove_bg_sync, *args, on_unique_frames))
+    start = time.monotonic()
+    while True:
+        waited_for = budget[0]
+        try:
+            return await asyncio.wait_for(asyncio.shield(task), timeout=max(0.0, start + waited_for - time.monotonic()))
+        except asyncio.TimeoutError:
+            if budget[0] <= waited_for:
+                raise
+
 async def process_removebg(
     attachment: discord.Attachment,
     max_size_mb: int,
     max_dimension: int = 1024,
     timeout_seconds: float = 120.0,
     model: str = "u2netp",
+    output_format: str = "auto",
+    max_frames: int = 200,
+    max_pixels: int = 50_000_000,
+    size_limit: Optional[int] = None,
 ) -> tuple[Optional[bytes], Optional[str]]:
     if attachment.size > max_size_mb * 1024 * 1024:
         return None, f"Image must be under **{max_size_mb} MB** (Discord limit). Your file: {attachment.size / (1024*1024):.1f} MB."
@@ -81,17 +343,11 @@ async def process_removebg(
     except Exception as e:
         return None, f"Failed to download image: {e}"
 
-    if max_dimension > 0:
-        try:
-            image_bytes, _ = await asyncio.to_thread(_downscale_if_needed, image_bytes, max_dimension)
-        except Exception:
-            pass
-
     async with _removebg_semaphore:
         try:
-            png_bytes = await asyncio.wait_for(
-                asyncio.to_thread(_run_remove_bg_sync, image_bytes, model),
-                timeout=timeout_seconds,
+            png_bytes = await _run_with_timeout(
+                timeout_seconds, image_bytes, model, None, output_format, size_limit, max_dimension,
+                max_frames, max_pixels,
             )
             return png_bytes, None
         except asyncio.TimeoutError:
@@ -105,6 +361,11 @@ async def process_removebg_from_path(
     max_dimension: int = 1024,
     timeout_seconds: float = 120.0,
     model: str = "u2netp",
+    trace=None,
+    output_format: str = "auto",
+    size_limit: Optional[int] = None,
+    max_frames: int = 200,
+    max_pixels: int = 50_000_000,
 ) -> tuple[Optional[bytes], Optional[str]]:
     if not os.path.isfile(file_path):
         return None, "Image file not found."
@@ -115,20 +376,16 @@ async def process_removebg_from_path(
     if ext not in ("png", "jpg", "jpeg", "webp", "bmp", "gif"):
         return None, "Please use an **image** file (PNG, JPG, etc.)."
     try:
-        with open(file_path, "rb") as f:
-            image_bytes = f.read()
+        with trace_span(trace, "ingest"):
+            with open(file_path, "rb") as f:
+                image_bytes = f.read()
     except Exception as e:
         return None, f"Failed to read image: {e}"
-    if max_dimension > 0:
-        try:
-            image_bytes, _ = await asyncio.to_thread(_downscale_if_needed, image_bytes, max_dimension)
-        except Exception:
-            pass
     async with _removebg_semaphore:
         try:
-            png_bytes = await asyncio.wait_for(
-                asyncio.to_thread(_run_remove_bg_sync, image_bytes, model),
-                timeout=timeout_seconds,
+            png_bytes = await _run_with_timeout(
+                timeout_seconds, image_bytes, model, trace, output_format, size_limit, max_dimension,
+                max_frames, max_pixels,
             )
             return png_bytes, None
         except asyncio.TimeoutError:
@@ -140,8 +397,9 @@ def build_removebg_layout(
     png_bytes: bytes,
     footer_text: Optional[str] = None,
     requested_by: Optional[str] = None,
+    output_format: str = "auto",
 ) -> Tuple[Optional[discord.ui.LayoutView], List[discord.File]]:
-    files = [discord.File(io.BytesIO(png_bytes), filename="removebg.png")]
+    files = [discord.File(io.BytesIO(png_bytes), filename=output_filename(png_bytes, output_format))]
     LayoutView = getattr(discord.ui, "LayoutView", None)
     Container = getattr(discord.ui, "Container", None)
     TextDisplay = getattr(discord.ui, "TextDisplay", None)
@@ -183,14 +441,33 @@ class RemoveBgCog(commands.Cog):
         self.BOT_LOGO = getattr(bot, "BOT_LOGO", None)
 
     @discord.app_commands.command(name="removebg", description="Remove background from an image. Upload one image.")
-    async def removebg(self, interaction: discord.Interaction, image: discord.Attachment):
+    @discord.app_commands.describe(output_format="Output file: smallest lossless (default), PNG, WebP, or the mask only")
+    @discord.app_commands.choices(output_format=[
+        discord.app_commands.Choice(name="Auto (smallest)", value="auto"),
+        discord.app_commands.Choice(name="PNG", value="png"),
+        discord.app_commands.Choice(name="WebP (lossless)", value="webp"),
+        discord.app_commands.Choice(name="Mask only", value="mask"),
+    ])
+    async def removebg(
+        self,
+        interaction: discord.Interaction,
+        image: discord.Attachment,
+        output_format: Optional[discord.app_commands.Choice[str]] = None,
+    ):
         guild_id = interaction.guild.id if interaction.guild else 0
         max_mb = self.bot.get_max_removebg_size_mb(guild_id)
         max_dim = getattr(self.bot, "removebg_max_dimension", 1024)
         timeout_s = getattr(self.bot, "removebg_timeout_seconds", 120.0)
         model = getattr(self.bot, "removebg_model", "u2netp")
+        fmt = output_format.value if output_format else self.bot.get_removebg_format(guild_id)
+        output_limit = getattr(self.bot, "get_guild_upload_limit_bytes", None)
         await interaction.response.defer()
-        png_bytes, err = await process_removebg(image, max_mb, max_dimension=max_dim, timeout_seconds=timeout_s, model=model)
+        png_bytes, err = await process_removebg(
+            image, max_mb, max_dimension=max_dim, timeout_seconds=timeout_s, model=model, output_format=fmt,
+            max_frames=getattr(self.bot, "removebg_max_frames", 200),
+            max_pixels=getattr(self.bot, "removebg_max_animated_pixels", 50_000_000),
+            size_limit=output_limit(guild_id) if output_limit else None,
+        )
         if err:
             embed = discord.Embed(description=err, color=0xE74C3C)
             if self.BOT_LOGO:
@@ -201,6 +478,7 @@ class RemoveBgCog(commands.Cog):
             png_bytes,
             footer_text="© TPS Bot (2026) | Remove Background",
             requested_by=None,
+            output_format=fmt,
         )
         if view is not None:
             await interaction.edit_original_response(content="Processed.")
@@ -1,9 +1,12 @@
+from typing import Optional
+
 import discord
 from discord import app_commands
 from discord.ext import commands
 
-from cogs.utils.db import set_system_channel_db, get_system_channel_db
-from cogs.utils.setup_message import build_setup_container_with_image
+from cogs.commands.mediaprocessing.dedup import DEDUP_PRESETS
+from cogs.utils.db import set_system_channel_db, get_system_channel_db, set_dedup_preset_db, set_yt_audio_mode_db, set_removebg_format_db
+from cogs.utils.setup_message import build_setup_container_with_image, image_needs_fetch
 
 SYSTEM_CONFIG = {
     "Remove Background": {
@@ -11,6 +14,8 @@ SYSTEM_CONFIG = {
         "description": (
             "**How to use?**\n"
             "Send an image in this channel and the bot will remove the background.\n\n"
+            "Add `png`, `webp` or `mask` to your message for a specific output file "
+            "(default: the smallest lossless one).\n\n"
             "**Simple, right?** (Max size: **{max_removebg_size_mb} MB**.)"
         ),
     },
@@ -26,14 +31,19 @@ SYSTEM_CONFIG = {
         "key": "yt_download_mp4",
         "description": (
             "**How to use?**\n"
-            "Post a **YouTube URL** in this channel. The bot will download it as **1080p MP4** and send the file here (or to the results channel)."
+            "Post a **YouTube URL** in this channel. The bot will download it as **1080p MP4** and send the file here (or to the results channel).\n\n"
+            "Only need part of it? Add a time range after the URL, e.g. `1:20-1:45`. "
+            "Playlist links work too (add `zip` to get one archive)."
         ),
     },
     "YouTube Download (MP3)": {
         "key": "yt_download_mp3",
         "description": (
             "**How to use?**\n"
-            "Post a **YouTube URL** in this channel. The bot will download it as **320 kbps MP3** and send the file here (or to the results channel)."
+            "Post a **YouTube URL** in this channel. The bot will download it as **{audio_format}** and send the file here (or to the results channel).\n\n"
+            "Add `original` or `mp3` after the URL to pick the format for one download, "
+            "and a time range such as `1:20-1:45` to download only that part. "
+            "Playlist links work too (add `zip` to get one archive)."
         ),
     },
 }
@@ -54,7 +64,13 @@ class ManageSystemCog(commands.Cog):
         )
 
     @app_commands.command(name="managesystem", description="Setup, change, or remove a system channel (e.g. Remove Background, Dedup).")
-    @app_commands.describe(system="Which system to configure", action="Setup this channel, change to this channel, or remove")
+    @app_commands.describe(
+        system="Which system to configure",
+        action="Setup this channel, change to this channel, or remove",
+        dedup_preset="Remove Duplicate Frames only: speed/precision preset for this server",
+        audio_mode="YouTube Download (MP3) only: re-encode to MP3 or send the original audio stream",
+        output_format="Remove Background only: default output file for this server",
+    )
     @app_commands.choices(
         system=[app_commands.Choice(name=k, value=k) for k in SYSTEM_CONFIG.keys()],
         action=[
@@ -62,12 +78,26 @@ class ManageSystemCog(commands.Cog):
             app_commands.Choice(name="Change", value="change"),
             app_commands.Choice(name="Remove", value="remove"),
         ],
+        dedup_preset=[app_commands.Choice(name=k.capitalize(), value=k) for k in DEDUP_PRESETS.keys()],
+        audio_mode=[
+            app_commands.Choice(name="MP3 (re-encode)", value="mp3"),
+            app_commands.Choice(name="Original (Opus/AAC, no re-encode)", value="original"),
+        ],
+        output_format=[
+            app_commands.Choice(name="Auto (smallest lossless)", value="auto"),
+            app_commands.Choice(name="PNG", value="png"),
+            app_commands.Choice(name="WebP (lossless)", value="webp"),
+            app_commands.Choice(name="Mask only (grayscale)", value="mask"),
+        ],
     )
     async def managesystem(
         self,
         interaction: discord.Interaction,
         system: app_commands.Choice[str],
         action: app_commands.Choice[str],
+        dedup_preset: Optional[app_commands.Choice[str]] = None,
+        audio_mode: Optional[app_commands.Choice[str]] = None,
+        output_format: Optional[app_commands.Choice[str]] = None,
     ):
         system_val = system.value
         action_val = action.value
@@ -93,10 +123,47 @@ class ManageSystemCog(commands.Cog):
         key = config["key"]
         current = get_system_channel_db(self.bot.connection, guild_id, key)
 
+        # Per-system options only apply when setting up or changing their own system.
+        options = (
+            ("dedup_preset", dedup_preset, "dedup", "Remove Duplicate Frames"),
+            ("audio_mode", audio_mode, "yt_download_mp3", "YouTube Download (MP3)"),
+            ("output_format", output_format, "removebg", "Remove Background"),
+        )
+        for name, value, owner, owner_name in options:
+            if value is None:
+                continue
+            if key != owner:
+                problem = f"only applies to **{owner_name}**"
+            elif action_val not in ("setup", "change"):
+                problem = "only applies to **Setup** or **Change**"
+            else:
+                continue
+            await interaction.response.send_message(
+                f"`{name}` {problem}. Nothing was changed.",
+                ephemeral=True,
+            )
+            return
+
         if action_val in ("setup", "change"):
             set_system_channel_db(self.bot.connection, guild_id, key, channel_id)
             if hasattr(self.bot, "reload_channels"):
                 self.bot.reload_channels()
+            preset_note = ""
+            if key == "dedup" and dedup_preset is not None:
+                set_dedup_preset_db(self.bot.connection, guild_id, dedup_preset.value)
+                if hasattr(self.bot, "reload_dedup_presets"):
+                    self.bot.reload_dedup_presets()
+                preset_note = f" Dedup preset: **{dedup_preset.name}**."
+            if key == "yt_download_mp3" and audio_mode is not None:
+                set_yt_audio_mode_db(self.bot.connection, guild_id, audio_mode.value)
+                if hasattr(self.bot, "reload_yt_audio_modes"):
+                    self.bot.reload_yt_audio_modes()
+                preset_note = f" Audio mode: **{audio_mode.name}**."
+            if key == "removebg" and output_format is not None:
+                set_removebg_format_db(self.bot.connection, guild_id, output_format.value)
+                if hasattr(self.bot, "reload_removebg_formats"):
+                    self.bot.reload_removebg_formats()
+                preset_note = f" Output format: **{output_format.name}**."
             if action_val == "setup":
                 key = config["key"]
                 if key == "yt_download_mp4":
@@ -104,7 +171,10 @@ class ManageSystemCog(commands.Cog):
                     title = getattr(self.bot, "yt_download_mp4_setup_title", "YouTube Download (MP4)")
                     image_url = getattr(self.bot, "yt_download_mp4_setup_image_url", None)
                 elif key == "yt_download_mp3":
-                    description = config["description"]
+                    mode = self.bot.get_yt_audio_mode(guild_id) if hasattr(self.bot, "get_yt_audio_mode") else "mp3"
+                    description = config["description"].format(
+                        audio_format="original audio (Opus/AAC)" if mode == "original" else "320 kbps MP3",
+                    )
                     title = getattr(self.bot, "yt_download_mp3_setup_title", "YouTube Download (MP3)")
                     image_url = getattr(self.bot, "yt_download_mp3_setup_image_url", None)
                 else:
@@ -116,6 +186,9 @@ class ManageSystemCog(commands.Cog):
                     )
                     title = getattr(self.bot, "removebg_setup_title", "Remove Background System") if key == "removebg" else getattr(self.bot, "dedup_setup_title", "Remove Duplicate Frames System")
                     image_url = getattr(self.bot, "removebg_setup_image_url", None) if key == "removebg" else getattr(self.bot, "dedup_setup_image_url", None)
+                if image_needs_fetch(image_url):
+                    # Fetching the image may outlast Discord's 3s response window.
+                    await interaction.response.defer(ephemeral=True, thinking=True)
                 view, files = await build_setup_container_with_image(
                     title,
                     description,
@@ -133,10 +206,11 @@ class ManageSystemCog(commands.Cog):
                         embed.set_footer(text="TPS BOT | Setup", icon_url=self.BOT_LOGO)
                     msg = await interaction.channel.send(embed=embed)
                 await msg.pin()
-            await interaction.response.send_message(
-                f"The **{system_val}** channel has been {'set' if action_val == 'setup' else 'updated'} to this channel.",
-                ephemeral=True,
-            )
+            reply = f"The **{system_val}** channel has been {'set' if action_val == 'setup' else 'updated'} to this channel.{preset_note}"
+            if interaction.response.is_done():
+                await interaction.followup.send(reply, ephemeral=True)
+            else:
+                await interaction.response.send_message(reply, ephemeral=True)
         else:
             if current is None:
                 await interaction.response.send_message(
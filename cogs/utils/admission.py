@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+import shutil
+from typing import Optional, Tuple
+
+from cogs.utils.db import count_inflight_for_author, count_pending
+from cogs.utils.metrics import metrics
+
+# Systems served by the same worker share one queue for wait estimates.
+QUEUE_GROUPS = {
+    "removebg": ("removebg",),
+    "dedup": ("dedup",),
+    "yt_download_mp4": ("yt_download_mp4", "yt_download_mp3"),
+    "yt_download_mp3": ("yt_download_mp4", "yt_download_mp3"),
+}
+# Used until the metrics store has seen a job for the system.
+DEFAULT_SERVICE_SECONDS = {
+    "removebg": 8.0,
+    "dedup": 30.0,
+    "yt_download_mp4": 25.0,
+    "yt_download_mp3": 15.0,
+}
+PRIORITY_NORMAL = 0
+PRIORITY_BOOSTED = 1
+PRIORITY_STAFF = 2
+PRIORITY_NAMES = {PRIORITY_NORMAL: "normal", PRIORITY_BOOSTED: "boosted", PRIORITY_STAFF: "staff"}
+# Higher priority tiers get a proportionally larger wait budget, so the
+# lowest tier is turned away first as the queue grows.
+PRIORITY_BUDGET_STEP = 0.5
+
+
+def format_eta(seconds: float) -> str:
+    seconds = max(0, int(round(seconds)))
+    if seconds < 60:
+        return f"{seconds}s"
+    if seconds < 3600:
+        return f"{seconds // 60}m"
+    return f"{seconds // 3600}h {seconds % 3600 // 60:02d}m"
+
+
+def service_seconds(system: str) -> float:
+    return metrics.mean_processing_seconds(system) or DEFAULT_SERVICE_SECONDS.get(system, 30.0)
+
+
+def estimate_wait_seconds(connection, system: str) -> Tuple[float, int]:
+    busy = metrics.busy_now()
+    wait = 0.0
+    depth = 0
+    for name in QUEUE_GROUPS.get(system, (system,)):
+        per_job = service_seconds(name)
+        pending = count_pending(connection, name)
+        depth += pending
+        wait += pending * per_job
+        if name in busy:
+            wait += max(0.0, per_job - busy[name])
+    return wait, depth
+
+
+def _disk_free_mb(bot) -> Optional[float]:
+    monitor = getattr(bot, "resource_monitor", None)
+    latest = monitor.latest() if monitor else None
+    if latest and "disk_free_mb" in latest:
+        return latest["disk_free_mb"]
+    try:
+        return shutil.disk_usage(bot.queue_uploads_dir).free / (1024 * 1024)
+    except OSError:
+        return None
+
+
+def submission_priority(bot, message) -> int:
+    author = message.author
+    if author.id in getattr(bot, "manage_user_ids", set()):
+        return PRIORITY_STAFF
+    role_ids = getattr(bot, "queue_priority_role_ids", set())
+    if role_ids and any(role.id in role_ids for role in getattr(author, "roles", None) or []):
+        return PRIORITY_STAFF
+    guild = message.guild
+    if guild and getattr(guild, "premium_subscription_count", 0) >= 7:
+        return PRIORITY_BOOSTED
+    return PRIORITY_NORMAL
+
+
+def check_admission(
+    bot, system: str, author_id: int, priority: int = 0, incoming_bytes: int = 0, items: int = 1,
+) -> Tuple[bool, Optional[str]]:
+    # (admitted, message): rejections carry a retry ETA, admissions carry an
+    # expected-wait notice once the queue is past the warning threshold.
+    # ``items`` is how many downloads the request holds (a playlist is one
+    # queue row but occupies the worker for every entry).
+    connection = bot.connection
+    cap = getattr(bot, "max_inflight_per_user", 0)
+    if cap and count_inflight_for_author(connection, author_id) >= cap:
+        metrics.record_rejection(system, "user cap")
+        return False, f"You already have **{cap}** requests in the queue. Wait for one to finish before sending another."
+
+    reserve_mb = getattr(bot, "min_free_disk_mb", 0)
+    free_mb = _disk_free_mb(bot)
+    if reserve_mb and free_mb is not None:
+        needed = reserve_mb * (2 if priority <= 0 else 1) + incoming_bytes / (1024 * 1024)
+        if free_mb < needed:
+            metrics.record_rejection(system, "disk")
+            return False, "The bot is low on disk space right now. Please try again in a few minutes."
+
+    wait, depth = estimate_wait_seconds(connection, system)
+    wait += max(0, items - 1) * service_seconds(system)
+    budget = getattr(bot, "queue_wait_budget_seconds", 0) * (1 + PRIORITY_BUDGET_STEP * max(0, priority))
+    if budget and wait > budget:
+        metrics.record_rejection(system, "wait budget")
+        return False, (
+            f"The queue is full right now (**{depth}** waiting, about **{format_eta(wait)}**). "
+            f"Please try again in **~{format_eta(wait - budget)}**."
+        )
+    warn = getattr(bot, "queue_wait_warn_seconds", 0)
+    if warn and wait > warn:
+        return True, f"The queue is busy — expected wait is about **{format_eta(wait)}**."
+    return True, None
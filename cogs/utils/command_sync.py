@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+import hashlib
+import json
+import logging
+import os
+import time
+from typing import Iterable, Optional
+
+import discord
+
+from cogs.utils.db import get_bot_state, set_bot_state
+
+logger = logging.getLogger("ae_scripts_bot")
+
+SYNC_MODES = ("auto", "always", "never")
+
+
+def command_tree_hash(tree: discord.app_commands.CommandTree, guild: Optional[discord.abc.Snowflake] = None) -> str:
+    # Hash of the payload Discord would receive, so any change to names,
+    # options, choices or permissions triggers a sync and nothing else does.
+    payload = sorted(
+        (cmd.to_dict(tree) for cmd in tree.get_commands(guild=guild)),
+        key=lambda d: (d.get("type", 1), d["name"]),
+    )
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, separators=(",", ":")).encode("utf-8")).hexdigest()
+
+
+def _load_local(path: str) -> dict:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _stored_hash(connection, path: str, key: str) -> Optional[str]:
+    if connection is not None:
+        return get_bot_state(connection, key)
+    return _load_local(path).get(key)
+
+
+def _store_hash(connection, path: str, key: str, value: str) -> None:
+    if connection is not None and set_bot_state(connection, key, value):
+        return
+    data = _load_local(path)
+    data[key] = value
+    try:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2)
+    except OSError as e:
+        logger.warning("Could not save command tree hash: %s", e)
+
+
+async def _sync_one(tree, connection, path: str, mode: str, guild=None) -> None:
+    # Keyed per application: a different bot token sharing the state store
+    # has its own registered commands and must not skip its first sync.
+    scope = f"guild {guild.id}" if guild else "global"
+    key = f"command_tree_hash:{tree.client.application_id}:{guild.id if guild else 'global'}"
+    current = command_tree_hash(tree, guild)
+    if mode == "auto" and _stored_hash(connection, path, key) == current:
+        logger.info("Command tree unchanged (%s), skipping sync", scope)
+        return
+    start = time.perf_counter()
+    synced = await tree.sync(guild=guild)
+    logger.info("Synced %d commands (%s) in %.2fs", len(synced), scope, time.perf_counter() - start)
+    _store_hash(connection, path, key, current)
+
+
+async def sync_command_tree(
+    bot,
+    connection,
+    mode: str = "auto",
+    guild_ids: Iterable[int] = (),
+    state_path: str = os.path.join(".cache", "command_tree.json"),
+) -> None:
+    # Dev guilds get a copy of the global commands (visible instantly); the
+    # global tree is only pushed when its hash differs from the last sync.
+    if mode == "never":
+        logger.info("Command sync disabled (COMMAND_SYNC=never)")
+        return
+    tree = bot.tree
+    for guild_id in guild_ids:
+        guild = discord.Object(id=guild_id)
+        tree.copy_global_to(guild=guild)
+        try:
+            await _sync_one(tree, connection, state_path, mode, guild)
+        except discord.HTTPException as e:
+            logger.warning("Command sync failed for guild %s: %s", guild_id, e)
+    try:
+        await _sync_one(tree, connection, state_path, mode)
+    except discord.HTTPException as e:
+        logger.warning("Global command sync failed: %s", e)
@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+import hashlib
+import re
+from typing import Optional
+from urllib.parse import parse_qs, urlparse
+
+_YT_ID_RE = re.compile(r"^[\w-]{11}$")
+
+
+def youtube_video_id(url: str) -> Optional[str]:
+    try:
+        parsed = urlparse(url.strip())
+    except ValueError:
+        return None
+    host = (parsed.hostname or "").lower()
+    if host.startswith("www."):
+        host = host[4:]
+    if host.startswith("m."):
+        host = host[2:]
+    candidate = None
+    if host == "youtu.be":
+        candidate = parsed.path.lstrip("/").split("/")[0]
+    elif host.endswith("youtube.com"):
+        if parsed.path == "/watch":
+            candidate = (parse_qs(parsed.query).get("v") or [None])[0]
+        else:
+            parts = parsed.path.strip("/").split("/")
+            if len(parts) >= 2 and parts[0] in ("shorts", "embed", "live", "v"):
+                candidate = parts[1]
+    if candidate and _YT_ID_RE.match(candidate):
+        return candidate
+    return None
+
+
+def url_content_key(system: str, url: str, variant: str = "") -> str:
+    video_id = youtube_video_id(url)
+    ident = f"yt:{video_id}" if video_id else "url:" + hashlib.sha256(url.strip().encode("utf-8")).hexdigest()
+    return f"{system}:{ident}:{variant}"
+
+
+def file_content_key(system: str, data: bytes, variant: str = "") -> str:
+    return f"{system}:sha256:{hashlib.sha256(data).hexdigest()}:{variant}"
@@ -1,6 +1,8 @@
 # -*- coding: utf-8 -*-
 import os
+import json
 import logging
+import time
 from typing import Optional, Tuple
 
 logger = logging.getLogger("ae_scripts_bot")
@@ -72,6 +74,63 @@ TABLE_SCHEMAS = {
             channel_id VARCHAR(255) NOT NULL
         )
     """,
+    "dedup_settings": """
+        CREATE TABLE IF NOT EXISTS dedup_settings (
+            server_id VARCHAR(255) PRIMARY KEY,
+            preset VARCHAR(32) NOT NULL
+        )
+    """,
+    "yt_audio_settings": """
+        CREATE TABLE IF NOT EXISTS yt_audio_settings (
+            server_id VARCHAR(255) PRIMARY KEY,
+            mode VARCHAR(16) NOT NULL
+        )
+    """,
+    "removebg_settings": """
+        CREATE TABLE IF NOT EXISTS removebg_settings (
+            server_id VARCHAR(255) PRIMARY KEY,
+            output_format VARCHAR(16) NOT NULL
+        )
+    """,
+    "dedup_timings": """
+        CREATE TABLE IF NOT EXISTS dedup_timings (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            guild_id BIGINT NOT NULL,
+            preset VARCHAR(32) NOT NULL,
+            original_frames INT NOT NULL,
+            unique_frames INT NOT NULL,
+            elapsed_seconds DOUBLE NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            INDEX idx_preset (preset)
+        )
+    """,
+    "media_queue_subscribers": """
+        CREATE TABLE IF NOT EXISTS media_queue_subscribers (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            job_id INT NOT NULL,
+            guild_id BIGINT NOT NULL,
+            channel_id BIGINT NOT NULL,
+            author_id BIGINT NOT NULL,
+            message_id BIGINT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            INDEX idx_job (job_id)
+        )
+    """,
+    "metrics_rollup": """
+        CREATE TABLE IF NOT EXISTS metrics_rollup (
+            bucket_start BIGINT NOT NULL,
+            `system` VARCHAR(32) NOT NULL,
+            data JSON NOT NULL,
+            PRIMARY KEY (bucket_start, `system`)
+        )
+    """,
+    "bot_state": """
+        CREATE TABLE IF NOT EXISTS bot_state (
+            name VARCHAR(64) PRIMARY KEY,
+            value TEXT NOT NULL,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+        )
+    """,
     "media_queue": """
         CREATE TABLE IF NOT EXISTS media_queue (
             id INT AUTO_INCREMENT PRIMARY KEY,
@@ -83,13 +142,30 @@ TABLE_SCHEMAS = {
             file_path VARCHAR(512) NOT NULL,
             status VARCHAR(32) NOT NULL DEFAULT 'pending',
             error_message TEXT NULL,
+            enqueued_at DOUBLE NULL,
+            priority INT NOT NULL DEFAULT 0,
+            content_key VARCHAR(191) NULL,
+            options JSON NULL,
+            timings JSON NULL,
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
             INDEX idx_system_status (`system`, status),
+            INDEX idx_author_status (author_id, status),
+            INDEX idx_content_key (content_key),
             INDEX idx_created (created_at)
         )
     """,
 }
 
+TABLE_MIGRATIONS = {
+    "media_queue": [
+        ("enqueued_at", "DOUBLE NULL"),
+        ("timings", "JSON NULL"),
+        ("priority", "INT NOT NULL DEFAULT 0"),
+        ("content_key", "VARCHAR(191) NULL"),
+        ("options", "JSON NULL"),
+    ],
+}
+
 def create_db_connection():
     if mysql is None:
         logger.warning("mysql-connector-python not installed. pip install mysql-connector-python")
@@ -128,11 +204,26 @@ def create_table(connection, table_name, schema):
     except Error as e:
         logger.warning("Create table %s error: %s", table_name, e)
 
+def migrate_table(connection, table_name, columns):
+    if connection is None or Error is None:
+        return
+    for column, definition in columns:
+        try:
+            cursor = connection.cursor()
+            cursor.execute("ALTER TABLE `%s` ADD COLUMN `%s` %s" % (table_name, column, definition))
+            connection.commit()
+            cursor.close()
+        except Error as e:
+            if getattr(e, "errno", None) != 1060 and "duplicate column" not in str(e).lower():
+                logger.warning("Migrate table %s.%s error: %s", table_name, column, e)
+
 def initialize_database():
     connection = create_db_connection()
     if connection:
         for table_name, schema in TABLE_SCHEMAS.items():
             create_table(connection, table_name, schema)
+        for table_name, columns in TABLE_MIGRATIONS.items():
+            migrate_table(connection, table_name, columns)
         return connection
     return None
 
@@ -144,15 +235,21 @@ def enqueue_media(
     message_id: Optional[int],
     system: str,
     file_path: str,
+    priority: int = 0,
+    content_key: Optional[str] = None,
+    options: Optional[dict] = None,
 ) -> Optional[int]:
     if connection is None or system not in ("removebg", "dedup", "yt_download_mp4", "yt_download_mp3"):
         return None
     try:
         cursor = connection.cursor()
         cursor.execute(
-            "INSERT INTO media_queue (guild_id, channel_id, author_id, message_id, `system`, file_path, status) "
-            "VALUES (%s, %s, %s, %s, %s, %s, 'pending')",
-            (guild_id, channel_id, author_id, message_id, system, file_path),
+            "INSERT INTO media_queue (guild_id, channel_id, author_id, message_id, `system`, file_path, status, enqueued_at, "
+            "priority, content_key, options) VALUES (%s, %s, %s, %s, %s, %s, 'pending', %s, %s, %s, %s)",
+            (
+                guild_id, channel_id, author_id, message_id, system, file_path, time.time(), priority, content_key,
+                json.dumps(options) if options else None,
+            ),
         )
         connection.commit()
         job_id = cursor.lastrowid
@@ -162,6 +259,67 @@ def enqueue_media(
         logger.warning("enqueue_media error: %s", e)
         return None
 
+def attach_to_active_job(
+    connection,
+    content_key: str,
+    guild_id: int,
+    channel_id: int,
+    author_id: int,
+    message_id: Optional[int],
+    priority: int = 0,
+) -> Optional[int]:
+    if connection is None or not content_key:
+        return None
+    try:
+        cursor = connection.cursor()
+        cursor.execute(
+            "SELECT id FROM media_queue WHERE content_key = %s AND status IN ('pending', 'processing') "
+            "ORDER BY id ASC LIMIT 1",
+            (content_key,),
+        )
+        row = cursor.fetchone()
+        if not row:
+            cursor.close()
+            return None
+        job_id = int(row[0])
+        cursor.execute(
+            "INSERT INTO media_queue_subscribers (job_id, guild_id, channel_id, author_id, message_id) "
+            "VALUES (%s, %s, %s, %s, %s)",
+            (job_id, guild_id, channel_id, author_id, message_id),
+        )
+        # A higher-tier subscriber pulls the shared job forward.
+        cursor.execute(
+            "UPDATE media_queue SET priority = %s WHERE id = %s AND priority < %s",
+            (priority, job_id, priority),
+        )
+        connection.commit()
+        cursor.close()
+        return job_id
+    except Error as e:
+        logger.warning("attach_to_active_job error: %s", e)
+        return None
+
+def pop_queue_subscribers(connection, job_id: int):
+    if connection is None:
+        return []
+    try:
+        cursor = connection.cursor()
+        cursor.execute(
+            "SELECT guild_id, channel_id, author_id, message_id FROM media_queue_subscribers WHERE job_id = %s ORDER BY id ASC",
+            (job_id,),
+        )
+        rows = cursor.fetchall()
+        cursor.execute("DELETE FROM media_queue_subscribers WHERE job_id = %s", (job_id,))
+        connection.commit()
+        cursor.close()
+        return [
+            (int(guild_id), int(channel_id), int(author_id), int(message_id) if message_id else None)
+            for guild_id, channel_id, author_id, message_id in rows
+        ]
+    except Error as e:
+        logger.warning("pop_queue_subscribers error: %s", e)
+        return []
+
 def count_pending(connection, system: str) -> int:
     if connection is None or system not in ("removebg", "dedup", "yt_download_mp4", "yt_download_mp3"):
         return 0
@@ -178,27 +336,59 @@ def count_pending(connection, system: str) -> int:
         logger.warning("count_pending error: %s", e)
         return 0
 
-def get_next_pending(connection, system: str) -> Optional[Tuple[int, int, int, int, Optional[int], str]]:
+def count_inflight_for_author(connection, author_id: int) -> int:
+    if connection is None:
+        return 0
+    try:
+        cursor = connection.cursor()
+        cursor.execute(
+            "SELECT COUNT(*) FROM media_queue WHERE author_id = %s AND status IN ('pending', 'processing')",
+            (author_id,),
+        )
+        row = cursor.fetchone()
+        cursor.close()
+        return int(row[0]) if row else 0
+    except Error as e:
+        logger.warning("count_inflight_for_author error: %s", e)
+        return 0
+
+def get_next_pending(
+    connection, system: str, aging_seconds: float = 120.0
+) -> Optional[Tuple[int, int, int, int, Optional[int], str, Optional[float], int, dict]]:
     if connection is None or system not in ("removebg", "dedup", "yt_download_mp4", "yt_download_mp3"):
         return None
     try:
+        now = time.time()
         cursor = connection.cursor()
         connection.start_transaction()
+        # Every aging_seconds spent waiting is worth one priority tier, so
+        # low-priority jobs still reach the front under sustained load.
         cursor.execute(
-            "SELECT id, guild_id, channel_id, author_id, message_id, file_path FROM media_queue "
-            "WHERE `system` = %s AND status = 'pending' ORDER BY id ASC LIMIT 1 FOR UPDATE",
-            (system,),
+            "SELECT id, guild_id, channel_id, author_id, message_id, file_path, enqueued_at, priority, options FROM media_queue "
+            "WHERE `system` = %s AND status = 'pending' "
+            "ORDER BY priority + (%s - COALESCE(enqueued_at, %s)) / %s DESC, id ASC LIMIT 1 FOR UPDATE",
+            (system, now, now, max(1.0, aging_seconds)),
         )
         row = cursor.fetchone()
         if not row:
             connection.rollback()
             cursor.close()
             return None
-        job_id, guild_id, channel_id, author_id, message_id, file_path = row
+        job_id, guild_id, channel_id, author_id, message_id, file_path, enqueued_at, priority, options = row
         cursor.execute("UPDATE media_queue SET status = 'processing' WHERE id = %s", (job_id,))
         connection.commit()
         cursor.close()
-        return (job_id, int(guild_id), int(channel_id), int(author_id), int(message_id) if message_id else None, file_path)
+        return (
+            job_id,
+            int(guild_id),
+            int(channel_id),
+            int(author_id),
+            int(message_id) if message_id else None,
+            file_path,
+            float(enqueued_at) if enqueued_at is not None else None,
+            int(priority or 0),
+            (json.loads(options) if isinstance(options, (str, bytes)) else options) or {},
+        )
     except Error as e:
         logger.warning("get_next_pending error: %s", e)
         try:
@@ -232,6 +422,20 @@ def set_queue_job_failed(connection, job_id: int, error_message: Optional[str] =
     except Error as e:
         logger.warning("set_queue_job_failed error: %s", e)
 
+def set_queue_job_timings(connection, job_id: int, timings: dict) -> None:
+    if connection is None or not timings:
+        return
+    try:
+        cursor = connection.cursor()
+        cursor.execute(
+            "UPDATE media_queue SET timings = %s WHERE id = %s",
+            (json.dumps(timings, separators=(",", ":")), job_id),
+        )
+        connection.commit()
+        cursor.close()
+    except Error as e:
+        logger.warning("set_queue_job_timings error: %s", e)
+
 def load_channels_from_db(connection):
     if connection is None:
         return {}
@@ -286,3 +490,196 @@ def get_system_channel_db(connection, guild_id: int, system: str) -> Optional[in
     except Error as e:
         logger.warning("get_system_channel_db error: %s", e)
     return None
+
+def load_dedup_presets_from_db(connection):
+    if connection is None:
+        return {}
+    result = {}
+    try:
+        cursor = connection.cursor()
+        cursor.execute("SELECT server_id, preset FROM dedup_settings")
+        for row in cursor.fetchall():
+            if row[1]:
+                result[str(row[0])] = row[1]
+        cursor.close()
+    except Error as e:
+        logger.warning("load_dedup_presets_from_db error: %s", e)
+    return result
+
+def set_dedup_preset_db(connection, guild_id: int, preset: Optional[str]):
+    if connection is None:
+        return
+    try:
+        cursor = connection.cursor()
+        if preset is None:
+            cursor.execute("DELETE FROM dedup_settings WHERE server_id = %s", (str(guild_id),))
+        else:
+            cursor.execute(
+                "INSERT INTO dedup_settings (server_id, preset) VALUES (%s, %s) ON DUPLICATE KEY UPDATE preset = %s",
+                (str(guild_id), preset, preset),
+            )
+        connection.commit()
+        cursor.close()
+    except Error as e:
+        logger.warning("set_dedup_preset_db error: %s", e)
+
+def load_yt_audio_modes_from_db(connection):
+    if connection is None:
+        return {}
+    result = {}
+    try:
+        cursor = connection.cursor()
+        cursor.execute("SELECT server_id, mode FROM yt_audio_settings")
+        for row in cursor.fetchall():
+            if row[1]:
+                result[str(row[0])] = row[1]
+        cursor.close()
+    except Error as e:
+        logger.warning("load_yt_audio_modes_from_db error: %s", e)
+    return result
+
+def set_yt_audio_mode_db(connection, guild_id: int, mode: Optional[str]):
+    if connection is None:
+        return
+    try:
+        cursor = connection.cursor()
+        if mode is None:
+            cursor.execute("DELETE FROM yt_audio_settings WHERE server_id = %s", (str(guild_id),))
+        else:
+            cursor.execute(
+                "INSERT INTO yt_audio_settings (server_id, mode) VALUES (%s, %s) ON DUPLICATE KEY UPDATE mode = %s",
+                (str(guild_id), mode, mode),
+            )
+        connection.commit()
+        cursor.close()
+    except Error as e:
+        logger.warning("set_yt_audio_mode_db error: %s", e)
+
+def load_removebg_formats_from_db(connection):
+    if connection is None:
+        return {}
+    result = {}
+    try:
+        cursor = connection.cursor()
+        cursor.execute("SELECT server_id, output_format FROM removebg_settings")
+        for row in cursor.fetchall():
+            if row[1]:
+                result[str(row[0])] = row[1]
+        cursor.close()
+    except Error as e:
+        logger.warning("load_removebg_formats_from_db error: %s", e)
+    return result
+
+def set_removebg_format_db(connection, guild_id: int, output_format: Optional[str]):
+    if connection is None:
+        return
+    try:
+        cursor = connection.cursor()
+        if output_format is None:
+            cursor.execute("DELETE FROM removebg_settings WHERE server_id = %s", (str(guild_id),))
+        else:
+            cursor.execute(
+                "INSERT INTO removebg_settings (server_id, output_format) VALUES (%s, %s) "
+                "ON DUPLICATE KEY UPDATE output_format = %s",
+                (str(guild_id), output_format, output_format),
+            )
+        connection.commit()
+        cursor.close()
+    except Error as e:
+        logger.warning("set_removebg_format_db error: %s", e)
+
+def record_dedup_timing(connection, guild_id: int, stats: dict) -> None:
+    if connection is None or not stats or not stats.get("preset"):
+        return
+    try:
+        cursor = connection.cursor()
+        cursor.execute(
+            "INSERT INTO dedup_timings (guild_id, preset, original_frames, unique_frames, elapsed_seconds) "
+            "VALUES (%s, %s, %s, %s, %s)",
+            (
+                guild_id,
+                stats["preset"],
+                int(stats.get("originalFrames") or 0),
+                int(stats.get("uniqueFrames") or 0),
+                float(stats.get("elapsedSeconds") or 0.0),
+            ),
+        )
+        connection.commit()
+        cursor.close()
+    except Error as e:
+        logger.warning("record_dedup_timing error: %s", e)
+
+
+def save_metrics_rollup(connection, rows, prune_before: Optional[int] = None) -> bool:
+    # Buckets older than prune_before are dropped in the same transaction.
+    if connection is None:
+        return False
+    try:
+        cursor = connection.cursor()
+        if prune_before is not None:
+            cursor.execute("DELETE FROM metrics_rollup WHERE bucket_start < %s", (prune_before,))
+        for bucket_start, system, data in rows:
+            payload = json.dumps(data, separators=(",", ":"))
+            cursor.execute(
+                "INSERT INTO metrics_rollup (bucket_start, `system`, data) VALUES (%s, %s, %s) "
+                "ON DUPLICATE KEY UPDATE data = %s",
+                (bucket_start, system, payload, payload),
+            )
+        connection.commit()
+        cursor.close()
+        return True
+    except Error as e:
+        logger.warning("save_metrics_rollup error: %s", e)
+        return False
+
+
+def load_metrics_rollup(connection, since: int):
+    if connection is None:
+        return []
+    try:
+        cursor = connection.cursor()
+        cursor.execute(
+            "SELECT bucket_start, `system`, data FROM metrics_rollup WHERE bucket_start >= %s",
+            (since,),
+        )
+        rows = cursor.fetchall()
+        cursor.close()
+    except Error as e:
+        logger.warning("load_metrics_rollup error: %s", e)
+        return []
+    out = []
+    for bucket_start, system, data in rows:
+        try:
+            out.append((int(bucket_start), system, json.loads(data) if isinstance(data, (str, bytes)) else data))
+        except (TypeError, ValueError):
+            continue
+    return out
+
+def get_bot_state(connection, name: str) -> Optional[str]:
+    if connection is None:
+        return None
+    try:
+        cursor = connection.cursor()
+        cursor.execute("SELECT value FROM bot_state WHERE name = %s", (name,))
+        row = cursor.fetchone()
+        cursor.close()
+        return row[0] if row else None
+    except Error as e:
+        logger.warning("get_bot_state error: %s", e)
+        return None
+
+def set_bot_state(connection, name: str, value: str) -> bool:
+    if connection is None:
+        return False
+    try:
+        cursor = connection.cursor()
+        cursor.execute(
+            "INSERT INTO bot_state (name, value) VALUES (%s, %s) ON DUPLICATE KEY UPDATE value = %s",
+            (name, value, value),
+        )
+        connection.commit()
+        cursor.close()
+        return True
+    except Error as e:
+        logger.warning("set_bot_state error: %s", e)
+        return False
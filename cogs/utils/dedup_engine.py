@@ -0,0 +1,418 @@
+# -*- coding: utf-8 -*-
+import logging
+import os
+import queue
+import subprocess
+import tempfile
+import threading
+import time
+from typing import List, Optional
+
+import cv2
+import numpy as np
+
+from cogs.utils.tracing import trace_span
+
+logger = logging.getLogger("ae_scripts_bot")
+
+THUMB_WIDTH = 64
+FLOW_WIDTH = 256
+COMPARE_BATCH = 64
+DEFAULT_MAX_BUFFER_MB = 256
+ENCODER_PRESET = "veryfast"
+ENCODER_CRF = 20
+OUTPUT_SIZE_HEADROOM = 0.92
+MIN_TARGET_KBPS = 150
+# Kept audio is re-encoded (cutting it to the kept ranges needs a filter); its bitrate
+# comes out of the size budget.
+AUDIO_KBPS = 128
+MAX_TARGET_KBPS = 100000
+PROXY_MAX_WIDTH = 480
+# With optical flow on, flow decides every pair. The only pairs it is skipped for are
+# those whose flow-size frames differ by no more than FLOW_NOISE_LEVELS anywhere: flow
+# ignores such pixels, so it would report no motion and call them duplicates anyway.
+# Without optical flow, pairs whose largest block-wise thumbnail difference is below
+# (1 - threshold) * 255 * FAST_DUPLICATE_RATIO are duplicates and everything else is kept.
+FAST_DUPLICATE_RATIO = 0.12
+FLOW_MOTION_SCALE_PX = 10.0
+# Codec noise on held frames is 1-3 levels; Farneback turns it into ~0.5px of
+# motion in flat regions, so flow only counts where pixels actually changed.
+FLOW_NOISE_LEVELS = 4
+
+
+def _resize_gray(frame, width: int):
+    gray = frame if frame.ndim == 2 else cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    h, w = gray.shape
+    if w == width:
+        return gray
+    height = max(1, int(round(h * width / w)))
+    return cv2.resize(gray, (width, height), interpolation=cv2.INTER_AREA)
+
+
+def _region_grid(region_sensitivity: int) -> int:
+    return 2 + 2 * max(0, int(region_sensitivity))
+
+
+def _block_mad(a, b, grid: int):
+    # Per-pair maximum of block-wise mean absolute difference, so a small moving
+    # region is not averaged away by a static background.
+    diff = np.abs(b - a)
+    n, h, w = diff.shape
+    bh, bw = max(1, h // grid), max(1, w // grid)
+    gh, gw = min(grid, h // bh), min(grid, w // bw)
+    blocks = diff[:, : bh * gh, : bw * gw].reshape(n, gh, bh, gw, bw).mean(axis=(2, 4))
+    return blocks.reshape(n, -1).max(axis=1)
+
+
+def _fast_bounds(similarity_threshold: float):
+    slack = (1.0 - similarity_threshold) * 255.0
+    return slack * FAST_DUPLICATE_RATIO, slack
+
+
+def _changed_mask(prev_gray, cur_gray):
+    changed = (cv2.absdiff(prev_gray, cur_gray) > FLOW_NOISE_LEVELS).astype(np.uint8)
+    return cv2.dilate(changed, np.ones((5, 5), np.uint8)) > 0
+
+
+def _is_quiet_pair(prev_gray, cur_gray) -> bool:
+    return int(cv2.absdiff(prev_gray, cur_gray).max()) <= FLOW_NOISE_LEVELS
+
+
+def _flow_similarity(prev_gray, cur_gray, region_sensitivity: int, camera_motion_compensation: bool) -> float:
+    flow = cv2.calcOpticalFlowFarneback(prev_gray, cur_gray, None, 0.5, 3, 15, 3, 5, 1.2, 0)
+    if camera_motion_compensation:
+        flow = flow - np.median(flow.reshape(-1, 2), axis=0)
+    mag = np.hypot(flow[..., 0], flow[..., 1])
+    mag[~_changed_mask(prev_gray, cur_gray)] = 0.0
+    grid = _region_grid(region_sensitivity)
+    h, w = mag.shape
+    bh, bw = max(1, h // grid), max(1, w // grid)
+    gh, gw = min(grid, h // bh), min(grid, w // bw)
+    blocks = mag[: bh * gh, : bw * gw].reshape(gh, bh, gw, bw).mean(axis=(1, 3))
+    return 1.0 - min(1.0, float(blocks.max()) / FLOW_MOTION_SCALE_PX)
+
+
+class TieredComparator:
+    """Keep/drop decision per frame against the previous one.
+
+    ``flow_all_pairs`` runs optical flow even on pairs the noise-floor check
+    already settles.
+    """
+
+    def __init__(
+        self,
+        similarity_threshold: float = 0.95,
+        use_optical_flow: bool = True,
+        region_sensitivity: int = 1,
+        camera_motion_compensation: bool = True,
+        thumb_width: int = THUMB_WIDTH,
+        flow_width: int = FLOW_WIDTH,
+        flow_all_pairs: bool = False,
+    ):
+        self.similarity_threshold = similarity_threshold
+        self.use_optical_flow = use_optical_flow
+        self.region_sensitivity = region_sensitivity
+        self.camera_motion_compensation = camera_motion_compensation
+        self.thumb_width = thumb_width
+        self.flow_width = flow_width
+        self.flow_all_pairs = flow_all_pairs
+        self.dup_mad, _ = _fast_bounds(similarity_threshold)
+        self.flow_pairs = 0
+        self._prev_thumb = None
+        self._prev_flow = None
+
+    def _thumb_mad(self, frames: List):
+        thumbs = np.stack([_resize_gray(f, self.thumb_width) for f in frames]).astype(np.float32)
+        grid = _region_grid(self.region_sensitivity)
+        if self._prev_thumb is not None:
+            stack = np.concatenate((self._prev_thumb[None], thumbs))
+            mad = _block_mad(stack[:-1], stack[1:], grid)
+        else:
+            mad = np.concatenate(([np.inf], _block_mad(thumbs[:-1], thumbs[1:], grid)))
+        self._prev_thumb = thumbs[-1]
+        return mad
+
+    def compare_batch(self, frames: List) -> List[bool]:
+        if not frames:
+            return []
+        if not self.use_optical_flow:
+            mad = self._thumb_mad(frames)
+            return ((mad > self.dup_mad) | ~np.isfinite(mad)).tolist()
+        keep = np.zeros(len(frames), dtype=bool)
+        if self._prev_flow is None:
+            keep[0] = True
+        grays = [_resize_gray(f, self.flow_width) for f in frames]
+        for i in np.flatnonzero(~keep):
+            prev = grays[i - 1] if i > 0 else self._prev_flow
+            if not self.flow_all_pairs and _is_quiet_pair(prev, grays[i]):
+                continue
+            score = _flow_similarity(prev, grays[i], self.region_sensitivity, self.camera_motion_compensation)
+            keep[i] = score < self.similarity_threshold
+            self.flow_pairs += 1
+        self._prev_flow = grays[-1]
+        return keep.tolist()
+
+
+def _probe(input_path: str):
+    cap = cv2.VideoCapture(input_path)
+    if not cap.isOpened():
+        raise RuntimeError("Could not open video.")
+    try:
+        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+        frame_count = max(0, int(cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0))
+    finally:
+        cap.release()
+    if width <= 0 or height <= 0:
+        raise RuntimeError("Could not read video dimensions.")
+    return width, height, fps, frame_count
+
+
+def _probe_duration(input_path: str) -> Optional[float]:
+    # Container duration from ffprobe; OpenCV's frame count is often 0 or an estimate.
+    cmd = [
+        "ffprobe", "-v", "error", "-show_entries", "format=duration",
+        "-of", "default=noprint_wrappers=1:nokey=1", input_path,
+    ]
+    try:
+        result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, timeout=30)
+    except (OSError, subprocess.TimeoutExpired) as e:
+        logger.warning("ffprobe failed for %s: %s", input_path, e)
+        return None
+    try:
+        duration = float(result.stdout.decode(errors="ignore").strip())
+    except ValueError:
+        return None
+    return duration if duration > 0 else None
+
+
+def _proxy_size(width: int, height: int, analysis_width: int):
+    pw = min(width, max(16, analysis_width))
+    ph = max(2, int(round(height * pw / width / 2)) * 2)
+    return pw, ph
+
+
+def _put(frames_q: "queue.Queue", item, stop: threading.Event) -> bool:
+    while not stop.is_set():
+        try:
+            frames_q.put(item, timeout=0.5)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _decode_proxy(input_path: str, pw: int, ph: int, frames_q: "queue.Queue", stop: threading.Event) -> None:
+    cmd = [
+        "ffmpeg", "-loglevel", "error", "-i", input_path, "-an", "-sn",
+        "-vf", f"scale={pw}:{ph}:flags=area,format=gray",
+        "-fps_mode", "passthrough", "-f", "rawvideo", "-pix_fmt", "gray", "-",
+    ]
+    frame_bytes = pw * ph
+    proc = None
+    # stderr goes to a file so a chatty ffmpeg can never block on a full pipe.
+    errors = tempfile.TemporaryFile()
+    try:
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=errors, bufsize=frame_bytes * 4)
+        while not stop.is_set():
+            buf = proc.stdout.read(frame_bytes)
+            if len(buf) < frame_bytes:
+                break
+            frame = np.frombuffer(buf, dtype=np.uint8).reshape(ph, pw)
+            if not _put(frames_q, frame, stop):
+                break
+        if not stop.is_set() and proc.wait() != 0:
+            errors.seek(0)
+            detail = errors.read().decode(errors="ignore").strip()[-300:]
+            raise RuntimeError(f"FFmpeg decode failed: {detail}")
+    except Exception as e:
+        _put(frames_q, e, stop)
+        return
+    finally:
+        if proc is not None:
+            if proc.poll() is None:
+                proc.kill()
+            proc.wait()
+        errors.close()
+    _put(frames_q, None, stop)
+
+
+def _target_kbps(max_output_bytes: Optional[int], duration_seconds: float) -> Optional[int]:
+    if not max_output_bytes or duration_seconds <= 0:
+        return None
+    kbps = int(max_output_bytes * 8 * OUTPUT_SIZE_HEADROOM / duration_seconds / 1000)
+    return kbps if kbps < MAX_TARGET_KBPS else None
+
+
+def _keep_ranges(keep: List[bool]) -> List[tuple]:
+    ranges = []
+    start = None
+    for i, k in enumerate(keep):
+        if k and start is None:
+            start = i
+        elif not k and start is not None:
+            ranges.append((start, i - 1))
+            start = None
+    if start is not None:
+        ranges.append((start, len(keep) - 1))
+    return ranges
+
+
+def _select_expr(ranges: List[tuple], var: str = "n") -> str:
+    # Balanced if() tree over the sorted ranges: each frame evaluates O(log ranges)
+    # terms and the parser nests O(log ranges) deep, instead of one term per range.
+    if len(ranges) == 1:
+        a, b = ranges[0]
+        return f"between({var},{a},{b})" if a != b else f"eq({var},{a})"
+    mid = len(ranges) // 2
+    return f"if(lt({var},{ranges[mid][0]}),{_select_expr(ranges[:mid], var)},{_select_expr(ranges[mid:], var)})"
+
+
+def _encode_selected(input_path: str, output_path: str, keep: List[bool], fps: float, max_kbps: Optional[int] = None) -> None:
+    ranges = _keep_ranges(keep)
+    # Audio keeps the same stretches of time as the kept frames, so it stays in sync
+    # with the shortened video.
+    seconds = [(f"{a / fps:.6f}", f"{(b + 1) / fps:.6f}") for a, b in ranges]
+    video_script = output_path + ".select.txt"
+    audio_script = output_path + ".aselect.txt"
+    with open(video_script, "w", encoding="ascii") as f:
+        f.write(f"select='{_select_expr(ranges)}',setpts=N/({fps:.6f}*TB),scale=trunc(iw/2)*2:trunc(ih/2)*2")
+    with open(audio_script, "w", encoding="ascii") as f:
+        f.write(f"aselect='{_select_expr(seconds, 't')}',asetpts=N/SR/TB")
+    cmd = [
+        "ffmpeg", "-y", "-loglevel", "error", "-i", input_path, "-sn",
+        "-map", "0:v:0", "-map", "0:a:0?",
+        "-filter_script:v", video_script, "-filter_script:a", audio_script, "-r", f"{fps:.6f}",
+        "-c:v", "libx264", "-preset", ENCODER_PRESET, "-threads", "0",
+        "-crf", str(ENCODER_CRF),
+    ]
+    if max_kbps:
+        # CRF with a VBV cap: quality-driven, but never above what fits the upload limit.
+        video_kbps = max(MIN_TARGET_KBPS, max_kbps - AUDIO_KBPS)
+        cmd += ["-maxrate", f"{video_kbps}k", "-bufsize", f"{video_kbps}k"]
+    cmd += ["-c:a", "aac", "-b:a", f"{AUDIO_KBPS}k", "-pix_fmt", "yuv420p", "-movflags", "+faststart", output_path]
+    try:
+        result = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    finally:
+        for path in (video_script, audio_script):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+    if result.returncode != 0:
+        raise RuntimeError(f"FFmpeg encode failed: {result.stderr.decode(errors='ignore').strip()[:300]}")
+
+
+def _compare_stream(
+    input_path: str,
+    comparator: TieredComparator,
+    width: int,
+    height: int,
+    max_buffer_mb: int = DEFAULT_MAX_BUFFER_MB,
+    progress: Optional[dict] = None,
+    trace=None,
+):
+    # Analysis runs on a small grayscale proxy decoded by ffmpeg; full-resolution
+    # frames are only touched once, by the final select/encode pass.
+    thumb_width, flow_width = comparator.thumb_width, comparator.flow_width
+    analysis_width = max(thumb_width, flow_width if comparator.use_optical_flow else thumb_width)
+    pw, ph = _proxy_size(width, height, min(PROXY_MAX_WIDTH, analysis_width))
+    comparator.thumb_width = min(thumb_width, pw)
+    comparator.flow_width = min(flow_width, pw)
+    capacity = max(2, (max(1, max_buffer_mb) * 1024 * 1024) // (pw * ph))
+    batch_size = max(1, min(COMPARE_BATCH, capacity // 2))
+    frames_q = queue.Queue(maxsize=max(1, capacity - batch_size))
+    stop = threading.Event()
+    decoder = threading.Thread(target=_decode_proxy, args=(input_path, pw, ph, frames_q, stop), daemon=True)
+    decoder.start()
+    keep: List[bool] = []
+    compare_start = time.time()
+    try:
+        done = False
+        while not done:
+            batch = []
+            while len(batch) < batch_size:
+                item = frames_q.get()
+                if item is None:
+                    done = True
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                batch.append(item)
+            keep.extend(comparator.compare_batch(batch))
+            if progress is not None:
+                progress["done"] = len(keep)
+                if len(keep) > progress.get("total", 0):
+                    progress["total"] = len(keep)
+    finally:
+        stop.set()
+        decoder.join(timeout=5)
+        if trace is not None:
+            trace.add("compare", compare_start, time.time())
+    return keep, (pw, ph)
+
+
+def remove_duplicate_frames(
+    input_path: str,
+    output_path: str,
+    similarity_threshold: float = 0.95,
+    use_optical_flow: bool = True,
+    region_sensitivity: int = 1,
+    camera_motion_compensation: bool = True,
+    thumb_width: int = THUMB_WIDTH,
+    flow_width: int = FLOW_WIDTH,
+    flow_all_pairs: bool = False,
+    max_buffer_mb: int = DEFAULT_MAX_BUFFER_MB,
+    progress: Optional[dict] = None,
+    max_output_bytes: Optional[int] = None,
+    trace=None,
+) -> dict:
+    comparator = TieredComparator(
+        similarity_threshold=similarity_threshold,
+        use_optical_flow=use_optical_flow,
+        region_sensitivity=region_sensitivity,
+        camera_motion_compensation=camera_motion_compensation,
+        thumb_width=thumb_width,
+        flow_width=flow_width,
+        flow_all_pairs=flow_all_pairs,
+    )
+    with trace_span(trace, "ingest"):
+        width, height, fps, frame_count = _probe(input_path)
+        duration = _probe_duration(input_path) if max_output_bytes else None
+    # Dropping frames at a fixed fps only shortens the clip, so the input duration
+    # bounds the output duration and the bitrate cap guarantees the size limit.
+    max_kbps = _target_kbps(max_output_bytes, duration or 0)
+    if max_kbps is not None and max_kbps - AUDIO_KBPS < MIN_TARGET_KBPS:
+        raise RuntimeError(
+            f"Video is too long to fit under {max_output_bytes / (1024 * 1024):.0f} MB. Use a shorter clip."
+        )
+    if progress is not None:
+        progress["total"] = frame_count
+        progress["done"] = 0
+    keep, (pw, ph) = _compare_stream(input_path, comparator, width, height, max_buffer_mb, progress, trace)
+    total = len(keep)
+    if total == 0:
+        raise RuntimeError("Video has no frames.")
+    unique = sum(keep)
+    if max_output_bytes and duration is None:
+        # No container duration: the decoded frame count at the output fps is the
+        # input timeline the encode is paced to.
+        max_kbps = _target_kbps(max_output_bytes, total / fps)
+        if max_kbps is not None and max_kbps - AUDIO_KBPS < MIN_TARGET_KBPS:
+            raise RuntimeError(
+                f"Video is too long to fit under {max_output_bytes / (1024 * 1024):.0f} MB. Use a shorter clip."
+            )
+    with trace_span(trace, "encode"):
+        _encode_selected(input_path, output_path, keep, fps, max_kbps)
+    logger.info(
+        "Dedup: %d frames, %d unique, %d pairs sent to optical flow (proxy %dx%d)",
+        total, unique, comparator.flow_pairs, pw, ph,
+    )
+    return {
+        "originalFrames": total,
+        "duplicateFrames": total - unique,
+        "uniqueFrames": unique,
+        "opticalFlowPairs": comparator.flow_pairs,
+        "maxBitrateKbps": max_kbps,
+    }
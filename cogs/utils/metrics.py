@@ -0,0 +1,287 @@
+# -*- coding: utf-8 -*-
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, Optional
+
+BUCKET_SECONDS = 60
+RETENTION_SECONDS = 24 * 3600
+# Upper bounds (seconds) of the latency histogram buckets; the last bucket is open-ended.
+HIST_BOUNDS = (0.25, 0.5, 1, 2, 5, 10, 20, 30, 60, 120, 300, 600, 1800, 3600)
+
+
+def _empty_hist() -> List[int]:
+    return [0] * (len(HIST_BOUNDS) + 1)
+
+
+def _hist_add(hist: List[int], seconds: float) -> None:
+    for i, bound in enumerate(HIST_BOUNDS):
+        if seconds <= bound:
+            hist[i] += 1
+            return
+    hist[-1] += 1
+
+
+def hist_percentile(hist: List[int], pct: float) -> Optional[float]:
+    total = sum(hist)
+    if not total:
+        return None
+    target = total * pct / 100.0
+    seen = 0
+    for i, count in enumerate(hist):
+        if count and seen + count >= target:
+            lo = HIST_BOUNDS[i - 1] if i > 0 else 0.0
+            hi = HIST_BOUNDS[i] if i < len(HIST_BOUNDS) else HIST_BOUNDS[-1] * 2
+            return lo + (hi - lo) * (target - seen) / count
+        seen += count
+    return float(HIST_BOUNDS[-1])
+
+
+def error_key(message: Optional[str]) -> str:
+    text = (message or "unknown").replace("*", "").strip()
+    for sep in (":", "."):
+        if sep in text:
+            text = text.split(sep, 1)[0]
+    return text[:60] or "unknown"
+
+
+class _Bucket:
+    __slots__ = (
+        "completed", "failed", "rejected", "errors", "processing", "processing_sum", "wait", "encode", "tiers",
+        "busy_seconds", "cache", "dirty",
+    )
+
+    def __init__(self):
+        self.completed = 0
+        self.failed = 0
+        self.rejected = Counter()
+        self.errors = Counter()
+        self.processing = _empty_hist()
+        self.processing_sum = 0.0
+        self.wait = _empty_hist()
+        self.encode = _empty_hist()
+        # priority tier -> end-to-end latency (wait + processing) histogram
+        self.tiers = {}
+        self.busy_seconds = 0.0
+        self.cache = {}
+        self.dirty = True
+
+    def to_row(self) -> dict:
+        return {
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": dict(self.rejected),
+            "errors": dict(self.errors),
+            "processing": self.processing,
+            "processing_sum": round(self.processing_sum, 3),
+            "wait": self.wait,
+            "encode": self.encode,
+            "tiers": self.tiers,
+            "busy_seconds": round(self.busy_seconds, 3),
+            "cache": self.cache,
+        }
+
+    @classmethod
+    def from_row(cls, data: dict) -> "_Bucket":
+        b = cls()
+        b.completed = int(data.get("completed") or 0)
+        b.failed = int(data.get("failed") or 0)
+        b.rejected = Counter(data.get("rejected") or {})
+        b.errors = Counter(data.get("errors") or {})
+        b.processing = list(data.get("processing") or _empty_hist())
+        b.processing_sum = float(data.get("processing_sum") or 0.0)
+        b.wait = list(data.get("wait") or _empty_hist())
+        b.encode = list(data.get("encode") or _empty_hist())
+        b.tiers = {str(k): list(v) for k, v in (data.get("tiers") or {}).items()}
+        b.busy_seconds = float(data.get("busy_seconds") or 0.0)
+        b.cache = {k: list(v) for k, v in (data.get("cache") or {}).items()}
+        b.dirty = False
+        return b
+
+
+class MetricsStore:
+    def __init__(self):
+        self._lock = threading.Lock()
+        # (bucket_start, system) -> _Bucket
+        self._buckets: Dict[tuple, _Bucket] = {}
+        self._busy_since: Dict[str, float] = {}
+        self._workers: Dict[str, int] = {}
+        # phase -> seconds since process start (or duration); only the first value is kept
+        self._startup: Dict[str, float] = {}
+        self._pruned_at = 0
+
+    def _bucket(self, system: str, ts: Optional[float] = None) -> _Bucket:
+        start = int((ts or time.time()) // BUCKET_SECONDS * BUCKET_SECONDS)
+        key = (start, system)
+        b = self._buckets.get(key)
+        if b is None:
+            # Drop expired buckets once per new minute, so memory stays bounded even
+            # when nobody asks for a summary.
+            if start > self._pruned_at:
+                self._pruned_at = start
+                self._prune()
+            b = self._buckets[key] = _Bucket()
+        b.dirty = True
+        return b
+
+    def register_worker(self, system: str) -> None:
+        with self._lock:
+            self._workers[system] = self._workers.get(system, 0) + 1
+
+    def record_job(
+        self,
+        system: str,
+        processing_seconds: float,
+        wait_seconds: Optional[float] = None,
+        error: Optional[str] = None,
+        tier: Optional[int] = None,
+        encode_seconds: Optional[float] = None,
+    ) -> None:
+        with self._lock:
+            b = self._bucket(system)
+            if error:
+                b.failed += 1
+                b.errors[error_key(error)] += 1
+            else:
+                b.completed += 1
+            _hist_add(b.processing, max(0.0, processing_seconds))
+            b.processing_sum += max(0.0, processing_seconds)
+            if wait_seconds is not None:
+                _hist_add(b.wait, max(0.0, wait_seconds))
+            if encode_seconds is not None:
+                _hist_add(b.encode, max(0.0, encode_seconds))
+            if tier is not None:
+                hist = b.tiers.setdefault(str(tier), _empty_hist())
+                _hist_add(hist, max(0.0, processing_seconds + (wait_seconds or 0.0)))
+
+    def record_startup(self, phase: str, seconds: float) -> None:
+        with self._lock:
+            self._startup.setdefault(phase, seconds)
+
+    def startup(self) -> Dict[str, float]:
+        with self._lock:
+            return dict(self._startup)
+
+    def record_rejection(self, system: str, reason: str) -> None:
+        with self._lock:
+            self._bucket(system).rejected[reason] += 1
+
+    def mean_processing_seconds(self, system: str, window_seconds: int = 3600) -> Optional[float]:
+        cutoff = time.time() - window_seconds
+        total = 0
+        seconds = 0.0
+        with self._lock:
+            for (start, name), b in self._buckets.items():
+                if name == system and start + BUCKET_SECONDS > cutoff:
+                    total += b.completed + b.failed
+                    seconds += b.processing_sum
+        return seconds / total if total else None
+
+    def record_cache(self, name: str, hit: bool) -> None:
+        with self._lock:
+            b = self._bucket("cache")
+            counts = b.cache.setdefault(name, [0, 0])
+            counts[0 if hit else 1] += 1
+
+    def job_started(self, system: str) -> None:
+        with self._lock:
+            self._busy_since[system] = time.time()
+
+    def job_finished(self, system: str) -> None:
+        with self._lock:
+            started = self._busy_since.pop(system, None)
+            if started is None:
+                return
+            now = time.time()
+            # Split busy time across minute buckets so utilization stays accurate.
+            t = started
+            while t < now:
+                edge = min(now, (t // BUCKET_SECONDS + 1) * BUCKET_SECONDS)
+                self._bucket(system, t).busy_seconds += edge - t
+                t = edge
+
+    def _prune(self) -> None:
+        cutoff = time.time() - RETENTION_SECONDS
+        for key in [k for k in self._buckets if k[0] < cutoff]:
+            del self._buckets[key]
+
+    def summary(self, window_seconds: int) -> Dict[str, dict]:
+        now = time.time()
+        cutoff = now - window_seconds
+        out: Dict[str, dict] = {}
+        with self._lock:
+            self._prune()
+            for (start, system), b in self._buckets.items():
+                if start + BUCKET_SECONDS <= cutoff:
+                    continue
+                s = out.setdefault(system, {
+                    "completed": 0, "failed": 0, "rejected": Counter(), "errors": Counter(),
+                    "processing": _empty_hist(), "wait": _empty_hist(), "encode": _empty_hist(), "tiers": {},
+                    "busy_seconds": 0.0, "cache": {},
+                })
+                s["completed"] += b.completed
+                s["failed"] += b.failed
+                s["rejected"].update(b.rejected)
+                s["errors"].update(b.errors)
+                s["processing"] = [x + y for x, y in zip(s["processing"], b.processing)]
+                s["wait"] = [x + y for x, y in zip(s["wait"], b.wait)]
+                s["encode"] = [x + y for x, y in zip(s["encode"], b.encode)]
+                for tier, hist in b.tiers.items():
+                    prev = s["tiers"].get(tier, _empty_hist())
+                    s["tiers"][tier] = [x + y for x, y in zip(prev, hist)]
+                s["busy_seconds"] += b.busy_seconds
+                for name, (hits, misses) in b.cache.items():
+                    c = s["cache"].setdefault(name, [0, 0])
+                    c[0] += hits
+                    c[1] += misses
+        for system, s in out.items():
+            total = s["completed"] + s["failed"]
+            s["total"] = total
+            s["failure_rate"] = (s["failed"] / total) if total else 0.0
+            s["processing_p50"] = hist_percentile(s["processing"], 50)
+            s["processing_p95"] = hist_percentile(s["processing"], 95)
+            s["wait_p50"] = hist_percentile(s["wait"], 50)
+            s["wait_p95"] = hist_percentile(s["wait"], 95)
+            s["encode_count"] = sum(s["encode"])
+            s["encode_p50"] = hist_percentile(s["encode"], 50)
+            s["encode_p95"] = hist_percentile(s["encode"], 95)
+            s["tier_latency"] = {
+                int(tier): (sum(hist), hist_percentile(hist, 50), hist_percentile(hist, 95))
+                for tier, hist in s["tiers"].items()
+            }
+            s["utilization"] = min(1.0, s["busy_seconds"] / (window_seconds * max(1, self._workers.get(system, 1))))
+        return out
+
+    def busy_now(self) -> Dict[str, float]:
+        now = time.time()
+        with self._lock:
+            return {system: now - since for system, since in self._busy_since.items()}
+
+    def worker_counts(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._workers)
+
+    def dirty_rows(self) -> list:
+        with self._lock:
+            rows = []
+            for (start, system), b in self._buckets.items():
+                if b.dirty:
+                    rows.append((start, system, b.to_row()))
+                    b.dirty = False
+            return rows
+
+    def mark_dirty(self, rows) -> None:
+        with self._lock:
+            for start, system, _ in rows:
+                b = self._buckets.get((start, system))
+                if b is not None:
+                    b.dirty = True
+
+    def load_rows(self, rows) -> None:
+        with self._lock:
+            for start, system, data in rows:
+                if (start, system) not in self._buckets:
+                    self._buckets[(start, system)] = _Bucket.from_row(data or {})
+
+
+metrics = MetricsStore()
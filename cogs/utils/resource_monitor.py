@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import logging
+import os
+import shutil
+import time
+from collections import deque
+from typing import List, Optional
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+logger = logging.getLogger("ae_scripts_bot")
+
+SPARK_CHARS = "▁▂▃▄▅▆▇█"
+
+
+def sparkline(values: List[Optional[float]], width: int = 20) -> str:
+    values = [v for v in values if v is not None][-width:]
+    if not values:
+        return ""
+    lo, hi = min(values), max(values)
+    if hi - lo < 1e-9:
+        return SPARK_CHARS[0] * len(values)
+    step = (hi - lo) / (len(SPARK_CHARS) - 1)
+    return "".join(SPARK_CHARS[int(round((v - lo) / step))] for v in values)
+
+
+def _dir_size_bytes(path: str) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for f in files:
+            try:
+                total += os.path.getsize(os.path.join(root, f))
+            except OSError:
+                pass
+    return total
+
+
+class ResourceMonitor:
+    def __init__(self, uploads_dir: str, interval: float = 5.0, size: int = 120):
+        self.uploads_dir = uploads_dir
+        self.interval = interval
+        self.samples = deque(maxlen=size)
+        self._proc = psutil.Process() if psutil else None
+        self._task = None
+        if psutil:
+            # First call primes the counters; later calls are non-blocking deltas.
+            psutil.cpu_percent(None)
+
+    def _sample_sync(self) -> dict:
+        sample = {"ts": time.time()}
+        if psutil:
+            try:
+                sample["cpu"] = psutil.cpu_percent(None)
+                sample["mem_percent"] = psutil.virtual_memory().percent
+                rss = self._proc.memory_info().rss
+                children = 0
+                for child in self._proc.children(recursive=True):
+                    try:
+                        rss += child.memory_info().rss
+                        children += 1
+                    except psutil.Error:
+                        pass
+                sample["rss_mb"] = rss / (1024 * 1024)
+                sample["workers"] = children
+                if hasattr(self._proc, "num_fds"):
+                    sample["fds"] = self._proc.num_fds()
+                else:
+                    sample["fds"] = self._proc.num_handles()
+            except psutil.Error as e:
+                logger.warning("Resource sample failed: %s", e)
+        try:
+            sample["uploads_mb"] = _dir_size_bytes(self.uploads_dir) / (1024 * 1024)
+            sample["disk_free_mb"] = shutil.disk_usage(self.uploads_dir).free / (1024 * 1024)
+        except OSError:
+            pass
+        return sample
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        try:
+            first = await asyncio.to_thread(self._sample_sync)
+            first["loop_lag_ms"] = 0.0
+            self.samples.append(first)
+        except Exception as e:
+            logger.warning("Resource monitor error: %s", e)
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag_ms = max(0.0, (loop.time() - expected) * 1000)
+            try:
+                sample = await asyncio.to_thread(self._sample_sync)
+            except Exception as e:
+                logger.warning("Resource monitor error: %s", e)
+                continue
+            sample["loop_lag_ms"] = lag_ms
+            self.samples.append(sample)
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        return self._task
+
+    def latest(self) -> Optional[dict]:
+        return self.samples[-1] if self.samples else None
+
+    def series(self, key: str) -> List[Optional[float]]:
+        return [s.get(key) for s in self.samples]
@@ -1,7 +1,10 @@
 import asyncio
+import hashlib
 import io
-import urllib.request
-from typing import Optional, List, Tuple
+import json
+import os
+import time
+from typing import Dict, Optional, List, Tuple
 
 import discord
 
@@ -32,15 +35,126 @@ def build_text_container(
 
     return TextLayout(), []
 
+IMAGE_MAX_BYTES = 8 * 1024 * 1024
+# Cached images younger than this are served without asking the server again.
+IMAGE_FRESH_SECONDS = 3600
+_image_cache_dir = os.path.join(".cache", "setup_images")
+_image_memory: Dict[str, Tuple[bytes, dict]] = {}
+_http_session = None
+
+
+def configure_image_cache(path: str) -> None:
+    global _image_cache_dir
+    _image_cache_dir = path
+
+
+def _cache_paths(url: str) -> Tuple[str, str]:
+    key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+    return os.path.join(_image_cache_dir, f"{key}.bin"), os.path.join(_image_cache_dir, f"{key}.json")
+
+
+def _load_cached(url: str) -> Optional[Tuple[bytes, dict]]:
+    cached = _image_memory.get(url)
+    if cached is not None:
+        return cached
+    data_path, meta_path = _cache_paths(url)
+    try:
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        with open(data_path, "rb") as f:
+            data = f.read()
+    except (OSError, ValueError):
+        return None
+    _image_memory[url] = (data, meta)
+    return data, meta
+
+
+def _store_cached(url: str, data: bytes, meta: dict) -> None:
+    _image_memory[url] = (data, meta)
+    data_path, meta_path = _cache_paths(url)
+    try:
+        os.makedirs(_image_cache_dir, exist_ok=True)
+        tmp = data_path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, data_path)
+        with open(meta_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+    except OSError:
+        pass
+
+
+def image_needs_fetch(url: Optional[str]) -> bool:
+    """True when building a setup message for this URL would hit the network."""
+    if not url:
+        return False
+    cached = _load_cached(url)
+    return cached is None or time.time() - cached[1].get("fetched_at", 0) > IMAGE_FRESH_SECONDS
+
+
+def _get_session():
+    global _http_session
+    import aiohttp
+    if _http_session is None or _http_session.closed:
+        _http_session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=8, ttl_dns_cache=300),
+            timeout=aiohttp.ClientTimeout(total=10),
+            headers={"User-Agent": "AE-Scripts-Bot/1.0"},
+        )
+    return _http_session
+
+
+async def close_image_session() -> None:
+    global _http_session
+    if _http_session is not None and not _http_session.closed:
+        await _http_session.close()
+    _http_session = None
+
+
 async def _fetch_image(url: str) -> Optional[bytes]:
-    def _get():
-        try:
-            req = urllib.request.Request(url, headers={"User-Agent": "AE-Scripts-Bot/1.0"})
-            with urllib.request.urlopen(req, timeout=10) as resp:
-                return resp.read()
-        except Exception:
-            return None
-    return await asyncio.to_thread(_get)
+    # Revalidate with ETag / Last-Modified once stale; fall back to the cached copy on errors.
+    cached = _load_cached(url)
+    if cached is not None and not image_needs_fetch(url):
+        return cached[0]
+    headers = {}
+    if cached is not None:
+        if cached[1].get("etag"):
+            headers["If-None-Match"] = cached[1]["etag"]
+        if cached[1].get("last_modified"):
+            headers["If-Modified-Since"] = cached[1]["last_modified"]
+    try:
+        async with _get_session().get(url, headers=headers) as resp:
+            if resp.status == 304 and cached is not None:
+                meta = dict(cached[1], fetched_at=time.time())
+                _store_cached(url, cached[0], meta)
+                return cached[0]
+            if resp.status != 200:
+                return cached[0] if cached else None
+            chunks = []
+            size = 0
+            async for chunk in resp.content.iter_chunked(64 * 1024):
+                size += len(chunk)
+                if size > IMAGE_MAX_BYTES:
+                    return None
+                chunks.append(chunk)
+            data = b"".join(chunks)
+            meta = {
+                "url": url,
+                "etag": resp.headers.get("ETag"),
+                "last_modified": resp.headers.get("Last-Modified"),
+                "fetched_at": time.time(),
+            }
+    except Exception:
+        return cached[0] if cached else None
+    _store_cached(url, data, meta)
+    return data
+
+
+async def prefetch_images(urls) -> int:
+    """Warm the cache for the configured setup images; returns how many are available."""
+    unique = [u for u in dict.fromkeys(urls) if u]
+    results = await asyncio.gather(*(_fetch_image(u) for u in unique), return_exceptions=True)
+    return sum(1 for r in results if isinstance(r, bytes))
 
 async def build_setup_container_with_image(
     title: str,
@@ -69,7 +183,7 @@ async def build_setup_container_with_image(
     files = []
     if image_url and MediaGallery and MediaGalleryItem:
         image_bytes = await _fetch_image(image_url)
-        if image_bytes and len(image_bytes) < 8 * 1024 * 1024:
+        if image_bytes and len(image_bytes) < IMAGE_MAX_BYTES:
             f = discord.File(io.BytesIO(image_bytes), filename="setup.png")
             files.append(f)
             container_children.append(MediaGallery(MediaGalleryItem(f)))
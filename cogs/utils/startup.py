@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import importlib
+import logging
+import sys
+import threading
+import time
+from typing import Dict, List, Optional
+
+logger = logging.getLogger("ae_scripts_bot")
+
+PROCESS_START = time.time()
+
+# Imported in the background right after on_ready, so neither the gateway
+# connect nor the first job pays for them. Missing optional packages are skipped.
+WARMUP_MODULES = (
+    "PIL.Image",
+    "numpy",
+    "cv2",
+    "cogs.utils.dedup_engine",
+    "yt_dlp",
+    "cogs.utils.yt_downloader",
+    "onnxruntime",
+    "rembg",
+)
+
+
+class _TimedLoader:
+    def __init__(self, loader, profiler: "ImportProfiler"):
+        self._loader = loader
+        self._profiler = profiler
+
+    def __getattr__(self, name):
+        return getattr(self._loader, name)
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module):
+        # Hand the real loader back before running the module so nothing inside sees the wrapper.
+        module.__loader__ = self._loader
+        if getattr(module, "__spec__", None) is not None:
+            module.__spec__.loader = self._loader
+        self._profiler._enter()
+        start = time.perf_counter()
+        try:
+            self._loader.exec_module(module)
+        finally:
+            self._profiler._exit(module.__name__, time.perf_counter() - start)
+
+
+class ImportProfiler:
+    """Meta path hook recording how long each module takes to execute on import.
+
+    Inclusive time covers the module's own imports; self time excludes them, so
+    self times add up to the total import cost.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        # module name -> (inclusive seconds, self seconds)
+        self._records: Dict[str, tuple] = {}
+
+    @property
+    def installed(self) -> bool:
+        return self in sys.meta_path
+
+    def install(self) -> None:
+        if not self.installed:
+            sys.meta_path.insert(0, self)
+
+    def uninstall(self) -> None:
+        if self.installed:
+            sys.meta_path.remove(self)
+
+    def find_spec(self, fullname, path=None, target=None):
+        if getattr(self._local, "finding", False):
+            return None
+        self._local.finding = True
+        try:
+            spec = None
+            for finder in list(sys.meta_path):
+                find = getattr(finder, "find_spec", None)
+                if finder is self or find is None:
+                    continue
+                spec = find(fullname, path, target)
+                if spec is not None:
+                    break
+        finally:
+            self._local.finding = False
+        if spec is None or spec.loader is None or not hasattr(spec.loader, "exec_module"):
+            return spec
+        spec.loader = _TimedLoader(spec.loader, self)
+        return spec
+
+    def _enter(self) -> None:
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        stack.append(0.0)
+
+    def _exit(self, name: str, elapsed: float) -> None:
+        stack = self._local.stack
+        children = stack.pop()
+        if stack:
+            stack[-1] += elapsed
+        with self._lock:
+            self._records[name] = (elapsed, max(0.0, elapsed - children))
+
+    def report(self, title: str, limit: int = 15) -> List[str]:
+        """Summary lines (per top-level package, then slowest modules); clears the records."""
+        with self._lock:
+            records = self._records
+            self._records = {}
+        if not records:
+            return [f"{title}: nothing imported"]
+        packages: Dict[str, float] = {}
+        for name, (_, own) in records.items():
+            top = name.split(".", 1)[0]
+            packages[top] = packages.get(top, 0.0) + own
+        total = sum(packages.values())
+        lines = [f"{title}: {len(records)} modules, {total * 1000:.0f}ms"]
+        for top, seconds in sorted(packages.items(), key=lambda kv: -kv[1])[:limit]:
+            lines.append(f"  {top:<28} {seconds * 1000:8.1f}ms")
+        lines.append("  slowest modules (self / inclusive):")
+        for name, (inclusive, own) in sorted(records.items(), key=lambda kv: -kv[1][1])[:limit]:
+            lines.append(f"  {name:<40} {own * 1000:8.1f}ms {inclusive * 1000:8.1f}ms")
+        return lines
+
+
+import_profiler = ImportProfiler()
+
+
+def _timed_import(name: str) -> Optional[float]:
+    start = time.perf_counter()
+    try:
+        importlib.import_module(name)
+    except ImportError as e:
+        logger.info("Warm-up skipped %s: %s", name, e)
+        return None
+    return time.perf_counter() - start
+
+
+async def warm_up(modules=WARMUP_MODULES) -> Dict[str, float]:
+    """Import heavy modules one at a time off the event loop; returns seconds per module imported."""
+    timings: Dict[str, float] = {}
+    for name in modules:
+        if name in sys.modules:
+            continue
+        try:
+            seconds = await asyncio.to_thread(_timed_import, name)
+        except Exception as e:
+            logger.warning("Warm-up import %s failed: %s", name, e)
+            continue
+        if seconds is not None:
+            timings[name] = seconds
+    return timings
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Optional
+
+logger = logging.getLogger("ae_scripts_bot")
+
+_trace_file_lock = threading.Lock()
+
+
+class JobTrace:
+    def __init__(self, job_id: Optional[int], system: str):
+        self.job_id = job_id
+        self.system = system
+        self.spans = []
+        self.error = None
+        self.priority = None
+        self._lock = threading.Lock()
+
+    def add(self, name: str, start: float, end: float) -> None:
+        with self._lock:
+            self.spans.append((name, start, max(start, end)))
+
+    @contextmanager
+    def span(self, name: str):
+        start = time.time()
+        try:
+            yield
+        finally:
+            self.add(name, start, time.time())
+
+    def timings(self) -> dict:
+        # Compact form for media_queue.timings: stage -> total milliseconds.
+        out = {}
+        for name, start, end in self.spans:
+            out[name] = out.get(name, 0) + int(round((end - start) * 1000))
+        if self.spans:
+            out["total"] = int(round((max(s[2] for s in self.spans) - min(s[1] for s in self.spans)) * 1000))
+        return out
+
+    def trace_events(self) -> list:
+        events = []
+        for name, start, end in self.spans:
+            events.append({
+                "name": name,
+                "cat": self.system,
+                "ph": "X",
+                "ts": int(start * 1_000_000),
+                "dur": int((end - start) * 1_000_000),
+                "pid": self.system,
+                "tid": self.job_id or 0,
+            })
+        return events
+
+
+def trace_span(trace: Optional[JobTrace], name: str):
+    return trace.span(name) if trace is not None else nullcontext()
+
+
+def export_trace(trace: JobTrace, path: Optional[str]) -> None:
+    # Chrome trace-event JSON array; the closing bracket is optional, so events
+    # can be appended forever and the file opened as-is in Perfetto / chrome://tracing.
+    if not path or not trace.spans:
+        return
+    try:
+        with _trace_file_lock:
+            new_file = not os.path.isfile(path) or os.path.getsize(path) == 0
+            with open(path, "a", encoding="utf-8") as f:
+                if new_file:
+                    f.write("[\n")
+                for event in trace.trace_events():
+                    f.write(json.dumps(event, separators=(",", ":")) + ",\n")
+    except OSError as e:
+        logger.warning("Trace export failed: %s", e)
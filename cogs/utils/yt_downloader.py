@@ -1,10 +1,20 @@
 # -*- coding: utf-8 -*-
+import copy
 import os
+import re
+import threading
+import time
+import zipfile
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Optional, List
+from typing import Optional, List, Tuple
+from urllib.parse import parse_qs, urlparse
 
 import discord
 from yt_dlp import YoutubeDL
+from yt_dlp.utils import download_range_func
+
+from cogs.utils.tracing import trace_span
 
 
 def _get_ffmpeg_dir() -> Optional[str]:
@@ -28,6 +38,565 @@ def extract_video_id_from_url(url: str) -> str:
 
 
 MAX_DURATION_SECONDS = 1800
+# Clips only fetch their own section, so the source itself may be much longer.
+MAX_CLIP_SOURCE_SECONDS = 12 * 3600
+INFO_CACHE_TTL_SECONDS = 600
+INFO_CACHE_MAX_ENTRIES = 128
+# Estimates are approximate (filesize_approx, tbr × duration); leave room for container overhead.
+SIZE_HEADROOM = 0.95
+MP3_BITRATES_KBPS = (320, 256, 192, 160, 128, 96)
+DEFAULT_WEBM_FORMAT = "bestvideo[height<={h}][ext=webm]+bestaudio[ext=webm]/best[ext=webm]/best"
+# "original" stream-copies the source audio; "mp3" re-encodes with LAME.
+AUDIO_MODES = ("mp3", "original")
+DEFAULT_ORIGINAL_AUDIO_FORMAT = "bestaudio[acodec=opus]/bestaudio[ext=m4a]/bestaudio/best"
+# Copied streams land as .opus/.m4a; Discord's player only recognises Opus inside .ogg.
+ORIGINAL_AUDIO_RENAMES = {".opus": ".ogg"}
+# libmp3lame has no frame threading, so speed comes from the algorithm
+# preset (LAME -q): 5 is ~25% faster than the default at the same bitrate.
+MP3_ENCODER_ARGS = ["-compression_level", "5"]
+
+_info_cache = {}
+_info_cache_lock = threading.Lock()
+
+
+class DownloadRejected(RuntimeError):
+    pass
+
+
+_TIMESTAMP = r"(?:\d+:)?\d{1,2}:\d{2}(?:\.\d+)?|\d+(?:\.\d+)?s?"
+CLIP_RANGE_RE = re.compile(rf"(?:^|\s)({_TIMESTAMP})\s*[-–]\s*({_TIMESTAMP})(?=\s|$)")
+CLIP_LENGTH_RE = re.compile(rf"(?:^|\s)\+?({_TIMESTAMP})(?=\s|$)")
+_HMS_RE = re.compile(r"^(?:(\d+)h)?(?:(\d+)m)?(?:(\d+)s?)?$")
+
+
+def parse_timestamp(text: str) -> Optional[float]:
+    # "1:20", "1:02:03", "80", "80s" and YouTube's "1m20s" / "1h2m3s".
+    text = (text or "").strip().lower()
+    if not text:
+        return None
+    if ":" in text:
+        try:
+            parts = [float(p) for p in text.split(":")]
+        except ValueError:
+            return None
+        seconds = 0.0
+        for part in parts:
+            seconds = seconds * 60 + part
+        return seconds
+    try:
+        return float(text.rstrip("s"))
+    except ValueError:
+        pass
+    m = _HMS_RE.match(text)
+    if not m or not any(m.groups()):
+        return None
+    h, mnt, sec = (int(g or 0) for g in m.groups())
+    return float(h * 3600 + mnt * 60 + sec)
+
+
+def parse_clip_request(url: str, text: str) -> Optional[Tuple[float, float]]:
+    # `url 1:20-1:45` or `url?t=80 15s` (start from the link, then a length).
+    # `text` is the message without the URL. Raises ValueError on a bad range.
+    m = CLIP_RANGE_RE.search(text or "")
+    if m:
+        start, end = parse_timestamp(m.group(1)), parse_timestamp(m.group(2))
+    else:
+        try:
+            t = (parse_qs(urlparse(url).query).get("t") or [None])[0]
+        except ValueError:
+            t = None
+        start = parse_timestamp(t) if t else None
+        length = CLIP_LENGTH_RE.search(text or "") if start is not None else None
+        if not length:
+            return None
+        end = start + (parse_timestamp(length.group(1)) or 0)
+    if start is None or end is None or end <= start:
+        raise ValueError("The clip end must be after its start (e.g. `1:20-1:45`).")
+    if end - start > MAX_DURATION_SECONDS:
+        raise ValueError("Clips can be at most 30 minutes long.")
+    return start, end
+
+
+def format_timestamp(seconds: float) -> str:
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+    return f"{seconds // 60}:{seconds % 60:02d}"
+
+
+def clip_info(info: dict, clip: Tuple[float, float]) -> Tuple[dict, Tuple[float, float]]:
+    # Planning view of a clip: duration and known sizes scaled to the section.
+    duration = info.get("duration")
+    start, end = clip
+    if duration:
+        if duration > MAX_CLIP_SOURCE_SECONDS:
+            raise DownloadRejected("This video is too long to clip (max 12 hours).")
+        if start >= duration:
+            raise DownloadRejected(f"The clip starts after the end of the video ({format_timestamp(duration)}).")
+        end = min(end, duration)
+    ratio = (end - start) / duration if duration else 1.0
+    formats = []
+    for f in info.get("formats") or []:
+        f = dict(f)
+        for key in ("filesize", "filesize_approx"):
+            if f.get(key):
+                f[key] = int(f[key] * ratio)
+        formats.append(f)
+    return dict(info, duration=end - start, formats=formats), (start, end)
+
+
+DOWNLOAD_TUNING = {
+    "concurrent_fragment_downloads": 16,
+    "http_chunk_size": 20 * 1024 * 1024,
+    "socket_timeout": 20,
+    "retries": 2,
+    "fragment_retries": 2,
+    "file_access_retries": 2,
+    "extractor_retries": 2,
+    "adaptive": False,
+    "max_fragments": 32,
+    # Player JS / signature function cache; None keeps yt-dlp's default (~/.cache/yt-dlp).
+    "cachedir": None,
+}
+FRAGMENT_LEVELS = (1, 2, 4, 8, 16, 32, 64)
+
+
+class AdaptiveFragments:
+    # Keeps a throughput EWMA per concurrency level and runs at the best one,
+    # probing a neighbouring level every few jobs so it can follow changes in
+    # the network or CDN.
+    def __init__(self, start: int = 16, max_level: int = 32, explore_every: int = 4, alpha: float = 0.3):
+        self.levels = [lvl for lvl in FRAGMENT_LEVELS if lvl <= max_level] or [1]
+        self.current = min(self.levels, key=lambda lvl: abs(lvl - start))
+        self.explore_every = explore_every
+        self.alpha = alpha
+        self.ewma = {}
+        self.jobs = 0
+        self._probe_up = True
+        self._lock = threading.Lock()
+
+    def choose(self) -> int:
+        with self._lock:
+            self.jobs += 1
+            if self.ewma:
+                self.current = max(self.ewma, key=self.ewma.get)
+            if self.jobs % self.explore_every:
+                return self.current
+            i = self.levels.index(self.current)
+            j = i + 1 if self._probe_up else i - 1
+            self._probe_up = not self._probe_up
+            return self.levels[max(0, min(len(self.levels) - 1, j))]
+
+    def record(self, level: int, nbytes: int, seconds: float) -> None:
+        if nbytes <= 0 or seconds <= 0:
+            return
+        rate = nbytes / seconds
+        with self._lock:
+            prev = self.ewma.get(level)
+            self.ewma[level] = rate if prev is None else prev + self.alpha * (rate - prev)
+
+
+_adaptive = None
+
+
+def configure_download_tuning(**overrides) -> None:
+    global _adaptive
+    DOWNLOAD_TUNING.update({k: v for k, v in overrides.items() if v is not None})
+    _adaptive = None
+    if DOWNLOAD_TUNING["adaptive"]:
+        _adaptive = AdaptiveFragments(
+            start=DOWNLOAD_TUNING["concurrent_fragment_downloads"], max_level=DOWNLOAD_TUNING["max_fragments"],
+        )
+    # cachedir and socket settings are read when an instance is built.
+    ydl_pool.close()
+
+
+def _tuned_options(params: dict, progress_hooks: list) -> tuple:
+    # Returns (fragment level, throughput counter) so the caller can report back.
+    level = _adaptive.choose() if _adaptive else DOWNLOAD_TUNING["concurrent_fragment_downloads"]
+    params.update({
+        "noprogress": True,
+        "concurrent_fragment_downloads": level,
+        "http_chunk_size": DOWNLOAD_TUNING["http_chunk_size"],
+        "socket_timeout": DOWNLOAD_TUNING["socket_timeout"],
+        "retries": DOWNLOAD_TUNING["retries"],
+        "fragment_retries": DOWNLOAD_TUNING["fragment_retries"],
+        "file_access_retries": DOWNLOAD_TUNING["file_access_retries"],
+        "extractor_retries": DOWNLOAD_TUNING["extractor_retries"],
+    })
+    counter = {"bytes": 0, "seconds": 0.0}
+
+    def _hook(d):
+        if d.get("status") == "finished":
+            counter["bytes"] += int(d.get("total_bytes") or d.get("downloaded_bytes") or 0)
+            counter["seconds"] += float(d.get("elapsed") or 0.0)
+
+    progress_hooks.append(_hook)
+    return level, counter
+
+
+def _report_throughput(level: int, counter: dict) -> None:
+    if _adaptive is not None:
+        _adaptive.record(level, counter["bytes"], counter["seconds"])
+
+
+class YDLPool:
+    # Long-lived YoutubeDL instances, kept idle per option profile. A reused
+    # instance keeps its extractor state (player JS, signature functions),
+    # cookies and HTTP handlers with their open connections; per-job settings
+    # (output template, format, tuning, hooks) are swapped in on checkout.
+    def __init__(self, max_idle: int = 4, max_uses: int = 200):
+        self.max_idle = max_idle
+        self.max_uses = max_uses
+        self._idle = {}
+        self._lock = threading.Lock()
+
+    def _create(self, opts: dict) -> YoutubeDL:
+        opts = {"quiet": True, "no_warnings": True, "noplaylist": True, **opts}
+        if DOWNLOAD_TUNING["cachedir"]:
+            opts["cachedir"] = DOWNLOAD_TUNING["cachedir"]
+        opts.setdefault("socket_timeout", DOWNLOAD_TUNING["socket_timeout"])
+        opts.setdefault("extractor_retries", DOWNLOAD_TUNING["extractor_retries"])
+        ydl = YoutubeDL(opts)
+        # Hooks are bound to downloaders and postprocessors at build time, so
+        # each instance gets one relay whose targets change per job.
+        relay = {"progress": [], "postprocessor": []}
+        ydl.add_progress_hook(lambda d: [h(d) for h in list(relay["progress"])])
+        ydl.add_postprocessor_hook(lambda d: [h(d) for h in list(relay["postprocessor"])])
+        ydl._tps_relay = relay
+        ydl._tps_uses = 0
+        return ydl
+
+    @contextmanager
+    def session(
+        self,
+        profile: tuple,
+        opts: dict,
+        outtmpl: Optional[str] = None,
+        format_spec: Optional[str] = None,
+        trace=None,
+        tuned: bool = True,
+        params: Optional[dict] = None,
+    ):
+        with self._lock:
+            idle = self._idle.get(profile)
+            ydl = idle.pop() if idle else None
+        if ydl is None:
+            ydl = self._create(opts)
+        relay = ydl._tps_relay
+        if outtmpl:
+            ydl.params["outtmpl"]["default"] = outtmpl
+        if format_spec:
+            ydl.params["format"] = format_spec
+            ydl.format_selector = ydl.build_format_selector(format_spec)
+        if trace is not None:
+            relay["postprocessor"].append(_postprocessor_trace_hook(trace))
+        saved = {k: ydl.params.get(k) for k in params or {}}
+        ydl.params.update(params or {})
+        level, counter = _tuned_options(ydl.params, relay["progress"]) if tuned else (None, None)
+        ok = False
+        try:
+            yield ydl
+            ok = True
+        finally:
+            relay["progress"].clear()
+            relay["postprocessor"].clear()
+            ydl.params.update(saved)
+            ydl._tps_uses += 1
+            keep = False
+            if ok and ydl._tps_uses < self.max_uses:
+                with self._lock:
+                    idle = self._idle.setdefault(profile, [])
+                    if len(idle) < self.max_idle:
+                        idle.append(ydl)
+                        keep = True
+            if not keep:
+                # A failed job may leave partial state behind; start the next one fresh.
+                ydl.close()
+        if ok and tuned:
+            _report_throughput(level, counter)
+
+    def close(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for instances in idle.values():
+            for ydl in instances:
+                ydl.close()
+
+
+ydl_pool = YDLPool()
+
+
+def extract_media_info(url: str) -> dict:
+    # Extraction is the slow, rate-limited part; submit-time planning and the
+    # worker share one result per URL for a few minutes.
+    now = time.time()
+    with _info_cache_lock:
+        hit = _info_cache.get(url)
+        if hit and now - hit[0] < INFO_CACHE_TTL_SECONDS:
+            return hit[1]
+    with ydl_pool.session(("extract",), {}, tuned=False) as ydl:
+        info = ydl.sanitize_info(ydl.extract_info(url, download=False))
+    if not info:
+        raise RuntimeError("Could not extract video info")
+    with _info_cache_lock:
+        if len(_info_cache) >= INFO_CACHE_MAX_ENTRIES:
+            for key in sorted(_info_cache, key=lambda k: _info_cache[k][0])[: INFO_CACHE_MAX_ENTRIES // 4]:
+                del _info_cache[key]
+        _info_cache[url] = (now, info)
+    return info
+
+
+def extract_playlist_entries(url: str, max_items: int) -> dict:
+    # One flat pass over the playlist: ids, titles and durations without
+    # resolving any formats. The worker resolves the kept entries in one
+    # pass later (extract_playlist_infos).
+    with ydl_pool.session(
+        ("playlist",), {"extract_flat": "in_playlist", "noplaylist": False}, tuned=False,
+        params={"playlistend": max_items + 1},
+    ) as ydl:
+        info = ydl.sanitize_info(ydl.extract_info(url, download=False))
+    if not info or not info.get("entries"):
+        raise DownloadRejected("This playlist is empty or private.")
+    entries, skipped = [], 0
+    for index, entry in enumerate(info["entries"], start=1):
+        if not entry or not entry.get("id"):
+            continue
+        if (entry.get("duration") or 0) > MAX_DURATION_SECONDS:
+            skipped += 1
+            continue
+        entries.append({
+            "url": entry.get("url") or f"https://www.youtube.com/watch?v={entry['id']}",
+            "title": (entry.get("title") or entry["id"])[:100],
+            "id": entry["id"],
+            "index": index,
+        })
+    truncated = len(entries) > max_items
+    if not entries:
+        raise DownloadRejected("None of the videos in this playlist can be downloaded (max 30 minutes each).")
+    return {
+        "title": (info.get("title") or "Playlist")[:100],
+        "entries": entries[:max_items],
+        "skipped": skipped,
+        "truncated": truncated,
+    }
+
+
+def extract_playlist_infos(url: str, entries: List[dict]) -> int:
+    # One non-flat pass over just the kept playlist items. Each resolved video
+    # seeds the info cache under its entry URL, so the per-entry planning and
+    # download calls don't extract it again. Returns how many were resolved;
+    # items that fail here fall back to their own extraction and report there.
+    if not entries or any("index" not in e for e in entries):
+        return 0
+    with ydl_pool.session(
+        ("playlist_full",), {"noplaylist": False, "ignoreerrors": True}, tuned=False,
+        params={"playlist_items": ",".join(str(e["index"]) for e in entries)},
+    ) as ydl:
+        info = ydl.sanitize_info(ydl.extract_info(url, download=False))
+    by_id = {e["id"]: e for e in (info or {}).get("entries") or [] if e and e.get("formats")}
+    now = time.time()
+    resolved = 0
+    with _info_cache_lock:
+        for entry in entries:
+            video = by_id.get(entry.get("id"))
+            if video:
+                _info_cache[extract_video_id_from_url(entry["url"])] = (now, video)
+                resolved += 1
+    return resolved
+
+
+def batch_for_upload(paths: List[Path], limit_bytes: int, max_files: int = 10) -> List[List[Path]]:
+    # Groups files into messages that stay under the per-message upload limit.
+    batches, current, size = [], [], 0
+    for path in paths:
+        n = Path(path).stat().st_size
+        if current and (len(current) >= max_files or size + n > limit_bytes * SIZE_HEADROOM):
+            batches.append(current)
+            current, size = [], 0
+        current.append(Path(path))
+        size += n
+    if current:
+        batches.append(current)
+    return batches
+
+
+def write_zip_volumes(paths: List[Path], out_dir: Path, stem: str, limit_bytes: int) -> List[Path]:
+    # Media is already compressed, so entries are stored; each file is streamed
+    # from disk into the archive and a new volume starts before the limit.
+    out_dir = Path(out_dir)
+    volumes = []
+    for batch in batch_for_upload(paths, limit_bytes, max_files=10_000):
+        volume = out_dir / f"{stem}_part{len(volumes) + 1}.zip"
+        with zipfile.ZipFile(volume, "w", compression=zipfile.ZIP_STORED) as zf:
+            for i, path in enumerate(batch):
+                zf.write(path, arcname=f"{i + 1:02d}_{Path(path).name}")
+        volumes.append(volume)
+    if len(volumes) == 1:
+        volumes[0] = volumes[0].rename(out_dir / f"{stem}.zip")
+    return volumes
+
+
+def clear_info_cache() -> None:
+    with _info_cache_lock:
+        _info_cache.clear()
+
+
+def estimate_format_bytes(fmt: dict, duration: Optional[float]) -> Optional[int]:
+    size = fmt.get("filesize") or fmt.get("filesize_approx")
+    if size:
+        return int(size)
+    tbr = fmt.get("tbr") or ((fmt.get("vbr") or 0) + (fmt.get("abr") or 0))
+    if tbr and duration:
+        return int(tbr * 1000 / 8 * duration)
+    return None
+
+
+def _has(fmt: dict, key: str) -> bool:
+    return (fmt.get(key) or "none") != "none"
+
+
+def plan_video_download(info: dict, limit_bytes: int, max_height: int = 1080) -> dict:
+    duration = info.get("duration")
+    if duration and duration > MAX_DURATION_SECONDS:
+        raise DownloadRejected("Video exceeds 30 minutes. Please try a shorter video.")
+    budget = limit_bytes * SIZE_HEADROOM
+    formats = [f for f in info.get("formats") or [] if f.get("ext") == "webm" and (f.get("height") or 0) <= max_height]
+    videos = sorted(
+        (f for f in formats if _has(f, "vcodec") and not _has(f, "acodec")),
+        key=lambda f: (f.get("height") or 0, f.get("tbr") or 0),
+        reverse=True,
+    )
+    audios = sorted(
+        (f for f in info.get("formats") or [] if f.get("ext") == "webm" and _has(f, "acodec") and not _has(f, "vcodec")),
+        key=lambda f: f.get("abr") or f.get("tbr") or 0,
+        reverse=True,
+    )
+    muxed = [f for f in formats if _has(f, "vcodec") and _has(f, "acodec")]
+    candidates = []
+    for v in videos:
+        for a in audios:
+            v_size, a_size = estimate_format_bytes(v, duration), estimate_format_bytes(a, duration)
+            if v_size is not None and a_size is not None:
+                candidates.append((v.get("height") or 0, v_size + a_size, f"{v['format_id']}+{a['format_id']}"))
+    for m in muxed:
+        size = estimate_format_bytes(m, duration)
+        if size is not None:
+            candidates.append((m.get("height") or 0, size, m["format_id"]))
+    if not candidates:
+        return {"format": DEFAULT_WEBM_FORMAT.format(h=max_height), "bytes": None, "height": None}
+    fitting = [c for c in candidates if c[1] <= budget]
+    if not fitting:
+        smallest = min(c[1] for c in candidates)
+        raise DownloadRejected(
+            f"This video is too large for this server even at the lowest quality "
+            f"(about **{smallest / (1024 * 1024):.0f} MB**, limit {limit_bytes / (1024 * 1024):.0f} MB)."
+        )
+    # Highest resolution first, then the biggest (best bitrate) pairing at that height.
+    height, size, spec = max(fitting, key=lambda c: (c[0], c[1]))
+    return {"format": spec, "bytes": size, "height": height}
+
+
+def plan_audio_download(info: dict, limit_bytes: int, bitrate_kbps: int = 320) -> dict:
+    duration = info.get("duration")
+    if duration and duration > MAX_DURATION_SECONDS:
+        raise DownloadRejected("Audio is too long (max 30 minutes). Please try a shorter video.")
+    if not duration:
+        return {"bitrate": str(bitrate_kbps), "bytes": None}
+    for kbps in (b for b in MP3_BITRATES_KBPS if b <= bitrate_kbps):
+        size = int(kbps * 1000 / 8 * duration)
+        if size <= limit_bytes * SIZE_HEADROOM:
+            return {"bitrate": str(kbps), "bytes": size}
+    raise DownloadRejected(
+        f"This audio is too long for this server's upload limit ({limit_bytes / (1024 * 1024):.0f} MB) even at "
+        f"{MP3_BITRATES_KBPS[-1]} kbps."
+    )
+
+
+def plan_original_audio_download(info: dict, limit_bytes: int) -> dict:
+    # Best Opus/AAC stream that fits as-is; MP3 at a lower bitrate otherwise.
+    duration = info.get("duration")
+    if duration and duration > MAX_DURATION_SECONDS:
+        raise DownloadRejected("Audio is too long (max 30 minutes). Please try a shorter video.")
+    audios = sorted(
+        (
+            f for f in info.get("formats") or []
+            if _has(f, "acodec") and not _has(f, "vcodec") and f["acodec"].split(".")[0] in ("opus", "mp4a")
+        ),
+        key=lambda f: f.get("abr") or f.get("tbr") or 0,
+        reverse=True,
+    )
+    sized = [(f, estimate_format_bytes(f, duration)) for f in audios]
+    sized = [(f, size) for f, size in sized if size is not None]
+    if not sized:
+        return {"mode": "original", "format": DEFAULT_ORIGINAL_AUDIO_FORMAT, "bytes": None, "codec": None, "abr": None}
+    for f, size in sized:
+        if size <= limit_bytes * SIZE_HEADROOM:
+            return {
+                "mode": "original",
+                "format": f["format_id"],
+                "bytes": size,
+                "codec": "Opus" if f["acodec"].startswith("opus") else "AAC",
+                "abr": int(f.get("abr") or f.get("tbr") or 0) or None,
+            }
+    return {"mode": "mp3", **plan_audio_download(info, limit_bytes)}
+
+
+def plan_download(
+    url: str,
+    kind: str,
+    limit_bytes: int,
+    max_height: int = 1080,
+    audio_mode: str = "mp3",
+    clip: Optional[Tuple[float, float]] = None,
+) -> dict:
+    info = extract_media_info(extract_video_id_from_url(url))
+    if clip:
+        info, clip = clip_info(info, clip)
+    if kind == "audio":
+        if audio_mode == "original":
+            plan = plan_original_audio_download(info, limit_bytes)
+        else:
+            plan = {"mode": "mp3", **plan_audio_download(info, limit_bytes)}
+    else:
+        plan = plan_video_download(info, limit_bytes, max_height)
+    plan["clip"] = clip
+    return plan
+
+
+def _section_params(clip: Optional[Tuple[float, float]]) -> Optional[dict]:
+    # Only the fragments covering the range are fetched. Cuts snap to the
+    # nearest keyframes so the streams can be copied instead of re-encoded.
+    if not clip:
+        return None
+    return {"download_ranges": download_range_func(None, [tuple(clip)]), "force_keyframes_at_cuts": False}
+
+
+def _check_duration(info: dict, clip: Optional[Tuple[float, float]], message: str) -> None:
+    if clip:
+        clip_info(info, clip)
+    elif (info.get("duration") or 0) > MAX_DURATION_SECONDS:
+        raise RuntimeError(message)
+
+
+def _downloaded_path(ydl, info_dict) -> str:
+    downloads = info_dict.get("requested_downloads") or []
+    if downloads and downloads[0].get("filepath"):
+        return downloads[0]["filepath"]
+    return ydl.prepare_filename(info_dict)
+
+
+def _postprocessor_trace_hook(trace):
+    started = {}
+
+    def _hook(d):
+        name = d.get("postprocessor") or "postprocess"
+        if d.get("status") == "started":
+            started[name] = time.time()
+        elif d.get("status") == "finished" and name in started:
+            trace.add("encode", started.pop(name), time.time())
+
+    return _hook
 
 
 def download_video_webm(
@@ -35,31 +604,34 @@ def download_video_webm(
     output_dir: Path,
     max_height: int = 1080,
     ffmpeg_dir: Optional[str] = None,
+    trace=None,
+    format_spec: Optional[str] = None,
+    clip: Optional[Tuple[float, float]] = None,
 ) -> Path:
     output_dir = Path(output_dir)
     output_dir.mkdir(parents=True, exist_ok=True)
 
     ydl_opts = {
-        "format": f"bestvideo[height<={max_height}][ext=webm]+bestaudio[ext=webm]/best[ext=webm]/best",
         "merge_output_format": "webm",
         "postprocessor_args": ["-c:v", "copy", "-c:a", "copy"],
-        "outtmpl": str(output_dir / f"{max_height}p_%(title)s.%(ext)s"),
         "restrictfilenames": True,
-        "quiet": True,
-        "noplaylist": True,
-        "no_warnings": True,
     }
     if ffmpeg_dir:
         ydl_opts["ffmpeg_location"] = ffmpeg_dir
 
-    with YoutubeDL(ydl_opts) as ydl:
-        info_dict = ydl.extract_info(url, download=False)
-        if not info_dict:
-            raise RuntimeError("Could not extract video info")
-        if info_dict.get("duration") and info_dict["duration"] > MAX_DURATION_SECONDS:
-            raise RuntimeError("Video exceeds 30 minutes. Please try a shorter video.")
-        ydl.download([url])
-        video_file = ydl.prepare_filename(info_dict)
+    with trace_span(trace, "ingest"):
+        info_dict = extract_media_info(extract_video_id_from_url(url))
+    _check_duration(info_dict, clip, "Video exceeds 30 minutes. Please try a shorter video.")
+    with ydl_pool.session(
+        ("video_webm", ffmpeg_dir), ydl_opts,
+        outtmpl=str(output_dir / f"{max_height}p_%(title)s.%(ext)s"),
+        format_spec=format_spec or DEFAULT_WEBM_FORMAT.format(h=max_height),
+        trace=trace,
+        params=_section_params(clip),
+    ) as ydl:
+        with trace_span(trace, "download"):
+            info_dict = ydl.process_ie_result(copy.deepcopy(info_dict), download=True)
+        video_file = _downloaded_path(ydl, info_dict)
 
     path = Path(video_file).resolve()
     if not path.exists():
@@ -75,44 +647,38 @@ def download_audio_mp3(
     output_dir: Path,
     bitrate_kbps: str = "320",
     ffmpeg_dir: Optional[str] = None,
+    trace=None,
+    clip: Optional[Tuple[float, float]] = None,
 ) -> Path:
     output_dir = Path(output_dir)
     output_dir.mkdir(parents=True, exist_ok=True)
     clean_url = extract_video_id_from_url(url)
     ffmpeg_dir = ffmpeg_dir or _get_ffmpeg_dir()
 
+    # The encoder bitrate lives in the postprocessor, so each bitrate is its own profile.
     ydl_opts = {
-        "format": "bestaudio/best",
-        "outtmpl": str(output_dir / "%(title)s.%(ext)s"),
         "postprocessors": [
             {"key": "FFmpegExtractAudio", "preferredcodec": "mp3", "preferredquality": bitrate_kbps}
         ],
-        "socket_timeout": 20,
-        "retries": 2,
-        "fragment_retries": 2,
-        "file_access_retries": 2,
-        "extractor_retries": 2,
-        "http_chunk_size": 20971520,
+        "postprocessor_args": {"extractaudio": MP3_ENCODER_ARGS},
         "buffersize": 16384,
-        "concurrent_fragment_downloads": 16,
         "max_sleep_interval": 0.5,
-        "quiet": True,
-        "no_warnings": True,
-        "progress_hooks": [],
-        "noplaylist": True,
         "restrictfilenames": True,
     }
     if ffmpeg_dir:
         ydl_opts["ffmpeg_location"] = ffmpeg_dir
 
-    with YoutubeDL(ydl_opts) as ydl:
-        info_dict = ydl.extract_info(clean_url, download=False)
-        if not info_dict:
-            raise RuntimeError("Could not extract audio info")
-        if info_dict.get("duration", 0) > MAX_DURATION_SECONDS:
-            raise RuntimeError("Audio is too long (max 30 minutes). Please try a shorter video.")
-        ydl.download([clean_url])
-        download_path = str(Path(ydl.prepare_filename(info_dict)).with_suffix(".mp3"))
+    with trace_span(trace, "ingest"):
+        info_dict = extract_media_info(clean_url)
+    _check_duration(info_dict, clip, "Audio is too long (max 30 minutes). Please try a shorter video.")
+    with ydl_pool.session(
+        ("audio_mp3", bitrate_kbps, ffmpeg_dir), ydl_opts,
+        outtmpl=str(output_dir / "%(title)s.%(ext)s"), format_spec="bestaudio/best", trace=trace,
+        params=_section_params(clip),
+    ) as ydl:
+        with trace_span(trace, "download"):
+            info_dict = ydl.process_ie_result(copy.deepcopy(info_dict), download=True)
+        download_path = str(Path(_downloaded_path(ydl, info_dict)).with_suffix(".mp3"))
 
     path = Path(download_path).resolve()
     if not path.exists():
@@ -125,6 +691,55 @@ def download_audio_mp3(
     return path
 
 
+def download_audio_original(
+    url: str,
+    output_dir: Path,
+    format_spec: Optional[str] = None,
+    ffmpeg_dir: Optional[str] = None,
+    trace=None,
+    clip: Optional[Tuple[float, float]] = None,
+) -> Path:
+    # Stream copy: the source Opus/AAC is only remuxed out of its container, never re-encoded.
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    clean_url = extract_video_id_from_url(url)
+    ffmpeg_dir = ffmpeg_dir or _get_ffmpeg_dir()
+
+    ydl_opts = {
+        "postprocessors": [{"key": "FFmpegExtractAudio", "preferredcodec": "best"}],
+        "restrictfilenames": True,
+    }
+    if ffmpeg_dir:
+        ydl_opts["ffmpeg_location"] = ffmpeg_dir
+
+    with trace_span(trace, "ingest"):
+        info_dict = extract_media_info(clean_url)
+    _check_duration(info_dict, clip, "Audio is too long (max 30 minutes). Please try a shorter video.")
+    with ydl_pool.session(
+        ("audio_original", ffmpeg_dir), ydl_opts,
+        outtmpl=str(output_dir / "%(title)s.%(ext)s"),
+        format_spec=format_spec or DEFAULT_ORIGINAL_AUDIO_FORMAT,
+        trace=trace,
+        params=_section_params(clip),
+    ) as ydl:
+        with trace_span(trace, "download"):
+            info_dict = ydl.process_ie_result(copy.deepcopy(info_dict), download=True)
+        download_path = _downloaded_path(ydl, info_dict)
+
+    path = Path(download_path).resolve()
+    if not path.exists():
+        outputs = [p for p in output_dir.iterdir() if p.is_file() and not p.name.endswith(".part")]
+        if not outputs:
+            raise RuntimeError("Download finished but no audio file found.")
+        path = max(outputs, key=lambda p: p.stat().st_mtime)
+    if path.stat().st_size == 0:
+        raise RuntimeError("Downloaded file is empty")
+    renamed = ORIGINAL_AUDIO_RENAMES.get(path.suffix.lower())
+    if renamed:
+        path = path.rename(path.with_suffix(renamed))
+    return path
+
+
 def build_yt_download_layout(
     output_path: str,
     footer_text: Optional[str] = None,
@@ -177,5 +792,15 @@ def build_yt_download_layout(
     return YTLayout(), files
 
 
-def download_video_mp4(url: str, output_dir: Path, max_height: int = 1080) -> Path:
-    return download_video_webm(url, output_dir, max_height=max_height, ffmpeg_dir=_get_ffmpeg_dir())
+def download_video_mp4(
+    url: str,
+    output_dir: Path,
+    max_height: int = 1080,
+    trace=None,
+    format_spec: Optional[str] = None,
+    clip: Optional[Tuple[float, float]] = None,
+) -> Path:
+    return download_video_webm(
+        url, output_dir, max_height=max_height, ffmpeg_dir=_get_ffmpeg_dir(), trace=trace, format_spec=format_spec,
+        clip=clip,
+    )
@@ -0,0 +1,71 @@
+from types import SimpleNamespace
+
+from benchmarks.sqlite_db import create_sqlite_queue
+from cogs.utils.admission import (
+    DEFAULT_SERVICE_SECONDS,
+    PRIORITY_NORMAL,
+    PRIORITY_STAFF,
+    check_admission,
+)
+from cogs.utils.db import enqueue_media
+
+
+def _bot(**settings):
+    values = {
+        "connection": create_sqlite_queue(),
+        "max_inflight_per_user": 0,
+        "min_free_disk_mb": 0,
+        "queue_uploads_dir": ".",
+        "queue_wait_budget_seconds": 0,
+        "queue_wait_warn_seconds": 0,
+    }
+    values.update(settings)
+    return SimpleNamespace(**values)
+
+
+def _enqueue(bot, system, count, author_id=1):
+    for i in range(count):
+        enqueue_media(bot.connection, 1, 1, author_id, i, system, f"/tmp/job{i}")
+
+
+def test_empty_queue_admits():
+    assert check_admission(_bot(queue_wait_budget_seconds=60), "removebg", 1) == (True, None)
+
+
+def test_user_cap():
+    bot = _bot(max_inflight_per_user=2)
+    _enqueue(bot, "removebg", 2, author_id=7)
+    admitted, notice = check_admission(bot, "removebg", 7)
+    assert not admitted and "**2**" in notice
+    assert check_admission(bot, "removebg", 8)[0]
+
+
+def test_wait_budget_scales_with_priority():
+    # Five pending dedup jobs at the default service time.
+    wait = 5 * DEFAULT_SERVICE_SECONDS["dedup"]
+    bot = _bot(queue_wait_budget_seconds=wait * 0.6)
+    _enqueue(bot, "dedup", 5)
+    admitted, notice = check_admission(bot, "dedup", 1, PRIORITY_NORMAL)
+    assert not admitted and "queue is full" in notice
+    # Staff get twice the budget.
+    assert check_admission(bot, "dedup", 1, PRIORITY_STAFF)[0]
+
+
+def test_busy_warning():
+    bot = _bot(queue_wait_warn_seconds=1)
+    _enqueue(bot, "removebg", 1)
+    admitted, notice = check_admission(bot, "removebg", 1)
+    assert admitted and "expected wait" in notice
+
+
+def test_playlist_counts_every_entry():
+    budget = 10 * DEFAULT_SERVICE_SECONDS["yt_download_mp4"]
+    bot = _bot(queue_wait_budget_seconds=budget)
+    assert check_admission(bot, "yt_download_mp4", 1, items=5)[0]
+    assert not check_admission(bot, "yt_download_mp4", 1, items=25)[0]
+
+
+def test_yt_systems_share_a_queue():
+    bot = _bot(queue_wait_budget_seconds=DEFAULT_SERVICE_SECONDS["yt_download_mp3"])
+    _enqueue(bot, "yt_download_mp4", 1)
+    assert not check_admission(bot, "yt_download_mp3", 1)[0]
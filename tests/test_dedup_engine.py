@@ -0,0 +1,35 @@
+from cogs.utils.dedup_engine import _select_expr
+
+
+def _evaluate(expr: str, **values) -> bool:
+    # ffmpeg's expression functions, enough to evaluate a select= script.
+    funcs = {
+        "between": lambda x, a, b: a <= x <= b,
+        "eq": lambda x, a: x == a,
+        "lt": lambda x, a: x < a,
+        "if_": lambda cond, a, b: a if cond else b,
+    }
+    return bool(eval(expr.replace("if(", "if_("), funcs, values))
+
+
+def test_select_expr_single_range():
+    assert _select_expr([(3, 3)]) == "eq(n,3)"
+    assert _select_expr([(2, 5)], "t") == "between(t,2,5)"
+
+
+def test_select_expr_matches_ranges():
+    ranges = [(0, 2), (5, 5), (8, 12), (20, 21), (30, 30), (33, 40), (50, 50)]
+    kept = {n for a, b in ranges for n in range(a, b + 1)}
+    expr = _select_expr(ranges)
+    assert [n for n in range(60) if _evaluate(expr, n=n)] == sorted(kept)
+
+
+def test_select_expr_is_balanced():
+    ranges = [(i * 3, i * 3 + 1) for i in range(1000)]
+    expr = _select_expr(ranges)
+    depth = deepest = 0
+    for ch in expr:
+        depth += ch == "("
+        deepest = max(deepest, depth)
+        depth -= ch == ")"
+    assert deepest <= 2 * 11
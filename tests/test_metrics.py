@@ -0,0 +1,29 @@
+from cogs.utils.metrics import HIST_BOUNDS, _empty_hist, _hist_add, hist_percentile
+
+
+def test_empty_histogram():
+    assert hist_percentile(_empty_hist(), 50) is None
+
+
+def test_percentile_interpolates_within_bucket():
+    hist = _empty_hist()
+    for _ in range(4):
+        _hist_add(hist, 1.5)  # the (1, 2] bucket
+    assert hist_percentile(hist, 50) == 1.5
+    assert hist_percentile(hist, 100) == 2.0
+
+
+def test_percentiles_across_buckets():
+    hist = _empty_hist()
+    for value in (0.1, 0.3, 3, 3, 3, 15, 15, 15, 15, 45):
+        _hist_add(hist, value)
+    assert hist_percentile(hist, 10) == 0.25
+    assert 2 < hist_percentile(hist, 50) <= 5
+    assert 10 < hist_percentile(hist, 90) <= 20
+    assert 30 < hist_percentile(hist, 100) <= 60
+
+
+def test_overflow_bucket():
+    hist = _empty_hist()
+    _hist_add(hist, HIST_BOUNDS[-1] * 10)
+    assert HIST_BOUNDS[-1] < hist_percentile(hist, 99) <= HIST_BOUNDS[-1] * 2
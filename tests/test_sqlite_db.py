@@ -0,0 +1,36 @@
+from benchmarks.sqlite_db import _translate
+
+
+def test_placeholders():
+    assert _translate("SELECT * FROM t WHERE a = %s AND b = %s", [1, 2]) == ("SELECT * FROM t WHERE a = ? AND b = ?", (1, 2))
+
+
+def test_create_table():
+    sql, params = _translate(
+        """
+        CREATE TABLE IF NOT EXISTS t (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            k VARCHAR(64),
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+            INDEX idx_k (k)
+        )
+        """,
+        None,
+    )
+    assert "INTEGER PRIMARY KEY AUTOINCREMENT" in sql
+    assert "INDEX" not in sql and "ON UPDATE" not in sql
+    assert params == ()
+
+
+def test_on_duplicate_key_becomes_replace():
+    sql, params = _translate(
+        "INSERT INTO s (name, value) VALUES (%s, %s) ON DUPLICATE KEY UPDATE value = %s",
+        ("a", "1", "1"),
+    )
+    assert sql == "INSERT OR REPLACE INTO s (name, value) VALUES (?, ?)"
+    assert params == ("a", "1")
+
+
+def test_for_update_dropped():
+    sql, _ = _translate("SELECT id FROM media_queue WHERE status = %s ORDER BY id FOR UPDATE", ("pending",))
+    assert sql == "SELECT id FROM media_queue WHERE status = ? ORDER BY id"
@@ -0,0 +1,99 @@
+import pytest
+
+from cogs.utils.yt_downloader import (
+    DEFAULT_ORIGINAL_AUDIO_FORMAT,
+    DownloadRejected,
+    parse_clip_request,
+    plan_audio_download,
+    plan_original_audio_download,
+    plan_video_download,
+)
+
+URL = "https://www.youtube.com/watch?v=abc123"
+MB = 1024 * 1024
+
+
+def test_clip_range():
+    assert parse_clip_request(URL, " 1:20-1:45 ") == (80.0, 105.0)
+    assert parse_clip_request(URL, "1:00:00 – 1:00:30") == (3600.0, 3630.0)
+
+
+def test_clip_start_from_link_and_length():
+    assert parse_clip_request(URL + "&t=1m20s", " 15s") == (80.0, 95.0)
+    assert parse_clip_request(URL + "&t=80", "") is None
+
+
+def test_no_clip():
+    assert parse_clip_request(URL, "") is None
+    assert parse_clip_request(URL, "zip please") is None
+
+
+def test_bad_clip_ranges():
+    with pytest.raises(ValueError):
+        parse_clip_request(URL, "1:45-1:20")
+    with pytest.raises(ValueError):
+        parse_clip_request(URL, "0:00-45:00")
+
+
+def _fmt(format_id, ext="webm", height=None, vcodec="none", acodec="none", filesize=None, abr=None):
+    return {
+        "format_id": format_id, "ext": ext, "height": height, "vcodec": vcodec, "acodec": acodec,
+        "filesize": filesize, "abr": abr,
+    }
+
+
+VIDEO_INFO = {
+    "duration": 300,
+    "formats": [
+        _fmt("v1080", height=1080, vcodec="vp9", filesize=40 * MB),
+        _fmt("v720", height=720, vcodec="vp9", filesize=15 * MB),
+        _fmt("v480", height=480, vcodec="vp9", filesize=6 * MB),
+        _fmt("a160", acodec="opus", filesize=5 * MB, abr=160),
+        _fmt("a70", acodec="opus", filesize=2 * MB, abr=70),
+    ],
+}
+
+
+def test_video_plan_picks_highest_fitting_height():
+    plan = plan_video_download(VIDEO_INFO, 25 * MB)
+    assert plan == {"format": "v720+a160", "bytes": 20 * MB, "height": 720}
+    assert plan_video_download(VIDEO_INFO, 100 * MB)["height"] == 1080
+    assert plan_video_download(VIDEO_INFO, 100 * MB, max_height=480)["format"] == "v480+a160"
+
+
+def test_video_plan_rejects():
+    with pytest.raises(DownloadRejected):
+        plan_video_download(VIDEO_INFO, 5 * MB)
+    with pytest.raises(DownloadRejected):
+        plan_video_download(dict(VIDEO_INFO, duration=3600), 100 * MB)
+
+
+def test_video_plan_without_sizes_falls_back():
+    plan = plan_video_download({"duration": 60, "formats": []}, 25 * MB, max_height=720)
+    assert plan["bytes"] is None and "height<=720" in plan["format"]
+
+
+def test_audio_plan_steps_down_bitrate():
+    # 30 minutes at 320 kbps is ~72 MB; 96 kbps (~21.6 MB) is the first that fits 25 MB.
+    assert plan_audio_download({"duration": 1800}, 25 * MB)["bitrate"] == "96"
+    assert plan_audio_download({"duration": 60}, 25 * MB) == {"bitrate": "320", "bytes": 2_400_000}
+    assert plan_audio_download({}, 25 * MB) == {"bitrate": "320", "bytes": None}
+    with pytest.raises(DownloadRejected):
+        plan_audio_download({"duration": 1800}, 10 * MB)
+
+
+def test_original_audio_plan():
+    info = {
+        "duration": 300,
+        "formats": [
+            _fmt("opus160", acodec="opus", filesize=6 * MB, abr=160),
+            _fmt("aac128", ext="m4a", acodec="mp4a.40.2", filesize=4 * MB, abr=128),
+        ],
+    }
+    plan = plan_original_audio_download(info, 25 * MB)
+    assert (plan["mode"], plan["format"], plan["codec"], plan["abr"]) == ("original", "opus160", "Opus", 160)
+    assert plan_original_audio_download(info, 5 * MB)["format"] == "aac128"
+    # Nothing fits as-is: fall back to MP3 at a bitrate that does.
+    fallback = plan_original_audio_download(info, 4 * MB)
+    assert fallback["mode"] == "mp3" and fallback["bitrate"] == "96"
+    assert plan_original_audio_download({"duration": 300}, 25 * MB)["format"] == DEFAULT_ORIGINAL_AUDIO_FORMAT